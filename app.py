@@ -2,6 +2,7 @@ from app import create_app
 from app.models import User, Equipment, Session, LogScan
 from app import db
 import os
+import click
 from datetime import datetime
 
 app = create_app()
@@ -22,13 +23,140 @@ def init_db():
     etudiant = User(id="etudiant1@ecole.be", nom_complet="Marie Martin", role="Etudiant")
     
     # Ajouter des équipements de test
-    eq1 = Equipment(id="EQ001", nom_salle="Labo 101", type_equipement="Microscope", qr_code_statique_data="MS101")
-    eq2 = Equipment(id="EQ002", nom_salle="Labo 102", type_equipement="Balance", qr_code_statique_data="BA102")
+    eq1 = Equipment(id="EQ001", nom_salle="Labo 101", type_equipement="Microscope", qr_code_statique_data="EAFC-TIC_EQ001_Microscope_Labo 101")
+    eq2 = Equipment(id="EQ002", nom_salle="Labo 102", type_equipement="Balance", qr_code_statique_data="EAFC-TIC_EQ002_Balance_Labo 102")
     
     db.session.add_all([admin, prof, etudiant, eq1, eq2])
     db.session.commit()
     
     print("Base de données initialisée avec succès!")
 
+@app.cli.command("db-upgrade")
+def db_upgrade():
+    """Appliquer les migrations de schéma en attente."""
+    from app.services.schema_migrations import upgrade
+    
+    upgrade(db.engine, report_dir=app.instance_path)
+
+@app.cli.command("import-users")
+def import_users():
+    """Importer les utilisateurs du fichier JSON dans la table 'users' (backend SQL)."""
+    from app.services.auth_service import AuthService
+    from app.services.user_backend import SqlUserBackend
+    
+    users = AuthService().get_users(force_refresh=True)
+    count = SqlUserBackend().import_users(users)
+    
+    print(f"{count} utilisateur(s) importé(s) dans la base de données.")
+
+@app.cli.command("generate-data")
+@click.option("--scale", type=click.Choice(["small", "medium", "large"]), default="small", help="Volume du jeu de données.")
+@click.option("--seed", type=int, default=42, help="Graine du générateur (jeu de données reproductible).")
+@click.option("--years", type=int, default=None, help="Années d'historique (remplace le préréglage).")
+@click.option("--processes", type=int, default=None, help="Processus de génération (défaut : nombre de CPU).")
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Dernier jour généré (défaut : aujourd'hui).")
+def generate_data(scale, seed, years, processes, end_date):
+    """Remplacer la base par un jeu de données synthétique (locaux, horaires, présences)."""
+    from app.services.synthetic_data import generate_dataset
+    
+    from app.services.attendance_store import drop_archives
+    
+    overrides = {'years': years} if years else {}
+    
+    drop_archives()
+    db.drop_all()
+    db.create_all()
+    generate_dataset(scale, seed=seed, processes=processes,
+                     end_date=end_date.date() if end_date else None, **overrides)
+
+@app.cli.command("archive-term")
+@click.argument("term")
+@click.option("--chunk-size", type=int, default=5000, help="Scans déplacés par transaction.")
+def archive_term_command(term, chunk_size):
+    """Déplacer les scans d'un quadrimestre clos (ex: 2023-2024-Q1) vers sa table d'archive."""
+    from app.services.attendance_store import archive_term
+    
+    try:
+        archive_term(term, chunk_size=chunk_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+@app.cli.command("import-timetable")
+@click.argument("fichier", type=click.Path(exists=True, dir_okay=False))
+@click.option("--teacher", default=None, help="Enseignant de tous les créneaux (défaut : colonne enseignant / ORGANIZER).")
+def import_timetable_command(fichier, teacher):
+    """Importer un emploi du temps (CSV ou .ics) : sessions planifiées et QR codes pré-rendus."""
+    from app.services.timetable import import_timetable
+    
+    with open(fichier, "rb") as f:
+        content = f.read()
+    try:
+        report = import_timetable(content, fichier, teacher_id=teacher)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    print(f"{report['creees']} session(s) créée(s), {report['existantes']} déjà importée(s), "
+          f"{report['passees']} créneau(x) passé(s), {report['taches']} tâche(s) de pré-rendu")
+    for line, message in report["erreurs"]:
+        print(f"Ligne {line} : {message}")
+
+@app.cli.command("build-assets")
+@click.option("--offline", is_flag=True, help="Utiliser uniquement les copies présentes dans vendor/.")
+def build_assets_command(offline):
+    """Construire les bundles CSS/JS minifiés dans app/static/dist et mesurer la page de scan."""
+    from app.services.assets import build_assets, first_paint_report, print_report
+    
+    for name, path in build_assets(app.static_folder, offline=offline).items():
+        print(f"{name} -> {path}")
+    print_report(first_paint_report(app))
+
+@app.cli.group("jobs")
+def jobs_group():
+    """Tâches de fond (file d'attente en base de données)."""
+
+@jobs_group.command("worker")
+@click.option("--processes", type=int, default=1, help="Tâches exécutées en parallèle (1 = dans le processus courant).")
+@click.option("--poll-interval", type=float, default=1.0, help="Secondes entre deux consultations de la file vide.")
+@click.option("--once", is_flag=True, help="S'arrêter quand la file est vide.")
+def jobs_worker(processes, poll_interval, once):
+    """Exécuter les tâches en attente."""
+    from app.services.jobs import run_worker
+    
+    try:
+        run_worker(app, processes=processes, poll_interval=poll_interval, once=once)
+    except KeyboardInterrupt:
+        print("Worker arrêté, tâches en cours remises en file")
+
+@jobs_group.command("enqueue")
+@click.argument("job_type")
+@click.option("--param", "params", multiple=True, help="Paramètre cle=valeur (répétable).")
+@click.option("--max-attempts", type=int, default=3, help="Nombre maximal de tentatives.")
+def jobs_enqueue(job_type, params, max_attempts):
+    """Ajouter une tâche à la file d'attente."""
+    from app.services.jobs import enqueue
+    
+    values = {}
+    for param in params:
+        key, sep, value = param.partition("=")
+        if not sep:
+            raise click.BadParameter(f"{param} (format attendu : cle=valeur)", param_hint="--param")
+        values[key] = value
+    
+    try:
+        new_job = enqueue(job_type, values, max_attempts=max_attempts)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(new_job.id)
+
+@jobs_group.command("list")
+@click.option("--limit", type=int, default=20, help="Nombre de tâches affichées.")
+def jobs_list(limit):
+    """Afficher les dernières tâches."""
+    from app.models import Job
+    
+    for job in Job.query.order_by(Job.timestamp_creation.desc()).limit(limit):
+        total = f"/{job.total}" if job.total is not None else ""
+        print(f"{job.id}  {job.type:<24} {job.statut:<10} {job.avancement}{total}  {job.message or ''}")
+
 if __name__ == "__main__":
     app.run(debug=True, port=5005)
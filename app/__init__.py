@@ -4,15 +4,16 @@ from flask_login import LoginManager
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from app.services.read_routing import RoutingSession
 
 # Charger les variables d'environnement
 load_dotenv()
 
 # Initialiser les extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     
     # Configuration de l'application
@@ -20,6 +21,10 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URI', 'sqlite:///app.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Surcharges éventuelles (tests, scripts)
+    if config:
+        app.config.update(config)
+    
     # Initialiser les extensions avec l'application
     db.init_app(app)
     login_manager.init_app(app)
@@ -45,13 +50,61 @@ def create_app():
     from app.controllers.user import user as user_blueprint
     app.register_blueprint(user_blueprint)
     
+    from app.controllers.analytics import analytics as analytics_blueprint
+    app.register_blueprint(analytics_blueprint)
+    
+    from app.controllers.jobs import jobs as jobs_blueprint
+    app.register_blueprint(jobs_blueprint)
+    
+    # Routage des lectures des requêtes GET vers un réplica (optionnel, READ_ROUTING_ENABLED)
+    from app.services.read_routing import ReadRouter
+    ReadRouter(app)
+    
+    # Identité de l'utilisateur courant (session signée ou backend d'utilisateurs)
+    from app.services.identity import SignedIdentity
+    SignedIdentity(app)
+    
+    # Ordonnanceur de fermeture automatique des sessions
+    from app.services.session_scheduler import SessionScheduler
+    SessionScheduler(app)
+    
+    # File de tâches de fond (exécutées par `flask jobs worker`)
+    from app.services.jobs import JobQueue
+    JobQueue(app)
+    
+    # Import de l'emploi du temps (sessions planifiées, QR codes pré-rendus)
+    from app.services.timetable import TimetableImport
+    TimetableImport(app)
+    
+    # Limitation de débit des endpoints de scan
+    from app.services.rate_limiter import RateLimiter
+    RateLimiter(app)
+    
+    # Instrumentation des requêtes (optionnelle, INSTRUMENTATION_ENABLED)
+    from app.services.instrumentation import RequestInstrumentation
+    RequestInstrumentation(app)
+    
+    # Cache des pages publiques, compression et empreintes des fichiers statiques
+    from app.services.http_cache import HttpCache
+    HttpCache(app)
+    
+    # Recherche plein texte (index FTS5 créés avec les tables)
+    from app.services.search import SearchIndex
+    SearchIndex(app)
+    
+    # Bundles CSS/JS construits par build_static.py (sources CDN sinon)
+    from app.services.assets import asset_urls
+    app.add_template_global(asset_urls)
+    
     # Ajouter un context processor pour injecter la variable 'now'
     @app.context_processor
     def inject_now():
         return {'now': datetime.utcnow()}
     
     # Créer les tables de la base de données si elles n'existent pas
-    with app.app_context():
-        db.create_all()
+    # (désactivable quand le schéma est géré par les migrations, ex. serverless)
+    if app.config.get('AUTO_CREATE_TABLES', True):
+        with app.app_context():
+            db.create_all()
     
     return app
@@ -0,0 +1,49 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_required, current_user
+from datetime import datetime, timedelta
+from app.services.utilisation import utilisation_report, default_window
+
+analytics = Blueprint('analytics', __name__)
+
+def _window():
+    """Période demandée (paramètres debut et fin au format AAAA-MM-JJ, fin incluse)"""
+    default_start, default_end = default_window()
+    debut = request.args.get('debut')
+    fin = request.args.get('fin')
+    start = datetime.strptime(debut, '%Y-%m-%d') if debut else default_start
+    end = datetime.strptime(fin, '%Y-%m-%d') + timedelta(days=1) if fin else default_end
+    return start, end
+
+@analytics.route('/analytics/utilisation')
+@login_required
+def utilisation():
+    """Tableau de bord d'utilisation des salles et des équipements (administrateurs)"""
+    if current_user.role != 'Admin':
+        flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    try:
+        start, end = _window()
+        report = utilisation_report(start, end)
+    except ValueError:
+        flash('Période invalide.', 'danger')
+        return redirect(url_for('analytics.utilisation'))
+    
+    return render_template('analytics/utilisation.html',
+                          report=report,
+                          debut=start.date().isoformat(),
+                          fin=(end - timedelta(days=1)).date().isoformat())
+
+@analytics.route('/api/analytics/utilisation')
+@login_required
+def api_utilisation():
+    if current_user.role != 'Admin':
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+    
+    try:
+        start, end = _window()
+        report = utilisation_report(start, end)
+    except ValueError:
+        return jsonify({'success': False, 'message': "Période invalide (format AAAA-MM-JJ, 2 ans au plus)."}), 400
+    
+    return jsonify(report)
@@ -2,25 +2,17 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import User
 from app import db, login_manager
-from app.services.auth_service import AuthService
-import os
-import json
+from app.services.user_backend import get_user_backend
+from app.services.identity import load_identity, store_claims
 
 auth = Blueprint('auth', __name__)
-auth_service = AuthService()
+auth_service = get_user_backend()
 
 @login_manager.user_loader
 def load_user(user_id):
-    # Récupérer l'utilisateur depuis Google Sheets
-    user_data = auth_service.get_user_by_id(user_id)
-    if user_data:
-        # Créer un objet User à partir des données
-        return User(
-            id=user_data['id'],
-            nom_complet=user_data['nom_complet'],
-            role=user_data['role']
-        )
-    return None
+    # Identité lue dans la session signée tant que la version du stockage
+    # n'a pas changé, sinon depuis le backend configuré (JSON ou base de données)
+    return load_identity(user_id)
 
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
@@ -42,12 +34,8 @@ def login():
                 role=user_data['role']
             )
             
-            # Stocker les données utilisateur dans la session
-            session['user_data'] = {
-                'id': user_data['id'],
-                'nom_complet': user_data['nom_complet'],
-                'role': user_data['role']
-            }
+            # Stocker l'identité (étiquetée par la version du stockage) dans la session signée
+            store_claims(user_data)
             
             login_user(user)
             next_page = request.args.get('next')
@@ -64,17 +52,11 @@ def login():
     
     # Pour le développement, afficher la liste des utilisateurs disponibles
     try:
-        # Essayer de charger les utilisateurs de test depuis le fichier JSON
-        if os.path.exists('data/test_users.json'):
-            with open('data/test_users.json', 'r') as f:
-                users = json.load(f)
-        else:
-            # Sinon, récupérer depuis Google Sheets
-            users = auth_service.get_users()
-            
-            # Si aucun utilisateur n'est trouvé, créer des utilisateurs de test
-            if not users:
-                users = auth_service.create_test_users_file()
+        users = auth_service.get_users()
+        
+        # Si aucun utilisateur n'est trouvé, créer des utilisateurs de test
+        if not users:
+            users = auth_service.create_test_users_file()
     except:
         users = []
     
@@ -98,12 +80,8 @@ def auto_login(role):
             role=user_data['role']
         )
         
-        # Stocker les données utilisateur dans la session
-        session['user_data'] = {
-            'id': user_data['id'],
-            'nom_complet': user_data['nom_complet'],
-            'role': user_data['role']
-        }
+        # Stocker l'identité (étiquetée par la version du stockage) dans la session signée
+        store_claims(user_data)
         
         # Forcer la connexion de l'utilisateur avec remember=True
         login_user(user, remember=True, force=True)
@@ -1,9 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models import Equipment
 from app import db
-import qrcode
-from io import BytesIO
+from app.services.qr_images import qr_code_png
+from app.services.search import search_equipments
 import base64
 
 equipment = Blueprint('equipment', __name__)
@@ -15,8 +15,11 @@ def list_equipments():
         flash('Accès non autorisé.', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    equipments = Equipment.query.all()
-    return render_template('equipment/list.html', equipments=equipments)
+    # Recherche et pagination côté serveur (paramètres q et page)
+    query = request.args.get('q', '')
+    results = search_equipments(query, page=request.args.get('page', 1, type=int),
+                                per_page=current_app.config['SEARCH_PAGE_SIZE'])
+    return render_template('equipment/list.html', equipments=results['items'], results=results, q=query)
 
 @equipment.route('/equipments/add', methods=['GET', 'POST'])
 @login_required
@@ -65,22 +68,8 @@ def view_equipment(equipment_id):
     
     equipment = Equipment.query.get_or_404(equipment_id)
     
-    # Générer le QR code pour l'affichage
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(equipment.qr_code_statique_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convertir l'image en base64 pour l'affichage HTML
-    buffered = BytesIO()
-    img.save(buffered)
-    qr_code_img = base64.b64encode(buffered.getvalue()).decode()
+    # QR code pour l'affichage (image conservée en mémoire, voir qr_images)
+    qr_code_img = base64.b64encode(qr_code_png(equipment.qr_code_statique_data)).decode()
     
     return render_template('equipment/view.html', equipment=equipment, qr_code_img=qr_code_img)
 
@@ -143,3 +132,23 @@ def api_list_equipments():
         })
     
     return jsonify(result)
+
+@equipment.route('/api/equipments/search')
+@login_required
+def api_search_equipments():
+    """Recherche d'équipements par préfixe (saisie au fil de la frappe), résultats paginés"""
+    if current_user.role not in ['Admin', 'Enseignant']:
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+    
+    results = search_equipments(request.args.get('q', ''), page=request.args.get('page', 1, type=int),
+                                per_page=current_app.config['SEARCH_PAGE_SIZE'])
+    return jsonify({
+        'success': True,
+        'total': results['total'],
+        'page': results['page'],
+        'pages': results['pages'],
+        'equipments': [
+            {'id': eq.id, 'nom_salle': eq.nom_salle, 'type_equipement': eq.type_equipement}
+            for eq in results['items']
+        ]
+    })
@@ -0,0 +1,148 @@
+import json
+import os
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, current_app
+from flask_login import login_required, current_user
+from app import db
+from app.models import Job
+from app.services.jobs import JOBS, ACTIVE_STATUSES, enqueue, cancel, retry, job_to_dict
+
+jobs = Blueprint('jobs', __name__)
+
+# Nombre de tâches affichées sur la page de suivi
+RECENT_JOBS = 50
+
+@jobs.route('/jobs')
+@login_required
+def list_jobs():
+    """Suivi des tâches de fond (administrateurs)"""
+    if current_user.role != 'Admin':
+        flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    recent = Job.query.order_by(Job.timestamp_creation.desc()).limit(RECENT_JOBS).all()
+    return render_template('jobs/list.html',
+                          jobs=recent,
+                          job_types=sorted(JOBS),
+                          active=any(j.statut in ACTIVE_STATUSES for j in recent))
+
+@jobs.route('/jobs/create', methods=['POST'])
+@login_required
+def create_job():
+    if current_user.role != 'Admin':
+        flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    # Paramètres saisis sous la forme cle=valeur, un par ligne (convertis par enqueue selon le type)
+    params = {}
+    for line in request.form.get('params', '').splitlines():
+        if not line.strip():
+            continue
+        key, sep, value = line.partition('=')
+        if not sep:
+            flash(f'Paramètre invalide : {line.strip()} (format attendu : cle=valeur).', 'danger')
+            return redirect(url_for('jobs.list_jobs'))
+        params[key.strip()] = value.strip()
+
+    try:
+        new_job = enqueue(request.form.get('type'), params, created_by=current_user.id)
+    except ValueError as e:
+        flash(str(e), 'danger')
+    else:
+        flash(f'Tâche {new_job.type} ajoutée à la file d\'attente.', 'success')
+    return redirect(url_for('jobs.list_jobs'))
+
+@jobs.route('/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    if current_user.role != 'Admin':
+        flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    if cancel(job_id):
+        flash('Annulation demandée.', 'success')
+    else:
+        flash('Cette tâche est déjà terminée.', 'warning')
+    return redirect(url_for('jobs.list_jobs'))
+
+@jobs.route('/jobs/<job_id>/retry', methods=['POST'])
+@login_required
+def retry_job(job_id):
+    if current_user.role != 'Admin':
+        flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    if retry(job_id):
+        flash('Tâche remise en file d\'attente.', 'success')
+    else:
+        flash('Cette tâche est encore en cours.', 'warning')
+    return redirect(url_for('jobs.list_jobs'))
+
+@jobs.route('/jobs/<job_id>/download')
+@login_required
+def download_job_file(job_id):
+    """Télécharger le fichier produit par une tâche terminée"""
+    if current_user.role != 'Admin':
+        flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    job_obj = db.get_or_404(Job, job_id)
+    result = json.loads(job_obj.resultat) if job_obj.resultat else {}
+    filename = result.get('fichier') if isinstance(result, dict) else None
+    path = os.path.join(current_app.instance_path, 'jobs', f"{job_obj.id}{os.path.splitext(filename or '')[1]}")
+    if job_obj.statut != 'termine' or not filename or not os.path.exists(path):
+        flash('Aucun fichier disponible pour cette tâche.', 'warning')
+        return redirect(url_for('jobs.list_jobs'))
+
+    return send_file(path, as_attachment=True, download_name=filename)
+
+@jobs.route('/api/jobs', methods=['GET', 'POST'])
+@login_required
+def api_jobs():
+    if current_user.role != 'Admin':
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            new_job = enqueue(data.get('type'), data.get('params') or {}, created_by=current_user.id,
+                              max_attempts=int(data.get('max_tentatives', 3)))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify(job_to_dict(new_job)), 202
+
+    query = Job.query.order_by(Job.timestamp_creation.desc())
+    if request.args.get('statut'):
+        query = query.filter(Job.statut == request.args['statut'])
+    return jsonify([job_to_dict(j) for j in query.limit(RECENT_JOBS).all()])
+
+@jobs.route('/api/jobs/<job_id>')
+@login_required
+def api_job(job_id):
+    """État et avancement d'une tâche"""
+    if current_user.role != 'Admin':
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+
+    job_obj = db.session.get(Job, job_id)
+    if job_obj is None:
+        return jsonify({'success': False, 'message': "Tâche introuvable"}), 404
+    return jsonify(job_to_dict(job_obj))
+
+@jobs.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def api_cancel_job(job_id):
+    if current_user.role != 'Admin':
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+
+    if not cancel(job_id):
+        return jsonify({'success': False, 'message': "Tâche introuvable ou déjà terminée"}), 409
+    return jsonify(job_to_dict(db.session.get(Job, job_id)))
+
+@jobs.route('/api/jobs/<job_id>/retry', methods=['POST'])
+@login_required
+def api_retry_job(job_id):
+    if current_user.role != 'Admin':
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+
+    if not retry(job_id):
+        return jsonify({'success': False, 'message': "Tâche introuvable ou encore active"}), 409
+    return jsonify(job_to_dict(db.session.get(Job, job_id)))
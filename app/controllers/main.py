@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import login_required, current_user
-from app.models import Equipment, Session, LogScan, User
+from app.models import Equipment, Session
+from app.services.user_backend import get_user_backend
+from app.services.attendance_history import get_student_history
+from app.services.http_cache import cache_page
 
 main = Blueprint('main', __name__)
 
@@ -16,7 +19,7 @@ def dashboard():
     # Afficher différentes informations selon le rôle de l'utilisateur
     if current_user.role == 'Admin':
         equipments = Equipment.query.all()
-        users = User.query.all()
+        users = get_user_backend().get_users()
         sessions = Session.query.all()
         return render_template('main/admin_dashboard.html', 
                               equipments=equipments, 
@@ -32,14 +35,16 @@ def dashboard():
                               equipments=equipments)
     
     else:  # Étudiant
-        # Pour les étudiants, montrer leurs scans récents
-        logs = LogScan.query.filter_by(user_id_etudiant=current_user.id).order_by(LogScan.timestamp_scan.desc()).limit(10).all()
-        return render_template('main/student_dashboard.html', logs=logs)
+        # Pour les étudiants, montrer leurs scans récents (première page de l'historique)
+        history = get_student_history(current_user.id, limit=10)
+        return render_template('main/student_dashboard.html', logs=history['items'])
 
 @main.route('/about')
+@cache_page
 def about():
     return render_template('main/about.html')
 
 @main.route('/help')
+@cache_page
 def help():
     return render_template('main/help.html')
@@ -1,18 +1,31 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Blueprint, current_app, render_template, request, jsonify, session, redirect, url_for, flash, send_from_directory
 from flask_login import login_required, current_user
-from app.models import Session, Equipment, LogScan, User
+from app.models import Equipment
 from app import db
+from app.services.session_scheduler import get_session_scheduler
+from app.services.http_cache import cache_page
+from app.services.rate_limiter import limit_scans, rate_limit_response
+from app.services.scan_engine import DEFAULT_BATCH_MAX_RECORDS, INVALID_MESSAGE, ScanEngine, ScanRequest, open_equipment_session, process_batch
+from app.services.user_backend import get_user_backend
 from datetime import datetime
-import uuid
 
 scan = Blueprint('scan', __name__)
 
 @scan.route('/mobile-scan')
+@cache_page
 def mobile_scan():
     """Page de scan mobile pour les étudiants"""
     return render_template('scan/mobile_scan.html')
 
+@scan.route('/scan-sw.js')
+def scan_service_worker():
+    """Service worker de la file d'attente hors ligne (servi à la racine pour couvrir /api/)"""
+    response = send_from_directory(current_app.static_folder, 'js/scan-sw.js', mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @scan.route('/scan-guide')
+@cache_page
 def scan_guide():
     """Guide d'utilisation pour le scan QR code"""
     return render_template('scan/scan_guide.html')
@@ -55,40 +68,28 @@ def scan_equipment():
             'message': 'Équipement non reconnu. Veuillez scanner un QR code valide.'
         })
     
-    # Vérifier s'il existe déjà une session active pour cet équipement et cet enseignant
-    existing_session = Session.query.filter_by(
-        equipment_id=equipment.id,
-        user_id_enseignant=current_user.id,
-        actif=True
-    ).first()
+    # Clé d'idempotence facultative : un renvoi de la même requête retourne la même session
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    if idempotency_key is not None and not (isinstance(idempotency_key, str) and 0 < len(idempotency_key) <= 64):
+        return jsonify({
+            'success': False,
+            'message': "Clé d'idempotence invalide (64 caractères au plus)."
+        }), 400
+    
+    # Réutiliser la session active de l'enseignant sur cet équipement, ou en créer une
+    new_session, created = open_equipment_session(equipment, current_user.id, datetime.utcnow(),
+                                                  data.get('duree_minutes'), idempotency_key)
+    db.session.commit()
     
-    if existing_session:
-        # Utiliser la session existante
+    if not created:
         return jsonify({
             'success': True,
             'message': f'Session existante trouvée pour {equipment.type_equipement} ({equipment.nom_salle}).',
-            'session_id': existing_session.id
+            'session_id': new_session.id
         })
     
-    # Créer une nouvelle session
-    session_id = str(uuid.uuid4())
-    ecole = "EAFC-TIC"  # Nom de l'école
-    nom_salle = equipment.nom_salle  # Local
-    type_equipement = equipment.type_equipement  # Équipement
-    qr_code_data = f"SESSION_{ecole}_{nom_salle}_{type_equipement}_{session_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-    
-    new_session = Session(
-        id=session_id,
-        nom_session=f"Session {equipment.type_equipement} - {datetime.utcnow().strftime('%d/%m/%Y %H:%M')}",
-        equipment_id=equipment.id,
-        user_id_enseignant=current_user.id,
-        timestamp_debut=datetime.utcnow(),
-        actif=True,
-        qr_code_dynamique_data=qr_code_data
-    )
-    
-    db.session.add(new_session)
-    db.session.commit()
+    # Programmer la fermeture automatique de la session
+    get_session_scheduler().schedule(new_session.id, new_session.timestamp_expiration)
     
     return jsonify({
         'success': True,
@@ -96,120 +97,109 @@ def scan_equipment():
         'session_id': new_session.id
     })
 
+@scan.route('/api/scan/batch', methods=['POST'])
+@login_required
+def scan_batch():
+    """API d'envoi groupé des scans mis en file d'attente hors ligne
+    
+    Corps attendu : {"records": [{"id": ..., "qr_code": ..., "scanned_at": "ISO 8601"}, ...]}
+    """
+    limited = rate_limit_response(current_user.id)
+    if limited is not None:
+        return limited
+    
+    data = request.get_json(silent=True) or {}
+    records = data.get('records')
+    max_records = current_app.config.get('SCAN_BATCH_MAX_RECORDS', DEFAULT_BATCH_MAX_RECORDS)
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({'success': False, 'message': 'Aucun scan à enregistrer.'}), 400
+    if len(records) > max_records:
+        return jsonify({'success': False, 'message': f'Au plus {max_records} scans par envoi.'}), 413
+    
+    user = {'id': current_user.id, 'role': current_user.role}
+    scans, created = process_batch(records, user)
+    
+    for new_session in created:
+        get_session_scheduler().schedule(new_session.id, new_session.timestamp_expiration)
+    
+    return jsonify({
+        'success': True,
+        'recorded': sum(1 for scan_request in scans if scan_request.status == 'recorded'),
+        'results': [scan_request.to_dict() for scan_request in scans]
+    })
+
 @scan.route('/api/scan', methods=['POST'])
+@limit_scans
 def process_scan():
-    """API pour traiter les scans de QR codes"""
-    data = request.json
-    qr_code = data.get('qr_code')
-    
-    if not qr_code:
+    """API pour traiter les scans de QR codes (front-end JSON du moteur de scan)"""
+    data = request.get_json(silent=True) or {}
+    scan_request = ScanRequest(data.get('qr_code') or data.get('qr_data'))
+    
+    # QR code statique : simple identification de l'équipement
+    if scan_request.is_equipment:
+        equipment = Equipment.query.filter_by(qr_code_statique_data=scan_request.payload).first()
+        if not equipment:
+            return jsonify({'success': False, 'message': INVALID_MESSAGE}), 404
         return jsonify({
-            'success': False,
-            'message': 'Aucun QR code détecté.'
+            'success': True,
+            'message': f'Équipement détecté: {equipment.nom_salle} - {equipment.type_equipement}',
+            'equipment_id': equipment.id
         })
     
-    # Vérifier si le QR code correspond à une session active
-    session_obj = Session.query.filter_by(qr_code_dynamique_data=qr_code, actif=True).first()
-    
-    if session_obj:
-        # Si l'utilisateur est connecté, enregistrer le scan
-        if current_user.is_authenticated:
-            # Vérifier si l'utilisateur a déjà scanné cette session
-            existing_scan = LogScan.query.filter_by(
-                session_id=session_obj.id,
-                user_id_etudiant=current_user.id
-            ).first()
-            
-            if existing_scan:
-                return jsonify({
-                    'success': True,
-                    'message': f'Vous avez déjà scanné cette session ({session_obj.nom_session}).'
-                })
-            
-            # Enregistrer le nouveau scan
-            log_scan = LogScan(
-                session_id=session_obj.id,
-                user_id_etudiant=current_user.id,
-                timestamp=datetime.utcnow()
-            )
-            db.session.add(log_scan)
-            db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'message': f'Scan enregistré pour la session: {session_obj.nom_session}'
-            })
-        else:
-            # Si l'utilisateur n'est pas connecté, stocker temporairement le QR code dans la session
-            session['pending_scan'] = qr_code
-            
+    engine = ScanEngine('api')
+    if current_user.is_authenticated:
+        engine.process([scan_request], current_user.id)
+    else:
+        # Vérifier la session puis conserver le scan jusqu'à la connexion
+        engine.lookup([scan_request])
+        if scan_request.pending:
+            session['pending_scan'] = scan_request.payload
             return jsonify({
                 'success': True,
                 'message': 'Session détectée. Veuillez vous connecter pour enregistrer votre présence.',
                 'redirect': '/login?next=/confirm-scan'
             })
     
-    # Vérifier si le QR code correspond à un équipement (QR code statique)
-    equipment = Equipment.query.filter_by(qr_code_statique_data=qr_code).first()
+    if scan_request.status == 'rejected':
+        status_code = 404 if scan_request.reason in ('not_found', 'inactive') else 400
+        return jsonify({'success': False, 'message': scan_request.message}), status_code
     
-    if equipment:
-        return jsonify({
-            'success': True,
-            'message': f'Équipement détecté: {equipment.nom_salle} - {equipment.type_equipement}',
-            'equipment_id': equipment.id
-        })
-    
-    # Si le QR code ne correspond à rien
+    session_obj = scan_request.session
+    teacher = get_user_backend().get_user_by_id(session_obj.user_id_enseignant)
     return jsonify({
-        'success': False,
-        'message': 'QR code non reconnu. Veuillez scanner un QR code valide.'
+        'success': True,
+        'duplicate': scan_request.status == 'duplicate',
+        'message': scan_request.message,
+        'session_info': {
+            'id': session_obj.id,
+            'equipment': session_obj.equipement.type_equipement,
+            'room': session_obj.equipement.nom_salle,
+            'teacher': teacher['nom_complet'] if teacher else None
+        }
     })
 
 @scan.route('/confirm-scan')
 @login_required
 def confirm_scan():
     """Confirme un scan en attente après connexion"""
-    if 'pending_scan' in session:
-        qr_code = session.pop('pending_scan')
-        
-        # Vérifier si le QR code correspond à une session active
-        session_obj = Session.query.filter_by(qr_code_dynamique_data=qr_code, actif=True).first()
-        
-        if session_obj:
-            # Vérifier si l'utilisateur a déjà scanné cette session
-            existing_scan = LogScan.query.filter_by(
-                session_id=session_obj.id,
-                user_id_etudiant=current_user.id
-            ).first()
-            
-            if existing_scan:
-                flash(f'Vous avez déjà scanné cette session ({session_obj.nom_session}).', 'info')
-                return render_template('scan/scan_success.html', 
-                                      message=f'Vous avez déjà scanné cette session ({session_obj.nom_session}).',
-                                      session=session_obj)
-            
-            # Enregistrer le nouveau scan
-            log_scan = LogScan(
-                session_id=session_obj.id,
-                user_id_etudiant=current_user.id,
-                timestamp=datetime.utcnow()
-            )
-            db.session.add(log_scan)
-            db.session.commit()
-            
-            flash(f'Scan enregistré pour la session: {session_obj.nom_session}', 'success')
-            return render_template('scan/scan_success.html', 
-                                  message=f'Scan enregistré pour la session: {session_obj.nom_session}',
-                                  session=session_obj)
-        
-        # Si le QR code ne correspond pas à une session active
-        flash('QR code non reconnu ou session inactive.', 'danger')
-        return render_template('scan/scan_error.html', 
-                              message='QR code non reconnu ou session inactive.')
-    
-    # Si aucun scan en attente
-    flash('Aucun scan en attente.', 'warning')
-    return redirect(url_for('scan.mobile_scan'))
+    if 'pending_scan' not in session:
+        flash('Aucun scan en attente.', 'warning')
+        return redirect(url_for('scan.mobile_scan'))
+    
+    # Le code tournant a pu changer pendant la connexion : seules la signature
+    # et l'expiration du jeton comptent
+    scan_request = ScanRequest(session.pop('pending_scan'))
+    ScanEngine('confirm').process([scan_request], current_user.id, check_rotation=False)
+    
+    if scan_request.status == 'rejected':
+        flash(scan_request.message, 'danger')
+        return render_template('scan/scan_error.html', message=scan_request.message)
+    
+    flash(scan_request.message, 'info' if scan_request.status == 'duplicate' else 'success')
+    return render_template('scan/scan_success.html',
+                          message=scan_request.message,
+                          session=scan_request.session)
 
 @scan.route('/scan-success')
 def scan_success():
@@ -1,11 +1,20 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, make_response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, make_response, Response, stream_with_context
 from flask_login import login_required, current_user
-from app.models import Session, Equipment, LogScan, User
+from app.models import Session, Equipment
 from app import db
-import qrcode
+from app.services.session_scheduler import get_session_scheduler
+from app.services.attendance_history import get_student_history
+from app.services.attendance_store import session_scans, scan_counts
+from app.services.user_backend import get_user_backend
+from app.services.academic_terms import recent_terms, term_for
+from app.services.attendance_matrix import build_attendance_matrix, attendance_summary, grid_rows
+from app.services.spreadsheet import stream_csv, stream_xlsx
+from app.services.qr_tokens import make_session_token, rotation_seconds
+from app.services.qr_images import qr_code_png
+from app.services.scan_engine import open_equipment_session
+from app.services.timetable import import_timetable
 from io import BytesIO
 import base64
-import uuid
 from datetime import datetime
 
 session = Blueprint('session', __name__)
@@ -20,12 +29,30 @@ def list_sessions():
         # Les enseignants voient leurs propres sessions
         sessions = Session.query.filter_by(user_id_enseignant=current_user.id).order_by(Session.timestamp_debut.desc()).all()
     else:
-        # Les étudiants voient les sessions auxquelles ils ont participé
-        student_logs = LogScan.query.filter_by(user_id_etudiant=current_user.id).all()
-        session_ids = [log.session_id for log in student_logs]
-        sessions = Session.query.filter(Session.id.in_(session_ids)).order_by(Session.timestamp_debut.desc()).all()
+        # Les étudiants voient les sessions auxquelles ils ont participé (historique paginé)
+        return redirect(url_for('session.student_history'))
     
-    return render_template('session/list.html', sessions=sessions)
+    # Nombre de participants de chaque session (table vivante et archives, en une requête)
+    return render_template('session/list.html', sessions=sessions, scan_counts=scan_counts(sessions))
+
+@session.route('/sessions/historique')
+@login_required
+def student_history():
+    """Historique de présence paginé de l'étudiant connecté"""
+    term = request.args.get('quadrimestre') or None
+    cursor = request.args.get('apres') or None
+    
+    try:
+        history = get_student_history(current_user.id, cursor=cursor, term=term)
+    except ValueError:
+        flash('Quadrimestre invalide.', 'danger')
+        return redirect(url_for('session.student_history'))
+    
+    return render_template('session/history.html',
+                          logs=history['items'],
+                          next_cursor=history['next_cursor'],
+                          term=term,
+                          terms=recent_terms())
 
 @session.route('/sessions/create', methods=['GET', 'POST'])
 @login_required
@@ -43,51 +70,84 @@ def create_session():
             flash('Équipement non trouvé.', 'danger')
             return redirect(url_for('session.create_session'))
         
-        # Générer un ID unique pour la session
-        session_id = str(uuid.uuid4())
-        
-        # Récupérer les informations de l'équipement
-        equipment = Equipment.query.get(equipment_id)
+        # Réutiliser la session active de l'enseignant sur cet équipement (double envoi du formulaire)
+        new_session, created = open_equipment_session(equipment, current_user.id, datetime.utcnow(),
+                                                      request.form.get('duree_minutes'))
+        db.session.commit()
         
-        # Générer une donnée unique pour le QR code dynamique
-        ecole = "EAFC-TIC"  # Nom de l'école
-        nom_salle = equipment.nom_salle  # Local
-        type_equipement = equipment.type_equipement  # Équipement
-        qr_code_data = f"SESSION_{ecole}_{nom_salle}_{type_equipement}_{session_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        if not created:
+            flash('Une session est déjà active pour cet équipement.', 'info')
+            return redirect(url_for('session.view_session', session_id=new_session.id))
         
-        # Créer la nouvelle session
-        new_session = Session(
-            id=session_id,
-            user_id_enseignant=current_user.id,
-            equipment_id=equipment_id,
-            qr_code_dynamique_data=qr_code_data
-        )
-        
-        db.session.add(new_session)
-        db.session.commit()
+        # Programmer la fermeture automatique de la session
+        get_session_scheduler().schedule(new_session.id, new_session.timestamp_expiration)
         
         flash('Session créée avec succès.', 'success')
-        return redirect(url_for('session.view_session', session_id=session_id))
+        return redirect(url_for('session.view_session', session_id=new_session.id))
     
     # Récupérer la liste des équipements pour le formulaire
     equipments = Equipment.query.all()
     return render_template('session/create.html', equipments=equipments)
 
+@session.route('/sessions/emploi-du-temps', methods=['GET', 'POST'])
+@login_required
+def import_timetable_view():
+    """Importer un emploi du temps (CSV ou iCalendar) : sessions planifiées créées d'avance"""
+    if current_user.role not in ['Admin', 'Enseignant']:
+        flash('Seuls les enseignants et administrateurs peuvent importer un emploi du temps.', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        upload = request.files.get('fichier')
+        if not upload or not upload.filename:
+            flash('Sélectionnez un fichier.', 'danger')
+            return redirect(url_for('session.import_timetable_view'))
+    
+        # Un enseignant importe son propre emploi du temps ; un admin celui de tous les enseignants
+        teacher_id = current_user.id if current_user.role == 'Enseignant' else None
+        try:
+            report = import_timetable(upload.read(), upload.filename, teacher_id=teacher_id, created_by=current_user.id)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('session.import_timetable_view'))
+    
+        flash(f"{report['creees']} session(s) planifiée(s), {report['existantes']} déjà importée(s), "
+              f"{report['passees']} créneau(x) passé(s) ignoré(s).", 'success' if report['creees'] else 'info')
+        for line, message in report['erreurs'][:20]:
+            flash(f'Ligne {line} : {message}', 'warning')
+        if len(report['erreurs']) > 20:
+            flash(f"{len(report['erreurs']) - 20} autre(s) erreur(s) non affichée(s).", 'warning')
+        return redirect(url_for('session.list_sessions'))
+    
+    return render_template('session/timetable.html')
+
 @session.route('/sessions/<session_id>')
 @login_required
 def view_session(session_id):
     session_obj = Session.query.get_or_404(session_id)
     
     # Vérifier les permissions
-    if current_user.role == 'Etudiant' and not LogScan.query.filter_by(session_id=session_id, user_id_etudiant=current_user.id).first():
+    if current_user.role == 'Etudiant' and not session_scans(session_obj, user_id=current_user.id):
         flash('Vous n\'avez pas accès à cette session.', 'danger')
         return redirect(url_for('session.list_sessions'))
     
-    # Récupérer les logs de scan pour cette session
-    logs = LogScan.query.filter_by(session_id=session_id).order_by(LogScan.timestamp_scan).all()
+    # Récupérer les scans de cette session (éventuellement archivés) et les noms des étudiants en un lot
+    scans = session_scans(session_obj)
+    students = get_user_backend().get_users_by_ids({scan.user_id_etudiant for scan in scans})
+    logs = []
+    for scan in scans:
+        student = students.get(scan.user_id_etudiant.lower())
+        logs.append({
+            'timestamp_scan': scan.timestamp_scan,
+            'nom_etudiant': student['nom_complet'] if student else scan.user_id_etudiant
+        })
+    
+    # QR code de la session (jeton signé tournant) : jamais montré aux étudiants
+    scan_token = make_session_token(session_obj) if current_user.role != 'Etudiant' else None
     
     return render_template('session/view.html', 
                           session=session_obj, 
+                          scan_token=scan_token,
                           logs=logs,
                           equipment=session_obj.equipement,
                           teacher=session_obj.enseignant)
@@ -103,26 +163,28 @@ def show_qr_code(session_id):
         flash("Vous n'avez pas accès à cette fonctionnalité.", 'danger')
         return redirect(url_for('main.dashboard'))
     
-    # Générer le QR code pour la session
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(session_obj.qr_code_dynamique_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer)
-    buffer.seek(0)
-    
-    qr_code_image = base64.b64encode(buffer.getvalue()).decode()
+    # QR code tournant : un nouveau jeton signé par période, sans écriture en base
+    qr_code_image = base64.b64encode(qr_code_png(make_session_token(session_obj))).decode()
     
     return render_template('session/qr_code.html', 
                           session=session_obj,
-                          qr_code_image=qr_code_image)
+                          qr_code_image=qr_code_image,
+                          rotation_seconds=rotation_seconds())
+
+@session.route('/sessions/<session_id>/qr-code/refresh')
+@login_required
+def refresh_qr_code(session_id):
+    """Retourne le QR code de la période en cours (rafraîchissement de l'affichage)"""
+    if current_user.role == 'Etudiant':
+        return jsonify({'success': False, 'message': "Vous n'avez pas accès à cette fonctionnalité."}), 403
+    
+    session_obj = Session.query.get_or_404(session_id)
+    return jsonify({
+        'success': True,
+        'actif': session_obj.actif,
+        'planifiee': session_obj.planifiee,
+        'qr_code_image': base64.b64encode(qr_code_png(make_session_token(session_obj))).decode()
+    })
 
 @session.route('/sessions/<session_id>/qr-code/download')
 @login_required
@@ -135,20 +197,8 @@ def download_qr_code(session_id):
         flash("Vous n'avez pas accès à cette fonctionnalité.", 'danger')
         return redirect(url_for('main.dashboard'))
     
-    # Générer le QR code pour la session
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(session_obj.qr_code_dynamique_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
+    # QR code imprimable : jeton fixe, valable jusqu'à l'expiration de la session
+    buffer = BytesIO(qr_code_png(make_session_token(session_obj, rotating=False)))
     
     response = make_response(send_file(
         buffer,
@@ -179,79 +229,67 @@ def close_session(session_id):
     session_obj.timestamp_fin = datetime.utcnow()
     db.session.commit()
     
+    # Invalider l'état mis en cache pour cette session
+    get_session_scheduler().notify_closed([session_obj.id])
+    
     flash(f'La session "{session_obj.nom_session}" a été fermée avec succès.', 'success')
     return redirect(url_for('session.view_session', session_id=session_id))
 
-@session.route('/api/scan', methods=['POST'])
-def api_scan():
-    """API endpoint pour enregistrer un scan de QR code"""
-    qr_data = request.json.get('qr_data')
-    user_id = request.json.get('user_id')
-    
-    if not qr_data or not user_id:
-        return jsonify({'success': False, 'message': 'Données manquantes'}), 400
-    
-    # Vérifier si l'utilisateur existe
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'success': False, 'message': 'Utilisateur non trouvé'}), 404
-    
-    # Déterminer si c'est un QR code statique (équipement) ou dynamique (session)
-    if qr_data.startswith('SESSION_'):
-        # C'est un scan de session par un étudiant
-        session = Session.query.filter_by(qr_code_dynamique_data=qr_data).first()
-        if not session:
-            return jsonify({'success': False, 'message': 'Session non trouvée'}), 404
-        
-        # Vérifier si l'étudiant a déjà scanné cette session
-        existing_log = LogScan.query.filter_by(session_id=session.id, user_id_etudiant=user_id).first()
-        if existing_log:
-            return jsonify({'success': False, 'message': 'Vous avez déjà scanné cette session'}), 400
-        
-        # Enregistrer le scan
-        log = LogScan(
-            session_id=session.id,
-            user_id_etudiant=user_id
-        )
-        db.session.add(log)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True, 
-            'message': 'Scan enregistré avec succès',
-            'session_info': {
-                'id': session.id,
-                'equipment': session.equipement.type_equipement,
-                'room': session.equipement.nom_salle,
-                'teacher': session.enseignant.nom_complet
-            }
-        })
+def _course_matrix():
+    """Matrice de présence du cours demandé (quadrimestre, équipement ; enseignant pour les admins)"""
+    term = request.args.get('quadrimestre') or term_for(datetime.utcnow())
+    equipment_id = request.args.get('equipement') or None
+    teacher_id = current_user.id if current_user.role == 'Enseignant' else request.args.get('enseignant') or None
+    
+    matrix = build_attendance_matrix(teacher_id=teacher_id, term=term, equipment_id=equipment_id)
+    users = get_user_backend().get_users_by_ids(matrix.students)
+    names = {student_id: users[student_id.lower()]['nom_complet']
+             for student_id in matrix.students if student_id.lower() in users}
+    return matrix, names, term, equipment_id
+
+@session.route('/sessions/presences')
+@login_required
+def attendance_report():
+    """Rapport de présence d'un cours : taux par étudiant, séries d'absences et participation par session"""
+    if current_user.role not in ['Admin', 'Enseignant']:
+        flash("Vous n'avez pas accès à cette fonctionnalité.", 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    try:
+        matrix, names, term, equipment_id = _course_matrix()
+    except ValueError:
+        flash('Quadrimestre invalide.', 'danger')
+        return redirect(url_for('session.attendance_report'))
+    
+    return render_template('session/attendance.html',
+                          report=attendance_summary(matrix, names),
+                          term=term,
+                          terms=recent_terms(),
+                          equipment_id=equipment_id,
+                          equipments=Equipment.query.order_by(Equipment.id).all())
+
+@session.route('/sessions/presences/export.<fmt>')
+@login_required
+def export_attendance(fmt):
+    """Exporter la grille de présence (CSV ou XLSX), envoyée en flux"""
+    if current_user.role not in ['Admin', 'Enseignant']:
+        flash("Vous n'avez pas accès à cette fonctionnalité.", 'danger')
+        return redirect(url_for('main.dashboard'))
+    if fmt not in ('csv', 'xlsx'):
+        return jsonify({'success': False, 'message': 'Format inconnu (csv ou xlsx).'}), 404
+    
+    try:
+        matrix, names, term, equipment_id = _course_matrix()
+    except ValueError:
+        flash('Quadrimestre invalide.', 'danger')
+        return redirect(url_for('session.attendance_report'))
+    
+    filename = f"presences_{term}{'_' + equipment_id if equipment_id else ''}.{fmt}"
+    if fmt == 'csv':
+        body, mimetype = stream_csv(grid_rows(matrix, names)), 'text/csv'
     else:
-        # C'est un scan d'équipement par un enseignant
-        if user.role not in ['Admin', 'Enseignant']:
-            return jsonify({'success': False, 'message': 'Seuls les enseignants peuvent scanner des équipements'}), 403
-        
-        equipment = Equipment.query.filter_by(qr_code_statique_data=qr_data).first()
-        if not equipment:
-            return jsonify({'success': False, 'message': 'Équipement non trouvé'}), 404
-        
-        # Créer une nouvelle session
-        session_id = str(uuid.uuid4())
-        qr_code_data = f"SESSION_{session_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-        
-        new_session = Session(
-            id=session_id,
-            user_id_enseignant=user_id,
-            equipment_id=equipment.id,
-            qr_code_dynamique_data=qr_code_data
-        )
-        
-        db.session.add(new_session)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True, 
-            'message': 'Session créée avec succès',
-            'session_id': session_id,
-            'qr_code_data': qr_code_data
-        })
+        body = stream_xlsx(grid_rows(matrix, names), sheet_name=f'Présences {term}')
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
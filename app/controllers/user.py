@@ -1,11 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models import User
 from app import db
-from app.services.auth_service import AuthService
+from app.services.user_backend import get_user_backend
 
 user = Blueprint('user', __name__)
-auth_service = AuthService()
+auth_service = get_user_backend()
 
 @user.route('/users')
 @login_required
@@ -15,13 +15,13 @@ def list_users():
         flash("Vous n'avez pas les droits pour accéder à cette page.", 'danger')
         return redirect(url_for('main.dashboard'))
     
-    # Récupérer tous les utilisateurs
-    users = auth_service.get_users(force_refresh=True)
+    # Recherche et pagination côté serveur (triés par rôle puis par nom)
+    query = request.args.get('q', '')
+    role = request.args.get('role') or None
+    results = auth_service.search_users(query, role=role, page=request.args.get('page', 1, type=int),
+                                        per_page=current_app.config['SEARCH_PAGE_SIZE'])
     
-    # Trier les utilisateurs par rôle puis par nom
-    users.sort(key=lambda x: (x['role'] != 'Admin', x['role'] != 'Enseignant', x['role'] != 'Etudiant', x['nom_complet']))
-    
-    return render_template('user/list.html', users=users)
+    return render_template('user/list.html', users=results['items'], results=results, q=query, role=role)
 
 @user.route('/users/create', methods=['GET', 'POST'])
 @login_required
@@ -140,6 +140,24 @@ def api_list_users():
     
     return jsonify({'success': True, 'users': users})
 
+@user.route('/api/users/search', methods=['GET'])
+@login_required
+def api_search_users():
+    """Recherche d'utilisateurs par préfixe du nom ou de l'email, résultats paginés"""
+    if current_user.role not in ['Admin', 'Enseignant']:
+        return jsonify({'success': False, 'message': "Accès non autorisé"}), 403
+    
+    results = auth_service.search_users(request.args.get('q', ''), role=request.args.get('role') or None,
+                                        page=request.args.get('page', 1, type=int),
+                                        per_page=current_app.config['SEARCH_PAGE_SIZE'])
+    return jsonify({
+        'success': True,
+        'total': results['total'],
+        'page': results['page'],
+        'pages': results['pages'],
+        'users': [{'id': u['id'], 'nom_complet': u['nom_complet'], 'role': u['role']} for u in results['items']]
+    })
+
 @user.route('/api/users/<role>', methods=['GET'])
 @login_required
 def api_list_users_by_role(role):
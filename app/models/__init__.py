@@ -1,7 +1,9 @@
-from app.models.user import User
+from app.models.user import User, UserStoreVersion
 from app.models.equipment import Equipment
 from app.models.session import Session
 from app.models.log_scan import LogScan
+from app.models.attendance_partition import AttendancePartition
+from app.models.job import Job
 
 # Exporter tous les modèles pour faciliter l'importation
-__all__ = ['User', 'Equipment', 'Session', 'LogScan']
+__all__ = ['User', 'UserStoreVersion', 'Equipment', 'Session', 'LogScan', 'AttendancePartition', 'Job']
@@ -0,0 +1,16 @@
+from app import db
+
+class AttendancePartition(db.Model):
+    """Quadrimestre dont les scans ont été déplacés vers une table d'archive"""
+    __tablename__ = 'attendance_partitions'
+    
+    term = db.Column(db.String(20), primary_key=True)  # ex: '2023-2024-Q1'
+    table_name = db.Column(db.String(64), unique=True, nullable=False)
+    timestamp_debut = db.Column(db.DateTime, nullable=False)  # Bornes [début, fin[ du quadrimestre
+    timestamp_fin = db.Column(db.DateTime, nullable=False)
+    statut = db.Column(db.String(20), nullable=False, default='archivage')  # archivage, archive
+    nb_scans = db.Column(db.Integer, nullable=False, default=0)
+    archive_le = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<AttendancePartition {self.term}: {self.statut} ({self.nb_scans} scans)>'
@@ -0,0 +1,34 @@
+from app import db
+from datetime import datetime
+import uuid
+
+class Job(db.Model):
+    """Tâche de fond exécutée par `flask jobs worker`"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Prochaine tâche à exécuter (file d'attente) et tâches bloquées
+        db.Index('ix_jobs_statut_execute_apres', 'statut', 'execute_apres'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=True)  # JSON
+    statut = db.Column(db.String(20), nullable=False, default='en_attente')  # en_attente, en_cours, termine, echec, annule
+    avancement = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.String(255), nullable=True)
+    resultat = db.Column(db.Text, nullable=True)  # JSON
+    erreur = db.Column(db.Text, nullable=True)
+    tentatives = db.Column(db.Integer, nullable=False, default=0)
+    max_tentatives = db.Column(db.Integer, nullable=False, default=3)
+    annulation_demandee = db.Column(db.Boolean, nullable=False, default=False)
+    worker = db.Column(db.String(100), nullable=True)
+    cree_par = db.Column(db.String(50), nullable=True)
+    timestamp_creation = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    execute_apres = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Report après un échec
+    timestamp_debut = db.Column(db.DateTime, nullable=True)
+    timestamp_fin = db.Column(db.DateTime, nullable=True)
+    timestamp_heartbeat = db.Column(db.DateTime, nullable=True)  # Dernier signe de vie du worker
+    
+    def __repr__(self):
+        return f'<Job {self.id}: {self.type} ({self.statut})>'
@@ -4,6 +4,14 @@ import uuid
 
 class LogScan(db.Model):
     __tablename__ = 'logs_scans_etudiants'
+    __table_args__ = (
+        # Historique d'un étudiant (tableau de bord, historique paginé) : l'ordre
+        # (timestamp_scan, id) est celui de la pagination par curseur, et
+        # session_id est inclus pour que l'index couvre la requête
+        db.Index('ix_logs_scans_etudiant_historique_id', 'user_id_etudiant', 'timestamp_scan', 'id', 'session_id'),
+        # Scans d'une session (vue de session, dédoublonnage)
+        db.Index('ix_logs_scans_session_timestamp', 'session_id', 'timestamp_scan'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))  # LogID
     timestamp_scan = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
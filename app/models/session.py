@@ -4,15 +4,31 @@ import uuid
 
 class Session(db.Model):
     __tablename__ = 'sessions'
+    __table_args__ = (
+        # Rattrapage des sessions expirées (ordonnanceur de fermeture automatique)
+        db.Index('ix_sessions_actif_expiration', 'actif', 'timestamp_expiration'),
+        # Recherche de la session active d'un enseignant sur un équipement
+        db.Index('ix_sessions_actif_equipment_enseignant', 'actif', 'equipment_id', 'user_id_enseignant'),
+        # Au plus une session active par enseignant et par équipement (index partiel)
+        db.Index('ux_sessions_actif_equipment_enseignant', 'equipment_id', 'user_id_enseignant', unique=True,
+                 sqlite_where=db.text('actif'), postgresql_where=db.text('actif')),
+        # Clés d'idempotence fournies par le client lors de la création
+        db.Index('ux_sessions_enseignant_cle_idempotence', 'user_id_enseignant', 'cle_idempotence', unique=True),
+        # Activation des sessions planifiées (emploi du temps) à leur heure de début
+        db.Index('ix_sessions_planifiee_debut', 'planifiee', 'timestamp_debut'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))  # SessionID
     nom_session = db.Column(db.String(100), nullable=True)
     timestamp_debut = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     timestamp_fin = db.Column(db.DateTime, nullable=True)  # Timestamp de fin de session
+    timestamp_expiration = db.Column(db.DateTime, nullable=True)  # Fermeture automatique prévue
     user_id_enseignant = db.Column(db.String(50), db.ForeignKey('users.id'), nullable=False)
     equipment_id = db.Column(db.String(20), db.ForeignKey('equipments.id'), nullable=False)
     qr_code_dynamique_data = db.Column(db.String(250), unique=True, nullable=False)  # Augmenté à 250 caractères
     actif = db.Column(db.Boolean, default=True)
+    cle_idempotence = db.Column(db.String(64), nullable=True)  # Clé Idempotency-Key du client
+    planifiee = db.Column(db.Boolean, default=False, nullable=False)  # Créée d'avance, activée au début du créneau
     
     # Relations
     logs = db.relationship('LogScan', backref='session', lazy=True)
@@ -4,22 +4,39 @@ from datetime import datetime
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Listes filtrées par rôle et triées par nom (annuaires, rosters)
+        db.Index('ix_users_role_nom_complet', 'role', 'nom_complet'),
+    )
     
-    id = db.Column(db.String(50), primary_key=True)  # UserID (email)
+    id = db.Column(db.String(50), primary_key=True)  # UserID (email, en minuscules)
     nom_complet = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # Enseignant, Etudiant, Admin
+    password_hash = db.Column(db.String(256), nullable=True)  # Utilisé par le backend SQL
     
     # Relations
     sessions = db.relationship('Session', backref='enseignant', lazy=True, foreign_keys='Session.user_id_enseignant')
     logs = db.relationship('LogScan', backref='etudiant', lazy=True)
     
-    def __init__(self, id, nom_complet, role):
+    def __init__(self, id, nom_complet, role, password_hash=None):
         self.id = id
         self.nom_complet = nom_complet
         self.role = role
+        self.password_hash = password_hash
     
     def __repr__(self):
         return f'<User {self.nom_complet}>'
 
-# Note: La fonction load_user est maintenant définie dans le contrôleur auth.py
-# pour utiliser le service d'authentification Google Sheets
+class UserStoreVersion(db.Model):
+    """Version du stockage des utilisateurs (ligne unique), incrémentée à chaque modification
+
+    Les identités mises en cache dans les sessions signées sont étiquetées
+    avec cette version : un changement de rôle ou une suppression les invalide.
+    """
+    __tablename__ = 'user_store_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# Note: La fonction load_user est définie dans le contrôleur auth.py
+# et passe par le backend d'utilisateurs configuré (voir app/services/user_backend.py)
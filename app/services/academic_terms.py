@@ -0,0 +1,50 @@
+from datetime import datetime
+
+# Une année académique commence en septembre ; le premier quadrimestre
+# couvre septembre-janvier, le second février-août (sessions d'examens comprises).
+Q1_START_MONTH = 9
+Q2_START_MONTH = 2
+
+
+def term_for(timestamp):
+    """Retourne la clé du quadrimestre d'une date, ex: '2024-2025-Q1'"""
+    if timestamp.month >= Q1_START_MONTH:
+        return f"{timestamp.year}-{timestamp.year + 1}-Q1"
+    if timestamp.month >= Q2_START_MONTH:
+        return f"{timestamp.year - 1}-{timestamp.year}-Q2"
+    return f"{timestamp.year - 1}-{timestamp.year}-Q1"
+
+
+def term_bounds(term):
+    """Retourne les bornes [début, fin[ d'un quadrimestre à partir de sa clé
+
+    Lève ValueError si la clé n'est pas au format 'AAAA-AAAA-Q1' ou 'AAAA-AAAA-Q2'.
+    """
+    try:
+        start_year, end_year, quadrimestre = term.split('-')
+        start_year, end_year = int(start_year), int(end_year)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Quadrimestre invalide : {term}")
+
+    if end_year != start_year + 1 or quadrimestre not in ('Q1', 'Q2'):
+        raise ValueError(f"Quadrimestre invalide : {term}")
+
+    if quadrimestre == 'Q1':
+        return datetime(start_year, Q1_START_MONTH, 1), datetime(end_year, Q2_START_MONTH, 1)
+    return datetime(end_year, Q2_START_MONTH, 1), datetime(end_year, Q1_START_MONTH, 1)
+
+
+def previous_term(term):
+    """Retourne la clé du quadrimestre précédent"""
+    start_year, end_year, quadrimestre = term.split('-')
+    if quadrimestre == 'Q2':
+        return f"{start_year}-{end_year}-Q1"
+    return f"{int(start_year) - 1}-{start_year}-Q2"
+
+
+def recent_terms(count=6, now=None):
+    """Retourne les clés des derniers quadrimestres, du plus récent au plus ancien"""
+    terms = [term_for(now or datetime.utcnow())]
+    while len(terms) < count:
+        terms.append(previous_term(terms[-1]))
+    return terms
@@ -0,0 +1,285 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+from flask import current_app, url_for
+
+try:
+    import rcssmin
+except ImportError:  # Dépendance optionnelle : minification intégrée, plus prudente
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Bibliothèques tierces, versions figées ; copies locales dans vendor/
+VENDOR = {
+    'bootstrap.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'bootstrap.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'fontawesome.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css',
+    'html5-qrcode.js': 'https://unpkg.com/html5-qrcode@2.3.8/html5-qrcode.min.js'
+}
+
+# Bundles produits dans app/static/dist : « vendor:<nom> » ou chemin sous app/static
+BUNDLES = {
+    'app.css': ['vendor:bootstrap.css', 'vendor:fontawesome.css', 'css/style.css'],
+    'app.js': ['vendor:bootstrap.js', 'js/main.js'],
+    # Chargé à la demande par les pages de scan uniquement
+    'scanner.js': ['vendor:html5-qrcode.js', 'js/scan-queue.js']
+}
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_VENDOR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'vendor')
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP = re.compile(r'^\s*(//[#@] sourceMappingURL=.*|/\*[#@] sourceMappingURL=.*?\*/)\s*$', re.MULTILINE)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_SPACES = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+
+_manifests = {}
+
+
+def content_hash(data):
+    return hashlib.md5(data).hexdigest()[:10]
+
+
+def hashed_name(path, data):
+    """app.css → app.<empreinte>.css"""
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{content_hash(data)}{ext}'
+
+
+# Minification
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = _CSS_COMMENT.sub('', text)
+    text = _CSS_SPACES.sub(' ', text)
+    return _CSS_PUNCTUATION.sub(r'\1', text).strip()
+
+
+def minify_js(text):
+    """Minifie un script local
+
+    Sans rjsmin, seuls l'indentation, les lignes vides et les lignes de
+    commentaire sont retirées : aucune analyse syntaxique n'est nécessaire.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+# Copies locales des bibliothèques tierces
+
+def vendor_path(url, vendor_dir):
+    parsed = urlparse(url)
+    return os.path.join(vendor_dir, parsed.netloc, *parsed.path.lstrip('/').split('/'))
+
+
+def fetch_vendor(url, vendor_dir, offline=False):
+    """Retourne le contenu d'un fichier tiers, téléchargé une seule fois dans vendor_dir"""
+    path = vendor_path(url, vendor_dir)
+    if not os.path.exists(path):
+        if offline:
+            raise RuntimeError(f"Fichier tiers absent de {vendor_dir} (mode hors ligne) : {url}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _copy_css_resources(css, source_url, dist_dir, vendor_dir, offline):
+    """Copie les polices et images référencées par une feuille tierce et réécrit les url()"""
+    def replace(match):
+        target = match.group(2)
+        if target.startswith(('data:', '#')) or urlparse(target).scheme:
+            return match.group(0)
+        resource_url = urljoin(source_url, target.split('?')[0].split('#')[0])
+        data = fetch_vendor(resource_url, vendor_dir, offline)
+        name = posixpath.join('resources', hashed_name(posixpath.basename(urlparse(resource_url).path), data))
+        path = os.path.join(dist_dir, *name.split('/'))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        return f'url({name})'
+
+    return _CSS_URL.sub(replace, css)
+
+
+# Construction
+
+def build_assets(static_folder, vendor_dir=DEFAULT_VENDOR_DIR, offline=False, bundles=None):
+    """Construit les bundles minifiés et nommés par empreinte dans <static>/dist
+
+    Les bibliothèques tierces sont lues dans vendor_dir (téléchargées au
+    premier build si besoin) ; les fichiers locaux sont minifiés. Retourne le
+    manifeste {bundle: chemin sous static}, aussi écrit dans dist/manifest.json.
+    """
+    bundles = bundles or BUNDLES
+    dist_dir = os.path.join(static_folder, DIST_DIR)
+    if os.path.exists(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    for name, sources in bundles.items():
+        is_css = name.endswith('.css')
+        parts = []
+        for source in sources:
+            if source.startswith('vendor:'):
+                url = VENDOR[source[len('vendor:'):]]
+                text = _SOURCE_MAP.sub('', fetch_vendor(url, vendor_dir, offline).decode('utf-8'))
+                if is_css:
+                    text = _copy_css_resources(text, url, dist_dir, vendor_dir, offline)
+            else:
+                with open(os.path.join(static_folder, *source.split('/')), encoding='utf-8') as f:
+                    text = f.read()
+                text = minify_css(text) if is_css else minify_js(text)
+            parts.append(text.strip())
+
+        # Le « ; » isole les scripts dont la dernière instruction n'est pas terminée
+        data = ('\n' if is_css else '\n;\n').join(parts).encode('utf-8') + b'\n'
+        filename = hashed_name(name, data)
+        with open(os.path.join(dist_dir, filename), 'wb') as f:
+            f.write(data)
+        manifest[name] = posixpath.join(DIST_DIR, filename)
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    _manifests.clear()
+    return manifest
+
+
+def load_manifest(static_folder):
+    """Manifeste des bundles construits (vide si build_static.py n'a pas été lancé)"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _manifests.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as f:
+        manifest = json.load(f)
+    _manifests[path] = (mtime, manifest)
+    return manifest
+
+
+def asset_urls(name):
+    """URL à charger pour un bundle (fonction globale des templates)
+
+    Avec un build : un seul fichier local. Sans build (développement) : les
+    sources du bundle, bibliothèques tierces depuis leur CDN.
+    """
+    manifest = load_manifest(current_app.static_folder)
+    if name in manifest:
+        return [url_for('static', filename=manifest[name])]
+    return [VENDOR[source[len('vendor:'):]] if source.startswith('vendor:') else url_for('static', filename=source)
+            for source in BUNDLES[name]]
+
+
+# Mesure de la première page
+
+class _PageResources(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.in_head = False
+        self.stylesheets = []
+        self.head_scripts = []
+        self.body_scripts = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'head':
+            self.in_head = True
+        elif tag == 'body':
+            self.in_head = False
+        elif tag == 'link' and attrs.get('rel') == 'stylesheet' and attrs.get('href'):
+            self.stylesheets.append(attrs['href'])
+        elif tag == 'script' and attrs.get('src'):
+            deferred = 'defer' in attrs or 'async' in attrs or attrs.get('type') == 'module'
+            (self.head_scripts if self.in_head and not deferred else self.body_scripts).append(attrs['src'])
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.in_head = False
+
+
+def _resource_sizes(app, urls):
+    sizes = {'raw': 0, 'gzip': 0, 'external': []}
+    static_prefix = app.static_url_path.rstrip('/') + '/'
+    for url in urls:
+        path = urlparse(url).path
+        if urlparse(url).netloc or not path.startswith(static_prefix):
+            sizes['external'].append(url)
+            continue
+        with open(os.path.join(app.static_folder, *path[len(static_prefix):].split('/')), 'rb') as f:
+            data = f.read()
+        sizes['raw'] += len(data)
+        sizes['gzip'] += len(gzip.compress(data, mtime=0))
+    return sizes
+
+
+def first_paint_report(app, path='/mobile-scan'):
+    """Octets à télécharger avant le premier affichage d'une page
+
+    Premier affichage : le document HTML, les feuilles de style et les
+    scripts bloquants du <head>. Les scripts de fin de page et le bundle du
+    scanner (chargé à la demande) sont mesurés à part. Les ressources
+    externes ne sont pas mesurées mais listées.
+    """
+    with app.test_client() as client:
+        response = client.get(path)
+        html = response.get_data()
+
+    parser = _PageResources()
+    parser.feed(html.decode('utf-8'))
+
+    blocking = _resource_sizes(app, parser.stylesheets + parser.head_scripts)
+    with app.test_request_context():
+        lazy_urls = asset_urls('scanner.js')
+    report = {
+        'path': path,
+        'html': {'raw': len(html), 'gzip': len(gzip.compress(html, mtime=0))},
+        'blocking': blocking,
+        'end_of_body': _resource_sizes(app, parser.body_scripts),
+        'lazy': _resource_sizes(app, lazy_urls)
+    }
+    report['first_paint'] = {
+        'raw': report['html']['raw'] + blocking['raw'],
+        'gzip': report['html']['gzip'] + blocking['gzip'],
+        'external_requests': len(blocking['external'])
+    }
+    return report
+
+
+def print_report(report, out=print):
+    def kib(size):
+        return f"{size / 1024:.1f} Kio"
+
+    out(f"Premier affichage de {report['path']} : {kib(report['first_paint']['raw'])} "
+        f"({kib(report['first_paint']['gzip'])} compressés), "
+        f"{report['first_paint']['external_requests']} requête(s) externe(s) bloquante(s)")
+    out(f"  HTML : {kib(report['html']['raw'])} ; CSS/JS bloquants : {kib(report['blocking']['raw'])}")
+    out(f"  Scripts de fin de page : {kib(report['end_of_body']['raw'])} ; "
+        f"scanner (à la demande) : {kib(report['lazy']['raw'])}")
+    for url in report['blocking']['external'] + report['end_of_body']['external'] + report['lazy']['external']:
+        out(f"  Externe : {url}")
@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import select, and_, or_
+from app import db
+from app.models import Session, Equipment
+from app.services.academic_terms import term_bounds
+from app.services.attendance_store import scan_source
+from app.services.user_backend import get_user_backend
+
+
+def encode_cursor(timestamp_scan, log_id):
+    """Construit le curseur de pagination (position du dernier scan affiché)"""
+    return f"{timestamp_scan.isoformat()}|{log_id}"
+
+
+def decode_cursor(cursor):
+    """Décode un curseur de pagination, retourne None s'il est invalide"""
+    try:
+        timestamp, log_id = cursor.split('|', 1)
+        return datetime.fromisoformat(timestamp), log_id
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_student_history(user_id, cursor=None, term=None, limit=20):
+    """Récupère une page de l'historique de présence d'un étudiant
+
+    Une seule requête jointe (scans, sessions, équipements) parcourt l'index
+    couvrant (user_id_etudiant, timestamp_scan, id, session_id) dans l'ordre
+    décroissant, sans lecture de la table des scans,
+    sur la table vivante et les archives des quadrimestres concernés ;
+    la pagination par curseur (keyset) garde un coût constant quelle que soit
+    la profondeur de la page. Les noms des enseignants sont chargés en un lot.
+
+    Retourne un dictionnaire {'items': [...], 'next_cursor': str ou None}.
+    """
+    start, end = term_bounds(term) if term else (None, None)
+    scans = scan_source(start=start, end=end, user_id=user_id)
+
+    stmt = (
+        select(
+            scans.c.id,
+            scans.c.timestamp_scan,
+            scans.c.session_id,
+            Session.nom_session,
+            Session.user_id_enseignant,
+            Equipment.type_equipement,
+            Equipment.nom_salle
+        )
+        .join(Session, scans.c.session_id == Session.id)
+        .join(Equipment, Session.equipment_id == Equipment.id)
+        .order_by(scans.c.timestamp_scan.desc(), scans.c.id.desc())
+        .limit(limit + 1)
+    )
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        timestamp_scan, log_id = position
+        stmt = stmt.where(or_(
+            scans.c.timestamp_scan < timestamp_scan,
+            and_(scans.c.timestamp_scan == timestamp_scan, scans.c.id < log_id)
+        ))
+
+    rows = db.session.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    teachers = get_user_backend().get_users_by_ids({row.user_id_enseignant for row in rows})
+
+    items = []
+    for row in rows:
+        teacher = teachers.get(row.user_id_enseignant.lower())
+        items.append({
+            'id': row.id,
+            'timestamp_scan': row.timestamp_scan,
+            'session_id': row.session_id,
+            'nom_session': row.nom_session,
+            'type_equipement': row.type_equipement,
+            'nom_salle': row.nom_salle,
+            'nom_enseignant': teacher['nom_complet'] if teacher else row.user_id_enseignant
+        })
+
+    next_cursor = encode_cursor(rows[-1].timestamp_scan, rows[-1].id) if has_more else None
+
+    return {'items': items, 'next_cursor': next_cursor}
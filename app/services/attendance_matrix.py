@@ -0,0 +1,189 @@
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Session
+from app.services.academic_terms import term_bounds
+from app.services.attendance_store import scan_source
+
+# Scans lus par lot depuis le curseur (requête en flux)
+SCAN_CHUNK_SIZE = 10000
+
+
+class AttendanceMatrix:
+    """Matrice de présence creuse étudiants × sessions, au format CSR
+
+    La ligne i correspond à students[i], la colonne j à sessions[j] (ordre
+    chronologique). Les colonnes des sessions auxquelles l'étudiant i a
+    assisté sont indices[indptr[i]:indptr[i + 1]], triées. La mémoire est
+    proportionnelle au nombre de scans, pas à étudiants × sessions.
+    """
+
+    def __init__(self, students, sessions, indptr, indices):
+        self.students = students
+        self.sessions = sessions
+        self.indptr = indptr
+        self.indices = indices
+
+    @property
+    def shape(self):
+        return len(self.students), len(self.sessions)
+
+    def attended(self):
+        """Nombre de sessions suivies par étudiant"""
+        return np.diff(self.indptr)
+
+    def attendance_rates(self):
+        """Taux de présence par étudiant (sessions suivies / sessions du cours)"""
+        n_sessions = len(self.sessions)
+        return self.attended() / n_sessions if n_sessions else np.zeros(len(self.students))
+
+    def session_turnout(self):
+        """Nombre d'étudiants présents par session"""
+        return np.bincount(self.indices, minlength=len(self.sessions))
+
+    def absence_streaks(self):
+        """Plus longue série d'absences consécutives et série en cours, par étudiant
+
+        Les écarts entre colonnes successives d'une même ligne donnent les
+        absences entre deux présences ; le début de chaque ligne est compté
+        depuis la première session et la série en cours depuis la dernière
+        présence jusqu'à la dernière session.
+        """
+        n_students, n_sessions = self.shape
+        starts, ends = self.indptr[:-1], self.indptr[1:]
+        nonempty = ends > starts
+
+        previous = np.empty_like(self.indices)
+        previous[1:] = self.indices[:-1]
+        previous[starts[nonempty]] = -1
+        gaps = self.indices - previous - 1
+
+        longest = np.zeros(n_students, dtype=np.int64)
+        current = np.full(n_students, n_sessions, dtype=np.int64)
+        if len(self.indices):
+            longest[nonempty] = np.maximum.reduceat(gaps, starts[nonempty])
+            current[nonempty] = n_sessions - 1 - self.indices[ends[nonempty] - 1]
+        return np.maximum(longest, current), current
+
+    def row(self, i):
+        """Présences (booléens) de l'étudiant i, une ligne dense à la fois"""
+        present = np.zeros(len(self.sessions), dtype=bool)
+        present[self.indices[self.indptr[i]:self.indptr[i + 1]]] = True
+        return present
+
+
+def course_filters(teacher_id=None, term=None, equipment_id=None):
+    """Conditions sur les sessions d'un cours : enseignant, quadrimestre et équipement
+
+    Lève ValueError si le quadrimestre est invalide.
+    """
+    conditions = []
+    if teacher_id:
+        conditions.append(Session.user_id_enseignant == teacher_id)
+    if equipment_id:
+        conditions.append(Session.equipment_id == equipment_id)
+    if term:
+        start, end = term_bounds(term)
+        conditions += [Session.timestamp_debut >= start, Session.timestamp_debut < end]
+    return conditions
+
+
+def build_attendance_matrix(teacher_id=None, term=None, equipment_id=None):
+    """Construit la matrice de présence d'un cours à partir d'une requête en flux
+
+    Les sessions du cours sont chargées une fois (colonnes), puis les paires
+    (étudiant, session) sont lues par lots de SCAN_CHUNK_SIZE et converties
+    en indices par searchsorted ; la matrice CSR est assemblée par tri des
+    clés ligne × colonne (doublons éventuels éliminés).
+    """
+    conditions = course_filters(teacher_id, term, equipment_id)
+    sessions = db.session.execute(
+        select(Session.id, Session.timestamp_debut, Session.nom_session)
+        .where(*conditions)
+        .order_by(Session.timestamp_debut, Session.id)
+    ).all()
+    n_sessions = len(sessions)
+
+    session_ids = np.array([row.id for row in sessions], dtype=str)
+    order = np.argsort(session_ids, kind='stable')
+    sorted_ids = session_ids[order]
+
+    start, end = term_bounds(term) if term else (None, None)
+    scans = scan_source(start=start, end=end + timedelta(days=1) if end else None)
+    stmt = (
+        select(scans.c.user_id_etudiant, scans.c.session_id)
+        .join(Session, Session.id == scans.c.session_id)
+        .where(*conditions)
+        .execution_options(yield_per=SCAN_CHUNK_SIZE)
+    )
+
+    user_chunks, column_chunks = [], []
+    if n_sessions:
+        for chunk in db.session.connection().execute(stmt).partitions():
+            users, chunk_sessions = zip(*chunk)
+            positions = np.searchsorted(sorted_ids, np.array(chunk_sessions, dtype=str))
+            user_chunks.append(np.array(users, dtype=str))
+            column_chunks.append(order[positions])
+
+    if not user_chunks:
+        return AttendanceMatrix([], sessions, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    students, rows = np.unique(np.concatenate(user_chunks), return_inverse=True)
+    keys = np.unique(rows.astype(np.int64) * n_sessions + np.concatenate(column_chunks))
+    rows, indices = np.divmod(keys, n_sessions)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(students)))])
+
+    return AttendanceMatrix(students.tolist(), sessions, indptr, indices)
+
+
+def attendance_summary(matrix, names):
+    """Statistiques par étudiant (triées par nom) et par session"""
+    rates = matrix.attendance_rates()
+    attended = matrix.attended()
+    longest, current = matrix.absence_streaks()
+    turnout = matrix.session_turnout()
+    n_students = len(matrix.students)
+
+    students = [
+        {
+            'id': student_id,
+            'nom_complet': names.get(student_id, student_id),
+            'presences': int(attended[i]),
+            'taux_presence': round(float(rates[i]), 4),
+            'plus_longue_absence': int(longest[i]),
+            'absences_en_cours': int(current[i])
+        }
+        for i, student_id in enumerate(matrix.students)
+    ]
+    students.sort(key=lambda student: student['nom_complet'])
+
+    sessions = [
+        {
+            'id': session.id,
+            'timestamp_debut': session.timestamp_debut,
+            'nom_session': session.nom_session,
+            'presents': int(turnout[j]),
+            'taux_presence': round(float(turnout[j]) / n_students, 4) if n_students else 0.0
+        }
+        for j, session in enumerate(matrix.sessions)
+    ]
+    return {'etudiants': students, 'sessions': sessions}
+
+
+def grid_rows(matrix, names):
+    """Lignes de la grille de présence (export) : une ligne dense par étudiant, produite à la demande"""
+    yield (['Étudiant', 'Nom']
+           + [session.timestamp_debut.strftime('%d/%m/%Y %H:%M') for session in matrix.sessions]
+           + ['Présences', 'Taux (%)'])
+
+    rates = matrix.attendance_rates()
+    attended = matrix.attended()
+    marks = np.array(['A', 'P'])
+    for i in sorted(range(len(matrix.students)), key=lambda i: names.get(matrix.students[i], matrix.students[i])):
+        student_id = matrix.students[i]
+        yield ([student_id, names.get(student_id, student_id)]
+               + marks[matrix.row(i).astype(np.int64)].tolist()
+               + [int(attended[i]), round(float(rates[i]) * 100, 1)])
+
+    yield ['', 'Présents'] + matrix.session_turnout().tolist() + ['', '']
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Index, select, func, union_all, text, inspect
+from app import db
+from app.models import LogScan, Session, AttendancePartition
+from app.services.academic_terms import term_bounds
+
+# Les scans des quadrimestres clos sont déplacés de logs_scans_etudiants vers
+# une table d'archive par quadrimestre (logs_scans_archive_2023_2024_q1), dans
+# la même base : les jointures avec les sessions restent possibles et le
+# mécanisme fonctionne aussi bien sous SQLite que sous PostgreSQL. La table
+# vivante ne contient plus que les quadrimestres récents.
+ARCHIVE_PREFIX = 'logs_scans_archive_'
+ARCHIVE_CHUNK_SIZE = 5000
+SESSION_BATCH_SIZE = 100
+
+# Une session commence au plus tard la veille de ses derniers scans
+SESSION_MARGIN = timedelta(days=1)
+
+archive_metadata = MetaData()
+
+
+def archive_table_name(term):
+    """Nom de la table d'archive d'un quadrimestre"""
+    term_bounds(term)
+    return ARCHIVE_PREFIX + term.replace('-', '_').lower()
+
+
+def archive_table(term):
+    """Table d'archive d'un quadrimestre (mêmes colonnes que logs_scans_etudiants, sans clés étrangères)"""
+    name = archive_table_name(term)
+    if name in archive_metadata.tables:
+        return archive_metadata.tables[name]
+
+    return Table(
+        name, archive_metadata,
+        Column('id', String(36), primary_key=True),
+        Column('timestamp_scan', DateTime, nullable=False),
+        Column('session_id', String(36), nullable=False),
+        Column('user_id_etudiant', String(50), nullable=False),
+        Index(f'ix_{name}_etudiant_id', 'user_id_etudiant', 'timestamp_scan', 'id', 'session_id'),
+        Index(f'ix_{name}_session', 'session_id', 'timestamp_scan')
+    )
+
+
+def _partitions(start=None, end=None):
+    """Quadrimestres archivés (ou en cours d'archivage) qui recoupent [start, end["""
+    query = AttendancePartition.query
+    if start is not None:
+        query = query.filter(AttendancePartition.timestamp_fin > start)
+    if end is not None:
+        query = query.filter(AttendancePartition.timestamp_debut < end)
+    return query.order_by(AttendancePartition.timestamp_debut.desc()).all()
+
+
+def scan_source(start=None, end=None, user_id=None, session_ids=None):
+    """Source des scans pour une requête d'historique
+
+    Retourne la table vivante si aucune archive n'est concernée, sinon l'union
+    (UNION ALL) de la table vivante et des tables d'archive qui recoupent la
+    période. Les filtres sont appliqués dans chaque branche pour que chaque
+    table utilise ses propres index. Un quadrimestre entièrement archivé est
+    lu uniquement dans son archive.
+    """
+    live = LogScan.__table__
+    partitions = _partitions(start, end)
+
+    tables = [archive_table(partition.term) for partition in partitions]
+    covered = any(
+        partition.statut == 'archive' and start is not None and end is not None
+        and partition.timestamp_debut <= start and end <= partition.timestamp_fin
+        for partition in partitions
+    )
+    if not covered:
+        tables.insert(0, live)
+
+    def branch(table):
+        stmt = select(table.c.id, table.c.timestamp_scan, table.c.session_id, table.c.user_id_etudiant)
+        if start is not None:
+            stmt = stmt.where(table.c.timestamp_scan >= start)
+        if end is not None:
+            stmt = stmt.where(table.c.timestamp_scan < end)
+        if user_id is not None:
+            stmt = stmt.where(table.c.user_id_etudiant == user_id)
+        if session_ids is not None:
+            stmt = stmt.where(table.c.session_id.in_(session_ids))
+        return stmt
+
+    if len(tables) == 1:
+        return branch(tables[0]).subquery('scans')
+    return union_all(*[branch(table) for table in tables]).subquery('scans')
+
+
+def session_scans(session_obj, user_id=None):
+    """Scans d'une session, par ordre d'arrivée, quelle que soit leur partition"""
+    scans = scan_source(start=session_obj.timestamp_debut, user_id=user_id, session_ids=[session_obj.id])
+    stmt = select(scans).order_by(scans.c.timestamp_scan, scans.c.id)
+    return db.session.execute(stmt).all()
+
+
+def scan_counts(session_objs):
+    """Nombre de scans de chaque session, indexé par ID de session (une requête par lot)"""
+    if not session_objs:
+        return {}
+
+    start = min(session_obj.timestamp_debut for session_obj in session_objs)
+    scans = scan_source(start=start, session_ids=[session_obj.id for session_obj in session_objs])
+    stmt = select(scans.c.session_id, func.count()).group_by(scans.c.session_id)
+    return dict(db.session.execute(stmt).all())
+
+
+def archive_term(term, chunk_size=ARCHIVE_CHUNK_SIZE, now=None, out=print):
+    """Déplace les scans d'un quadrimestre clos vers sa table d'archive
+
+    Les scans sont déplacés par lots de chunk_size, chacun dans une
+    transaction courte (INSERT ... SELECT puis DELETE) : la table vivante
+    n'est jamais verrouillée longtemps et les lectures voient chaque scan
+    dans exactement une des deux tables. Les lots sont sélectionnés par
+    session via l'index (session_id, timestamp_scan). Une exécution
+    interrompue reprend là où elle s'était arrêtée.
+
+    Lève ValueError si le quadrimestre est invalide ou n'est pas terminé.
+    Retourne le nombre de scans déplacés par cette exécution.
+    """
+    start, end = term_bounds(term)
+    if end > (now or datetime.utcnow()):
+        raise ValueError(f"Le quadrimestre {term} n'est pas terminé")
+
+    engine = db.engine
+    live = LogScan.__table__
+    archive = archive_table(term)
+    archive.create(engine, checkfirst=True)
+
+    partition = db.session.get(AttendancePartition, term)
+    if partition is None:
+        partition = AttendancePartition(term=term, table_name=archive.name,
+                                        timestamp_debut=start, timestamp_fin=end)
+        db.session.add(partition)
+    partition.statut = 'archivage'
+    db.session.commit()
+
+    session_ids = db.session.execute(
+        select(Session.id).where(Session.timestamp_debut >= start - SESSION_MARGIN, Session.timestamp_debut < end)
+    ).scalars().all()
+    # Terminer la transaction de lecture avant les lots (verrous SQLite)
+    db.session.commit()
+
+    columns = [live.c.id, live.c.timestamp_scan, live.c.session_id, live.c.user_id_etudiant]
+    moved = 0
+    for i in range(0, len(session_ids), SESSION_BATCH_SIZE):
+        batch = session_ids[i:i + SESSION_BATCH_SIZE]
+        while True:
+            with engine.begin() as connection:
+                ids = connection.execute(
+                    select(live.c.id).where(
+                        live.c.session_id.in_(batch),
+                        live.c.timestamp_scan >= start,
+                        live.c.timestamp_scan < end
+                    ).limit(chunk_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                connection.execute(archive.insert().from_select(
+                    [column.name for column in columns], select(*columns).where(live.c.id.in_(ids))
+                ))
+                connection.execute(live.delete().where(live.c.id.in_(ids)))
+            moved += len(ids)
+            out(f"{term} : {moved} scan(s) archivé(s)...")
+
+    with engine.begin() as connection:
+        total = connection.execute(select(func.count()).select_from(archive)).scalar()
+        if engine.dialect.name == 'sqlite':
+            # Archive en lecture seule : toute modification est refusée
+            for operation in ('UPDATE', 'DELETE'):
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {archive.name}_no_{operation.lower()} "
+                    f"BEFORE {operation} ON {archive.name} "
+                    f"BEGIN SELECT RAISE(ABORT, 'archive en lecture seule'); END"
+                ))
+
+    partition = db.session.get(AttendancePartition, term)
+    partition.statut = 'archive'
+    partition.nb_scans = total
+    partition.archive_le = datetime.utcnow()
+    db.session.commit()
+
+    out(f"{term} : {total} scan(s) dans {archive.name}")
+    return moved
+
+
+def drop_archives():
+    """Supprime toutes les tables d'archive enregistrées (réinitialisation de la base)"""
+    engine = db.engine
+    if not inspect(engine).has_table(AttendancePartition.__tablename__):
+        return
+    for partition in AttendancePartition.query.all():
+        archive_table(partition.term).drop(engine, checkfirst=True)
+    db.session.query(AttendancePartition).delete()
+    db.session.commit()
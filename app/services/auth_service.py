@@ -2,10 +2,11 @@ import json
 import os
 from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
+from app.services.user_backend import UserBackend, build_test_users
 
 load_dotenv()
 
-class AuthService:
+class AuthService(UserBackend):
     """Service pour gérer l'authentification des utilisateurs via un fichier JSON local"""
     
     def __init__(self):
@@ -78,6 +79,11 @@ class AuthService:
         
         return None  # Utilisateur non trouvé
     
+    def get_users_by_ids(self, user_ids):
+        """Récupère plusieurs utilisateurs en un seul parcours de la liste, indexés par ID"""
+        wanted = {user_id.lower() for user_id in user_ids if user_id}
+        return {user['id'].lower(): user for user in self.get_users() if user['id'].lower() in wanted}
+    
     def create_user(self, email, nom_complet, role, password):
         """Crée un nouvel utilisateur"""
         # Vérifier si l'utilisateur existe déjà
@@ -109,6 +115,7 @@ class AuthService:
             
             # Rafraîchir le cache
             self._users_cache = users
+            self.version_changed()
             
             return True, "Utilisateur créé avec succès"
         except Exception as e:
@@ -143,6 +150,7 @@ class AuthService:
                     
                     # Rafraîchir le cache
                     self._users_cache = users
+                    self.version_changed()
                     
                     return True, "Utilisateur mis à jour avec succès"
                 except Exception as e:
@@ -172,6 +180,7 @@ class AuthService:
                     
                     # Rafraîchir le cache
                     self._users_cache = users
+                    self.version_changed()
                     
                     return True, "Utilisateur supprimé avec succès"
                 except Exception as e:
@@ -179,6 +188,14 @@ class AuthService:
         
         return False, "Utilisateur non trouvé"
     
+    def version(self):
+        """Version du fichier d'utilisateurs : date de modification et taille"""
+        try:
+            stat = os.stat(self.test_users_file)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    
     def get_users_by_role(self, role):
         """Récupère tous les utilisateurs ayant un rôle spécifique"""
         users = self.get_users()
@@ -186,18 +203,11 @@ class AuthService:
     
     def create_test_users_file(self):
         """Crée un fichier de test pour les utilisateurs"""
-        test_users = [
-            {"id": "admin@ecole.be", "nom_complet": "Administrateur", "role": "Admin", "password": "1234", "password_hash": generate_password_hash("1234")},
-            {"id": "prof1@ecole.be", "nom_complet": "Jean Dupont", "role": "Enseignant", "password": "1234", "password_hash": generate_password_hash("1234")},
-            {"id": "prof2@ecole.be", "nom_complet": "Marie Curie", "role": "Enseignant", "password": "1234", "password_hash": generate_password_hash("1234")},
-            {"id": "prof3@ecole.be", "nom_complet": "Albert Einstein", "role": "Enseignant", "password": "1234", "password_hash": generate_password_hash("1234")},
-            {"id": "etudiant1@ecole.be", "nom_complet": "Pierre Martin", "role": "Etudiant", "password": "1234", "password_hash": generate_password_hash("1234")},
-            {"id": "etudiant2@ecole.be", "nom_complet": "Sophie Dubois", "role": "Etudiant", "password": "1234", "password_hash": generate_password_hash("1234")},
-            {"id": "etudiant3@ecole.be", "nom_complet": "Lucas Bernard", "role": "Etudiant", "password": "1234", "password_hash": generate_password_hash("1234")}
-        ]
+        test_users = build_test_users()
         
         # Écrire les utilisateurs dans un fichier JSON
         with open(self.test_users_file, 'w') as f:
             json.dump(test_users, f, indent=4)
+        self.version_changed()
         
         return test_users
@@ -0,0 +1,232 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+from flask import current_app, request, session
+from flask_login import current_user
+from app.services.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : gzip seulement
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml'
+}
+# Un an : les URL des fichiers statiques changent avec leur contenu
+STATIC_IMMUTABLE_MAX_AGE = 31536000
+# Corps statiques compressés conservés en mémoire (clé : ETag, encodage)
+STATIC_COMPRESSED_MAX_ENTRIES = 128
+
+_static_hashes = {}
+
+
+def static_file_hash(path):
+    """Empreinte du contenu d'un fichier statique, recalculée si le fichier change"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.md5(f.read()).hexdigest()[:12]
+    _static_hashes[path] = (mtime, digest)
+    return digest
+
+
+def negotiate_encoding(accept_encoding):
+    """Choisit l'encodage de la réponse : br si disponible et accepté, sinon gzip"""
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class HttpCache:
+    """Cache des pages publiques, compression et empreintes des fichiers statiques
+
+    - les vues décorées par cache_page sont rendues une fois par worker pour
+      les visiteurs anonymes, puis servies depuis la mémoire pendant
+      RESPONSE_CACHE_TTL secondes (avec ETag et Cache-Control)
+    - les réponses HTML/JSON/CSS/JS de plus de COMPRESSION_MIN_SIZE octets
+      sont compressées (brotli si le module est installé, sinon gzip)
+    - url_for('static', ...) ajoute l'empreinte du fichier (?v=...) ; une URL
+      à jour est servie avec un cache d'un an
+    """
+
+    def __init__(self, app=None):
+        self._pages = {}
+        self._static_bodies = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('RESPONSE_CACHE_TTL', int(os.environ.get('RESPONSE_CACHE_TTL', 300)))
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 256)
+        app.config.setdefault('COMPRESSION_ENABLED', os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('COMPRESSION_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESSION_LEVEL', 6)
+        app.config.setdefault('STATIC_HASHED_URLS', True)
+
+        app.extensions['http_cache'] = self
+
+        if app.config['STATIC_HASHED_URLS']:
+            app.url_defaults(self._static_url_defaults)
+        app.after_request(self._after_request)
+
+    # Cache des pages
+
+    def get_page(self, key):
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] <= time.monotonic():
+                del self._pages[key]
+                return None
+            return entry
+
+    def store_page(self, key, response, ttl):
+        entry = {
+            'expires': time.monotonic() + ttl,
+            'body': response.get_data(),
+            'status': response.status_code,
+            'headers': [(name, value) for name, value in response.headers if name.lower() != 'content-length']
+        }
+        with self._lock:
+            self._pages.pop(key, None)
+            while len(self._pages) >= current_app.config['RESPONSE_CACHE_MAX_ENTRIES']:
+                self._pages.pop(next(iter(self._pages)))
+            self._pages[key] = entry
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._static_bodies.clear()
+
+    # Fichiers statiques
+
+    def _static_url_defaults(self, endpoint, values):
+        if endpoint != 'static' or 'filename' not in values or 'v' in values:
+            return
+        digest = static_file_hash(os.path.join(current_app.static_folder, values['filename']))
+        if digest:
+            values['v'] = digest
+
+    def _static_cache_headers(self, response):
+        version = request.args.get('v')
+        if not version or response.status_code not in (200, 304):
+            return
+        digest = static_file_hash(os.path.join(current_app.static_folder, request.view_args['filename']))
+        if version == digest:
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+
+    # Compression
+
+    def _compressed_body(self, response, encoding, level):
+        # Corps remplacé : la réponse doit fermer elle-même le fichier ouvert par send_file
+        response.direct_passthrough = False
+
+        # Les fichiers statiques ne sont compressés qu'une fois par version
+        key = response.get_etag()[0] if request.endpoint == 'static' else None
+        if key:
+            with self._lock:
+                body = self._static_bodies.get((key, encoding))
+            if body is not None:
+                close = getattr(response.response, 'close', None)
+                if close is not None:
+                    response.call_on_close(close)
+                return body
+
+        body = compress(response.get_data(), encoding, level)
+
+        if key:
+            with self._lock:
+                if len(self._static_bodies) >= STATIC_COMPRESSED_MAX_ENTRIES:
+                    self._static_bodies.pop(next(iter(self._static_bodies)))
+                self._static_bodies[(key, encoding)] = body
+        return body
+
+    def _compress(self, response):
+        config = current_app.config
+        # Les réponses en flux (générateurs) ne sont pas compressées ; les fichiers envoyés par send_file le sont
+        if (response.status_code != 200 or (response.is_streamed and not response.direct_passthrough)
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or (response.content_length or 0) < config['COMPRESSION_MIN_SIZE']):
+            return
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return
+
+        response.set_data(self._compressed_body(response, encoding, config['COMPRESSION_LEVEL']))
+        response.headers['Content-Encoding'] = encoding
+        # ETag faible : même ressource, octets différents selon l'encodage
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        metrics.inc('http_compressed_responses_total', help_text="Réponses compressées", encoding=encoding)
+
+    def _after_request(self, response):
+        if request.endpoint == 'static':
+            self._static_cache_headers(response)
+        if current_app.config['COMPRESSION_ENABLED'] and request.method != 'HEAD':
+            self._compress(response)
+        return response
+
+
+def cache_page(view):
+    """Décorateur des pages publiques : réponse mise en cache pour les visiteurs anonymes
+
+    Les utilisateurs connectés (barre de navigation personnalisée) et les
+    requêtes avec des messages flash en attente passent toujours par la vue.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        if (not config['RESPONSE_CACHE_ENABLED'] or request.method not in ('GET', 'HEAD')
+                or current_user.is_authenticated or '_flashes' in session):
+            return view(*args, **kwargs)
+
+        cache = current_app.extensions['http_cache']
+        key = request.full_path
+        entry = cache.get_page(key)
+        if entry is not None:
+            metrics.inc('response_cache_total', help_text="Consultations du cache des pages publiques",
+                        endpoint=request.endpoint, result='hit')
+            response = current_app.response_class(entry['body'], status=entry['status'], headers=entry['headers'])
+        else:
+            metrics.inc('response_cache_total', help_text="Consultations du cache des pages publiques",
+                        endpoint=request.endpoint, result='miss')
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or session.modified or response.is_streamed:
+                return response
+            ttl = config['RESPONSE_CACHE_TTL']
+            response.add_etag()
+            response.cache_control.public = True
+            response.cache_control.max_age = ttl
+            # La barre de navigation change après connexion (nouveau cookie de session)
+            response.vary.add('Cookie')
+            cache.store_page(key, response, ttl)
+
+        return response.make_conditional(request)
+    return wrapper
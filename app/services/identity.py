@@ -0,0 +1,87 @@
+import os
+from flask import current_app, session
+from flask_login import UserMixin
+from app.models import User
+from app.services.user_backend import get_user_backend
+
+# Identité de l'utilisateur connecté. En mode 'claims' (par défaut), les
+# données stockées à la connexion dans la session Flask (cookie signé avec
+# SECRET_KEY) suffisent à reconstruire current_user, sans consulter le
+# backend d'utilisateurs. Elles portent la version du stockage au moment
+# où elles ont été émises : après une modification (rôle, suppression...),
+# la version change, l'utilisateur est relu une fois et les données de la
+# session sont réémises. En mode 'store', l'utilisateur est relu à chaque
+# requête.
+
+# Compteurs d'origine des identités (tests, benchmarks)
+stats = {'claims': 0, 'store': 0}
+
+
+class SessionUser(UserMixin):
+    """Utilisateur courant reconstruit depuis la session signée (sans instance du modèle)"""
+
+    def __init__(self, id, nom_complet, role):
+        self.id = id
+        self.nom_complet = nom_complet
+        self.role = role
+
+    def __repr__(self):
+        return f'<SessionUser {self.nom_complet}>'
+
+
+def store_claims(user_data, version=None):
+    """Enregistre l'identité de l'utilisateur dans la session, avec la version du stockage"""
+    if version is None:
+        version = store_version()
+    session['user_data'] = {
+        'id': user_data['id'],
+        'nom_complet': user_data['nom_complet'],
+        'role': user_data['role'],
+        'version': version
+    }
+
+
+def store_version():
+    """Version du stockage des utilisateurs (relue au plus une fois par IDENTITY_VERSION_TTL)"""
+    return get_user_backend().cached_version(current_app.config['IDENTITY_VERSION_TTL'])
+
+
+def load_identity(user_id):
+    """Retourne l'utilisateur courant pour Flask-Login, ou None s'il n'existe plus"""
+    if current_app.config['IDENTITY_MODE'] != 'claims':
+        stats['store'] += 1
+        user_data = get_user_backend().get_user_by_id(user_id)
+        if user_data:
+            return User(id=user_data['id'], nom_complet=user_data['nom_complet'], role=user_data['role'])
+        return None
+
+    version = store_version()
+    claims = session.get('user_data')
+    if (claims and version is not None and claims.get('version') == version
+            and claims.get('id', '').lower() == user_id.lower()):
+        stats['claims'] += 1
+        return SessionUser(claims['id'], claims['nom_complet'], claims['role'])
+
+    # Données absentes (connexion par cookie « se souvenir de moi ») ou périmées
+    stats['store'] += 1
+    user_data = get_user_backend().get_user_by_id(user_id)
+    if user_data is None:
+        session.pop('user_data', None)
+        return None
+    store_claims(user_data, version)
+    return SessionUser(user_data['id'], user_data['nom_complet'], user_data['role'])
+
+
+class SignedIdentity:
+    """Configuration du chargement de l'utilisateur courant"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IDENTITY_MODE', os.environ.get('IDENTITY_MODE', 'claims').lower())
+        app.config.setdefault('IDENTITY_VERSION_TTL', float(os.environ.get('IDENTITY_VERSION_TTL', 2)))
+        if app.config['IDENTITY_MODE'] not in ('claims', 'store'):
+            raise ValueError(f"Mode d'identité inconnu : {app.config['IDENTITY_MODE']}")
+        app.extensions['signed_identity'] = self
@@ -0,0 +1,197 @@
+import cProfile
+import hmac
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from flask import abort, current_app, g, request, has_request_context, before_render_template, template_rendered, Response
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.services.metrics import metrics
+
+# Les listes IN (?, ?, ?) de tailles différentes ont la même forme
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+)\s*\)')
+_SPACES = re.compile(r'\s+')
+
+_engine_listeners_installed = False
+
+
+def statement_shape(statement):
+    """Normalise une requête SQL pour regrouper les exécutions identiques"""
+    return _IN_LIST.sub('(?)', _SPACES.sub(' ', statement).strip())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'instrumentation' in g:
+        conn.info.setdefault('instrumentation_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'instrumentation' in g):
+        return
+
+    starts = conn.info.get('instrumentation_start')
+    if not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+    state = g.instrumentation
+    state['sql_count'] += 1
+    state['sql_time'] += elapsed
+
+    shape = statement_shape(statement)
+    state['shapes'][shape] += 1
+    state['shape_times'][shape] += elapsed
+
+
+def _install_engine_listeners():
+    """Écoute toutes les connexions SQLAlchemy (une seule fois par processus)"""
+    global _engine_listeners_installed
+    if _engine_listeners_installed:
+        return
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _engine_listeners_installed = True
+
+
+class RequestInstrumentation:
+    """Instrumentation optionnelle des requêtes HTTP
+
+    Pour chaque requête : durée totale, temps de rendu des templates, nombre
+    et durée des requêtes SQL, et détection des N+1 (même forme de requête
+    répétée plus de INSTRUMENTATION_N_PLUS_ONE_THRESHOLD fois). Les métriques
+    sont exposées sur /metrics ; si l'en-tête INSTRUMENTATION_PROFILE_HEADER
+    est présent, un profil détaillé (JSON + cProfile) est écrit sur disque.
+    /metrics et le profilage sont réservés aux administrateurs connectés et
+    aux clients qui présentent le secret INSTRUMENTATION_TOKEN (en-tête
+    Authorization: Bearer pour /metrics, valeur de l'en-tête de profilage).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('INSTRUMENTATION_ENABLED', os.environ.get('INSTRUMENTATION_ENABLED', 'false').lower() == 'true')
+        app.config.setdefault('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', int(os.environ.get('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 5)))
+        app.config.setdefault('INSTRUMENTATION_PROFILE_HEADER', 'X-Profile')
+        app.config.setdefault('INSTRUMENTATION_PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('INSTRUMENTATION_TOKEN', os.environ.get('INSTRUMENTATION_TOKEN'))
+
+        app.extensions['instrumentation'] = self
+
+        if not app.config['INSTRUMENTATION_ENABLED']:
+            return
+
+        _install_engine_listeners()
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def metrics_view(self):
+        """Expose les métriques au format Prometheus"""
+        scheme, _, secret = request.headers.get('Authorization', '').partition(' ')
+        if not self._authorized(secret if scheme.lower() == 'bearer' else None):
+            abort(403)
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    def _before_request(self):
+        g.instrumentation = {
+            'start': time.perf_counter(),
+            'sql_count': 0,
+            'sql_time': 0.0,
+            'shapes': Counter(),
+            'shape_times': Counter(),
+            'render_time': 0.0,
+            'render_stack': [],
+            'profiler': None
+        }
+
+        secret = request.headers.get(current_app.config['INSTRUMENTATION_PROFILE_HEADER'])
+        if secret and self._authorized(secret):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            g.instrumentation['profiler'] = profiler
+
+    def _authorized(self, secret):
+        """Vrai si le secret présenté est INSTRUMENTATION_TOKEN, ou si un administrateur est connecté"""
+        token = current_app.config['INSTRUMENTATION_TOKEN']
+        if secret and token and hmac.compare_digest(secret.encode(), token.encode()):
+            return True
+        return current_user.is_authenticated and current_user.role == 'Admin'
+
+    def _before_render(self, sender, template, context, **extra):
+        if 'instrumentation' in g:
+            g.instrumentation['render_stack'].append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        if 'instrumentation' in g and g.instrumentation['render_stack']:
+            started = g.instrumentation['render_stack'].pop()
+            # Les templates imbriqués (include/extends) ne sont comptés qu'une fois
+            if not g.instrumentation['render_stack']:
+                g.instrumentation['render_time'] += time.perf_counter() - started
+
+    def _after_request(self, response):
+        state = g.pop('instrumentation', None)
+        if state is None:
+            return response
+
+        wall_time = time.perf_counter() - state['start']
+        endpoint = request.endpoint or 'inconnu'
+        threshold = current_app.config['INSTRUMENTATION_N_PLUS_ONE_THRESHOLD']
+        repeated = {shape: count for shape, count in state['shapes'].items() if count > threshold}
+
+        metrics.inc('http_requests_total', help_text="Nombre de requêtes HTTP",
+                    endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.observe('http_request_duration_seconds', wall_time, help_text="Durée des requêtes HTTP",
+                        endpoint=endpoint)
+        metrics.inc('template_render_seconds_total', state['render_time'], help_text="Temps de rendu des templates",
+                    endpoint=endpoint)
+        metrics.inc('sql_queries_total', state['sql_count'], help_text="Nombre de requêtes SQL",
+                    endpoint=endpoint)
+        metrics.inc('sql_query_duration_seconds_total', state['sql_time'], help_text="Durée cumulée des requêtes SQL",
+                    endpoint=endpoint)
+        if repeated:
+            metrics.inc('sql_n_plus_one_total', help_text="Requêtes HTTP présentant un motif N+1",
+                        endpoint=endpoint)
+            current_app.logger.warning(
+                "N+1 détecté sur %s : %s", endpoint,
+                '; '.join(f"{count}x {shape[:120]}" for shape, count in repeated.items())
+            )
+
+        if state['profiler'] is not None:
+            state['profiler'].disable()
+            self._write_profile(current_app, endpoint, wall_time, state, repeated)
+
+        return response
+
+    def _write_profile(self, app, endpoint, wall_time, state, repeated):
+        """Écrit le profil détaillé d'une requête échantillonnée"""
+        profile_dir = app.config['INSTRUMENTATION_PROFILE_DIR']
+        os.makedirs(profile_dir, exist_ok=True)
+        base_name = os.path.join(profile_dir, f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}_{endpoint.replace('.', '_')}")
+
+        state['profiler'].dump_stats(f"{base_name}.prof")
+
+        profile = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'wall_time': wall_time,
+            'render_time': state['render_time'],
+            'sql_count': state['sql_count'],
+            'sql_time': state['sql_time'],
+            'sql_statements': [
+                {'shape': shape, 'count': count, 'time': state['shape_times'][shape]}
+                for shape, count in state['shapes'].most_common()
+            ],
+            'n_plus_one': [{'shape': shape, 'count': count} for shape, count in repeated.items()]
+        }
+        with open(f"{base_name}.json", 'w') as f:
+            json.dump(profile, f, indent=2)
@@ -0,0 +1,115 @@
+import zipfile
+from datetime import datetime
+from sqlalchemy import select
+from app import db
+from app.models import Equipment
+from app.services.attendance_matrix import build_attendance_matrix, grid_rows
+from app.services.attendance_store import archive_term
+from app.services.jobs import boolean, choice, iso_date, job, positive_int, string_list
+from app.services.payload_migration import PayloadMigrationRunner
+from app.services.qr_code_migrations import qr_code_migrations
+from app.services.qr_images import cache_directory, purge_qr_cache, qr_code_png
+from app.services.session_scheduler import close_expired_sessions
+from app.services.spreadsheet import stream_csv, stream_xlsx
+from app.services.timetable import prerender_session_qr_codes
+from app.services.user_backend import get_user_backend
+from app.services.utilisation import utilisation_report
+
+# Types de tâches intégrés. Chaque tâche reçoit un JobContext et les
+# paramètres JSON de la tâche ; elle signale son avancement par
+# ctx.progress(), qui interrompt la tâche si son annulation est demandée.
+
+
+@job('fermeture_sessions')
+def close_sessions(ctx):
+    """Ferme les sessions expirées (rattrapage hors ordonnanceur)"""
+    closed_ids = close_expired_sessions()
+    ctx.progress(len(closed_ids), len(closed_ids), force=True)
+    return {'sessions_fermees': len(closed_ids)}
+
+
+@job('migration_qr_codes', params={'chunk_size': positive_int})
+def migrate_qr_codes(ctx, chunk_size=1000):
+    """Migre les données des QR codes (reprise au dernier lot validé après une interruption)"""
+    migrations = qr_code_migrations()
+    updated = {}
+    for i, migration in enumerate(migrations):
+        runner = PayloadMigrationRunner(chunk_size=chunk_size,
+                                        out=lambda message, i=i: ctx.progress(i, len(migrations), message))
+        updated[migration.name] = runner.run(migration)
+        ctx.progress(i + 1, len(migrations), f"[{migration.name}] terminé", force=True)
+    return updated
+
+
+@job('archivage_quadrimestre', params={'term': str, 'chunk_size': positive_int})
+def archive(ctx, term, chunk_size=5000):
+    """Archive les scans d'un quadrimestre clos"""
+    moved = archive_term(term, chunk_size=chunk_size, out=lambda message: ctx.progress(0, None, message))
+    ctx.progress(moved, moved, force=True)
+    return {'quadrimestre': term, 'scans_deplaces': moved}
+
+
+@job('analyse_utilisation', params={'debut': iso_date, 'fin': iso_date})
+def utilisation(ctx, debut=None, fin=None):
+    """Calcule le rapport d'utilisation des salles et des équipements"""
+    start = datetime.fromisoformat(debut) if debut else None
+    end = datetime.fromisoformat(fin) if fin else None
+    report = utilisation_report(start, end)
+    ctx.progress(1, 1, force=True)
+    return report
+
+
+@job('export_presences', params={'term': str, 'format': choice('csv', 'xlsx'), 'teacher_id': str,
+                                  'equipment_id': str})
+def export_attendance(ctx, term, format='xlsx', teacher_id=None, equipment_id=None):
+    """Écrit la grille de présence d'un cours dans un fichier téléchargeable"""
+    if format not in ('csv', 'xlsx'):
+        raise ValueError(f"Format inconnu : {format}")
+
+    matrix = build_attendance_matrix(teacher_id=teacher_id, term=term, equipment_id=equipment_id)
+    users = get_user_backend().get_users_by_ids(matrix.students)
+    names = {student_id: users[student_id.lower()]['nom_complet']
+             for student_id in matrix.students if student_id.lower() in users}
+    total = len(matrix.students)
+
+    def rows():
+        for i, row in enumerate(grid_rows(matrix, names)):
+            ctx.progress(i, total)
+            yield row
+
+    path = ctx.output_path(format)
+    if format == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(stream_csv(rows()))
+    else:
+        with open(path, 'wb') as f:
+            f.writelines(stream_xlsx(rows(), sheet_name=f'Présences {term}'))
+
+    ctx.progress(total, total, force=True)
+    return {'fichier': f'presences_{term}.{format}', 'etudiants': total, 'sessions': len(matrix.sessions)}
+
+
+@job('qr_codes_equipements')
+def equipment_qr_codes(ctx):
+    """Génère une archive ZIP des QR codes (PNG) de tous les équipements"""
+    equipments = db.session.execute(
+        select(Equipment.id, Equipment.qr_code_statique_data).order_by(Equipment.id)
+    ).all()
+    db.session.commit()
+
+    with zipfile.ZipFile(ctx.output_path('zip'), 'w') as archive_file:
+        for i, equipment in enumerate(equipments):
+            ctx.progress(i, len(equipments), equipment.id)
+            archive_file.writestr(f'{equipment.id}.png', qr_code_png(equipment.qr_code_statique_data))
+
+    ctx.progress(len(equipments), len(equipments), force=True)
+    return {'fichier': 'qr_codes_equipements.zip', 'equipements': len(equipments)}
+
+
+@job('prerendu_qr_sessions', params={'session_ids': string_list, 'purge': boolean})
+def prerender_qr_codes(ctx, session_ids, purge=False):
+    """Pré-rend les QR codes tournants du début des sessions planifiées (emploi du temps)"""
+    removed = purge_qr_cache(cache_directory()) if purge and cache_directory() else 0
+    written = prerender_session_qr_codes(session_ids, progress=ctx.progress)
+    ctx.progress(len(session_ids), len(session_ids), force=True)
+    return {'sessions': len(session_ids), 'images': written, 'images_purgees': removed}
@@ -0,0 +1,414 @@
+import inspect
+import json
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from multiprocessing.pool import ThreadPool
+from flask import current_app
+from sqlalchemy import select, update
+from app import db
+from app.models import Job
+
+# Tâches de fond : la file d'attente est la table `jobs` de la base de
+# l'application, sans courtier externe. Un worker réserve une tâche par un
+# UPDATE conditionnel (statut 'en_attente' → 'en_cours') : une seule écriture
+# réussit, même avec plusieurs commandes `flask jobs worker` concurrentes.
+JOBS = {}
+# Paramètres acceptés par type de tâche : nom → fonction de conversion
+JOB_PARAMS = {}
+
+ACTIVE_STATUSES = ('en_attente', 'en_cours')
+RETRY_DELAY_SECONDS = 30
+# Intervalle minimal entre deux écritures de l'avancement d'une tâche
+PROGRESS_INTERVAL = 1.0
+
+_worker_state = {}
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche dont l'annulation a été demandée"""
+
+
+def job(name, params=None):
+    """Décorateur qui enregistre une fonction comme type de tâche de fond
+
+    La fonction reçoit un JobContext puis les paramètres de la tâche, et
+    retourne un résultat sérialisable en JSON (ou None). params associe à
+    chaque paramètre accepté sa fonction de conversion (int, boolean,
+    string_list...) : enqueue() refuse les paramètres inconnus, manquants
+    ou invalides, et convertit les chaînes saisies dans un formulaire.
+    """
+    def decorator(fn):
+        JOBS[name] = fn
+        JOB_PARAMS[name] = dict(params or {})
+        return fn
+    return decorator
+
+
+def boolean(value):
+    """Conversion d'un paramètre booléen (true/false, oui/non, 1/0)"""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'vrai', 'oui', 'yes', 'on'):
+        return True
+    if text in ('0', 'false', 'faux', 'non', 'no', 'off'):
+        return False
+    raise ValueError(value)
+
+
+def positive_int(value):
+    """Conversion d'un entier strictement positif"""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    number = int(value)
+    if number < 1:
+        raise ValueError(value)
+    return number
+
+
+def string_list(value):
+    """Conversion d'une liste de chaînes (liste JSON ou valeurs séparées par des virgules)"""
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    raise ValueError(value)
+
+
+def iso_date(value):
+    """Date au format ISO (AAAA-MM-JJ), gardée sous forme de chaîne"""
+    datetime.fromisoformat(value)
+    return value
+
+
+def choice(*values):
+    """Conversion qui n'accepte que les valeurs données"""
+    def convert(value):
+        if value not in values:
+            raise ValueError(value)
+        return value
+    return convert
+
+
+def validate_params(job_type, params):
+    """Vérifie et convertit les paramètres d'une tâche selon le schéma de son type
+
+    Lève ValueError si un paramètre est inconnu, manquant ou invalide.
+    """
+    schema = JOB_PARAMS[job_type]
+    unknown = sorted(set(params) - set(schema))
+    if unknown:
+        raise ValueError(f"Paramètre(s) inconnu(s) pour {job_type} : {', '.join(unknown)}")
+
+    signature = list(inspect.signature(JOBS[job_type]).parameters.values())[1:]
+    missing = [p.name for p in signature if p.default is p.empty and p.name not in params]
+    if missing:
+        raise ValueError(f"Paramètre(s) manquant(s) pour {job_type} : {', '.join(missing)}")
+
+    values = {}
+    for key, value in params.items():
+        try:
+            values[key] = schema[key](value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Valeur invalide pour le paramètre {key} : {value}") from None
+    return values
+
+
+def _now():
+    return datetime.utcnow()
+
+
+class JobContext:
+    """Contexte d'exécution passé à une tâche : avancement, annulation et fichiers produits"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_update = 0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Enregistre l'avancement (au plus une écriture par PROGRESS_INTERVAL)
+
+        Lève JobCancelled si l'annulation de la tâche a été demandée. Les
+        écritures propres à la tâche doivent être validées avant l'appel.
+        """
+        if not force and time.monotonic() - self._last_update < PROGRESS_INTERVAL:
+            return
+        self._last_update = time.monotonic()
+
+        values = {'avancement': done, 'timestamp_heartbeat': _now()}
+        if total is not None:
+            values['total'] = total
+        if message is not None:
+            values['message'] = message[:255]
+
+        with db.engine.begin() as connection:
+            connection.execute(update(Job.__table__).where(Job.__table__.c.id == self.job_id).values(**values))
+            cancelled = connection.execute(
+                select(Job.__table__.c.annulation_demandee).where(Job.__table__.c.id == self.job_id)
+            ).scalar()
+        if cancelled:
+            raise JobCancelled()
+
+    def output_path(self, extension):
+        """Chemin du fichier produit par la tâche (téléchargeable une fois la tâche terminée)"""
+        directory = os.path.join(current_app.instance_path, 'jobs')
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f'{self.job_id}.{extension}')
+
+
+def enqueue(job_type, params=None, created_by=None, max_attempts=3):
+    """Ajoute une tâche à la file d'attente
+
+    Lève ValueError si le type de tâche n'est pas enregistré ou si ses
+    paramètres ne respectent pas son schéma (validate_params).
+    """
+    if job_type not in JOBS:
+        raise ValueError(f"Type de tâche inconnu : {job_type}")
+    params = validate_params(job_type, params or {})
+
+    new_job = Job(type=job_type, params=json.dumps(params), cree_par=created_by,
+                  max_tentatives=max_attempts, execute_apres=_now())
+    db.session.add(new_job)
+    db.session.commit()
+    return new_job
+
+
+def claim_next(worker_id):
+    """Réserve la plus ancienne tâche prête, retourne son ID ou None"""
+    now = _now()
+    while True:
+        job_id = db.session.execute(
+            select(Job.id)
+            .where(Job.statut == 'en_attente', Job.execute_apres <= now)
+            .order_by(Job.execute_apres, Job.timestamp_creation)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.statut == 'en_attente')
+            .values(statut='en_cours', worker=worker_id, timestamp_debut=now, timestamp_heartbeat=now,
+                    tentatives=Job.tentatives + 1, message=None)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+        # Réservée entre-temps par un autre worker : essayer la suivante
+
+
+def run_job(job_id):
+    """Exécute une tâche réservée et enregistre son issue
+
+    Une tâche en échec est reprogrammée avec un délai croissant tant qu'il
+    lui reste des tentatives, puis marquée 'echec' avec la trace de l'erreur.
+    """
+    current = db.session.get(Job, job_id)
+    fn = JOBS.get(current.type)
+    params = json.loads(current.params or '{}')
+    db.session.commit()
+
+    try:
+        if fn is None:
+            raise ValueError(f"Type de tâche inconnu : {current.type}")
+        result = fn(JobContext(job_id), **params)
+    except JobCancelled:
+        db.session.rollback()
+        values = {'statut': 'annule', 'message': 'Tâche annulée', 'timestamp_fin': _now()}
+    except Exception as e:
+        db.session.rollback()
+        current = db.session.get(Job, job_id)
+        values = {'erreur': traceback.format_exc(), 'message': str(e)[:255]}
+        if current.tentatives < current.max_tentatives and not current.annulation_demandee:
+            delay = RETRY_DELAY_SECONDS * 2 ** (current.tentatives - 1)
+            values.update(statut='en_attente', execute_apres=_now() + timedelta(seconds=delay))
+        else:
+            values.update(statut='echec', timestamp_fin=_now())
+    else:
+        values = {'statut': 'termine', 'resultat': json.dumps(result), 'erreur': None, 'timestamp_fin': _now()}
+
+    db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+    db.session.commit()
+    return values['statut']
+
+
+def cancel(job_id):
+    """Annule une tâche : immédiatement si elle attend, au prochain point d'avancement si elle tourne
+
+    Retourne False si la tâche est déjà terminée.
+    """
+    current = db.session.get(Job, job_id)
+    if current is None or current.statut not in ACTIVE_STATUSES:
+        return False
+
+    if current.statut == 'en_attente':
+        current.statut = 'annule'
+        current.timestamp_fin = _now()
+    current.annulation_demandee = True
+    db.session.commit()
+    return True
+
+
+def retry(job_id):
+    """Remet en file une tâche en échec ou annulée (tentatives remises à zéro)
+
+    Retourne False si la tâche est encore active.
+    """
+    current = db.session.get(Job, job_id)
+    if current is None or current.statut in ACTIVE_STATUSES:
+        return False
+
+    current.statut = 'en_attente'
+    current.tentatives = 0
+    current.annulation_demandee = False
+    current.avancement = 0
+    current.erreur = None
+    current.message = None
+    current.timestamp_fin = None
+    current.execute_apres = _now()
+    db.session.commit()
+    return True
+
+
+def heartbeat(job_ids):
+    """Signale que des tâches en cours sont toujours prises en charge"""
+    if job_ids:
+        db.session.execute(update(Job).where(Job.id.in_(list(job_ids))).values(timestamp_heartbeat=_now()))
+        db.session.commit()
+
+
+def requeue_stale(timeout):
+    """Remet en file les tâches dont le worker ne donne plus signe de vie (arrêt brutal)"""
+    limit = _now() - timedelta(seconds=timeout)
+    requeued = db.session.execute(
+        update(Job)
+        .where(Job.statut == 'en_cours', Job.timestamp_heartbeat < limit)
+        .values(statut='en_attente', worker=None, message='Worker interrompu, tâche remise en file')
+    ).rowcount
+    db.session.commit()
+    return requeued
+
+
+def job_to_dict(current):
+    """Représentation JSON d'une tâche (API d'état)"""
+    return {
+        'id': current.id,
+        'type': current.type,
+        'params': json.loads(current.params or '{}'),
+        'statut': current.statut,
+        'avancement': current.avancement,
+        'total': current.total,
+        'message': current.message,
+        'resultat': json.loads(current.resultat) if current.resultat else None,
+        'erreur': current.erreur,
+        'tentatives': current.tentatives,
+        'max_tentatives': current.max_tentatives,
+        'annulation_demandee': current.annulation_demandee,
+        'cree_par': current.cree_par,
+        'timestamp_creation': current.timestamp_creation.isoformat(),
+        'timestamp_debut': current.timestamp_debut.isoformat() if current.timestamp_debut else None,
+        'timestamp_fin': current.timestamp_fin.isoformat() if current.timestamp_fin else None
+    }
+
+
+def _init_worker(config):
+    from app import create_app
+
+    app = create_app(config)
+    _worker_state.clear()
+    _worker_state['app'] = app
+
+
+def _run_in_worker(job_id, app=None):
+    with (app or _worker_state['app']).app_context():
+        try:
+            return run_job(job_id)
+        finally:
+            db.session.remove()
+
+
+def run_worker(app, processes=1, poll_interval=1.0, once=False, out=print):
+    """Boucle du worker : réserve les tâches prêtes et les exécute dans un pool de processus
+
+    Avec un seul processus, les tâches s'exécutent dans un thread du
+    processus courant. La boucle principale reste libre d'entretenir le
+    signe de vie des tâches en cours, même quand elles ne publient pas leur
+    avancement, et remet en file celles des workers disparus. Avec
+    once=True, il s'arrête dès que la file est vide.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stale_timeout = app.config['JOBS_STALE_SECONDS']
+    heartbeat_interval = stale_timeout / 3
+    out(f"Worker {worker_id} démarré ({processes} processus)")
+
+    if processes > 1:
+        config = {'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'SESSION_SCHEDULER_ENABLED': False}
+        pool = get_context('spawn').Pool(processes, initializer=_init_worker, initargs=(config,))
+        run_args = ()
+    else:
+        pool = ThreadPool(1)
+        run_args = (app,)
+
+    running = {}
+    next_stale_check = 0
+    # La réservation vient de poser le signe de vie des nouvelles tâches
+    next_heartbeat = time.monotonic() + heartbeat_interval
+    try:
+        with app.app_context():
+            while True:
+                for job_id, result in list(running.items()):
+                    if result.ready():
+                        del running[job_id]
+                        out(f"Tâche {job_id} : {result.get()}")
+                if time.monotonic() >= next_heartbeat:
+                    heartbeat(running)
+                    next_heartbeat = time.monotonic() + heartbeat_interval
+
+                if time.monotonic() >= next_stale_check:
+                    requeued = requeue_stale(stale_timeout)
+                    if requeued:
+                        out(f"{requeued} tâche(s) interrompue(s) remise(s) en file")
+                    next_stale_check = time.monotonic() + stale_timeout / 2
+
+                claimed = False
+                while len(running) < processes:
+                    job_id = claim_next(worker_id)
+                    if job_id is None:
+                        break
+                    claimed = True
+                    running[job_id] = pool.apply_async(_run_in_worker, (job_id,) + run_args)
+
+                if once and not claimed and not running:
+                    break
+                if not claimed:
+                    time.sleep(poll_interval)
+    finally:
+        pool.terminate()
+        pool.join()
+        if running:
+            # Arrêt du worker : les tâches interrompues retournent dans la file
+            with app.app_context():
+                db.session.execute(update(Job).where(Job.id.in_(list(running)), Job.statut == 'en_cours')
+                                   .values(statut='en_attente', worker=None))
+                db.session.commit()
+
+
+class JobQueue:
+    """Configuration du sous-système de tâches de fond"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_STALE_SECONDS', int(os.environ.get('JOBS_STALE_SECONDS', 300)))
+        app.extensions['job_queue'] = self
+
+        # Les types de tâches intégrés sont enregistrés à l'import
+        from app.services import job_types  # noqa: F401
@@ -0,0 +1,96 @@
+import threading
+
+# Bornes des histogrammes de durée, en secondes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in labels]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """Registre de métriques en mémoire, exporté au format texte Prometheus
+
+    Les valeurs sont propres au processus : avec plusieurs workers gunicorn,
+    chaque worker expose ses propres compteurs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _metric(self, name, kind, help_text):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = {'type': kind, 'help': help_text or name, 'values': {}}
+            self._metrics[name] = metric
+        return metric
+
+    def inc(self, name, value=1, help_text=None, **labels):
+        """Incrémente un compteur"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._metric(name, 'counter', help_text)['values']
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, help_text=None, **labels):
+        """Fixe la valeur d'une jauge"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._metric(name, 'gauge', help_text)['values'][key] = value
+
+    def observe(self, name, value, help_text=None, buckets=DEFAULT_BUCKETS, **labels):
+        """Ajoute une observation à un histogramme"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            metric = self._metric(name, 'histogram', help_text)
+            metric.setdefault('buckets', buckets)
+            state = metric['values'].get(key)
+            if state is None:
+                state = {'buckets': [0] * len(metric['buckets']), 'sum': 0.0, 'count': 0}
+                metric['values'][key] = state
+            for i, bound in enumerate(metric['buckets']):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def get(self, name, **labels):
+        """Retourne la valeur d'un compteur ou d'une jauge (0 si absente)"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                return 0
+            value = metric['values'].get(key, 0)
+            return value['count'] if isinstance(value, dict) else value
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def render(self):
+        """Exporte toutes les métriques au format d'exposition texte Prometheus"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._metrics):
+                metric = self._metrics[name]
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, value in sorted(metric['values'].items()):
+                    if metric['type'] != 'histogram':
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+                        continue
+                    for bound, count in zip(metric['buckets'], value['buckets']):
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {value['sum']}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registre partagé par les services de l'application
+metrics = MetricsRegistry()
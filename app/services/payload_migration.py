@@ -0,0 +1,126 @@
+import json
+import os
+import time
+from flask import current_app
+from sqlalchemy import select, update, func
+from app import db
+
+
+class PayloadMigration:
+    """Migration d'un format de données de QR code (ou de toute colonne texte)
+
+    Une sous-classe définit le modèle et la colonne à réécrire, la requête
+    qui sélectionne les lignes candidates (la clé primaire en première
+    colonne) et la transformation d'une ligne vers la nouvelle valeur.
+    """
+
+    name = None
+    model = None
+    column = None
+
+    def query(self):
+        """Retourne le SELECT des lignes à migrer : (clé primaire, ...)"""
+        raise NotImplementedError
+
+    def transform(self, row):
+        """Retourne la nouvelle valeur de la colonne, ou None pour ignorer la ligne"""
+        raise NotImplementedError
+
+
+class PayloadMigrationRunner:
+    """Exécute des migrations par lots ordonnés par clé (keyset pagination)
+
+    Chaque lot est lu en flux (yield_per), réécrit par un UPDATE groupé sur la
+    clé primaire puis validé ; la dernière clé traitée est enregistrée dans un
+    fichier de reprise, ce qui permet de relancer une migration interrompue.
+    """
+
+    def __init__(self, chunk_size=1000, dry_run=False, checkpoint_file=None, out=print):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.checkpoint_file = checkpoint_file or os.path.join(current_app.instance_path, 'payload_migrations.json')
+        self.out = out
+
+    def _load_checkpoints(self):
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _save_checkpoint(self, name, last_key):
+        checkpoints = self._load_checkpoints()
+        if last_key is None:
+            checkpoints.pop(name, None)
+        else:
+            checkpoints[name] = last_key
+
+        os.makedirs(os.path.dirname(self.checkpoint_file) or '.', exist_ok=True)
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(checkpoints, f, indent=2)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def reset(self, migration):
+        """Oublie le point de reprise d'une migration"""
+        self._save_checkpoint(migration.name, None)
+
+    def run(self, migration):
+        """Exécute (ou estime, en mode dry-run) une migration, retourne le nombre de lignes modifiées"""
+        pk = migration.model.__mapper__.primary_key[0]
+        last_key = self._load_checkpoints().get(migration.name)
+
+        base_query = migration.query()
+        if last_key is not None:
+            self.out(f"[{migration.name}] Reprise après la clé {last_key}")
+            base_query = base_query.where(pk > last_key)
+
+        total = db.session.execute(select(func.count()).select_from(base_query.subquery())).scalar()
+        self.out(f"[{migration.name}] {total} ligne(s) à examiner")
+        if not total:
+            return 0
+
+        started = time.perf_counter()
+        scanned = 0
+        updated = 0
+
+        while True:
+            stmt = migration.query()
+            if last_key is not None:
+                stmt = stmt.where(pk > last_key)
+            stmt = stmt.order_by(pk).limit(self.chunk_size).execution_options(yield_per=self.chunk_size)
+
+            changes = []
+            chunk_rows = 0
+            for row in db.session.execute(stmt):
+                chunk_rows += 1
+                last_key = row[0]
+                new_value = migration.transform(row)
+                if new_value is not None:
+                    changes.append({pk.key: row[0], migration.column: new_value})
+
+            if chunk_rows == 0:
+                break
+
+            scanned += chunk_rows
+
+            if self.dry_run:
+                # Estimation à partir du premier lot (lecture + transformation)
+                elapsed = time.perf_counter() - started
+                estimate = elapsed / scanned * total
+                self.out(f"[{migration.name}] Dry-run : {len(changes)}/{chunk_rows} ligne(s) à modifier dans le premier lot, "
+                         f"durée totale estimée {estimate:.1f}s (hors écritures)")
+                return 0
+
+            if changes:
+                db.session.execute(update(migration.model), changes)
+            db.session.commit()
+            self._save_checkpoint(migration.name, last_key)
+            updated += len(changes)
+
+            elapsed = time.perf_counter() - started
+            rate = scanned / elapsed if elapsed > 0 else 0
+            self.out(f"[{migration.name}] {scanned}/{total} ligne(s) traitée(s), {updated} modifiée(s) - {rate:.0f} lignes/s")
+
+        # Migration terminée : le point de reprise n'est plus utile
+        self._save_checkpoint(migration.name, None)
+        return updated
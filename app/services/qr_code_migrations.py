@@ -0,0 +1,62 @@
+from sqlalchemy import select
+from app.models import Equipment, Session
+from app.services.payload_migration import PayloadMigration
+
+ECOLE = "EAFC-TIC"  # Nom de l'école
+
+
+class EquipmentQrCodeMigration(PayloadMigration):
+    """Met à jour les QR codes statiques des équipements pour inclure le nom de l'école"""
+
+    name = 'equipment_qr_codes'
+    model = Equipment
+    column = 'qr_code_statique_data'
+
+    def query(self):
+        return select(
+            Equipment.id,
+            Equipment.type_equipement,
+            Equipment.nom_salle
+        ).where(~Equipment.qr_code_statique_data.startswith(ECOLE))
+
+    def transform(self, row):
+        # Ancien format: "{equipment_id}_{type_equipement}_{nom_salle}"
+        # Nouveau format: "{ecole}_{equipment_id}_{type_equipement}_{nom_salle}"
+        return f"{ECOLE}_{row.id}_{row.type_equipement}_{row.nom_salle}"
+
+
+class SessionQrCodeMigration(PayloadMigration):
+    """Met à jour les QR codes dynamiques des sessions pour inclure le nom de l'école, le local et l'équipement"""
+
+    name = 'session_qr_codes'
+    model = Session
+    column = 'qr_code_dynamique_data'
+
+    def query(self):
+        # Jointure avec l'équipement pour éviter un chargement par session
+        return select(
+            Session.id,
+            Session.qr_code_dynamique_data,
+            Equipment.nom_salle,
+            Equipment.type_equipement
+        ).join(Equipment, Session.equipment_id == Equipment.id).where(
+            Session.qr_code_dynamique_data.startswith("SESSION_"),
+            ~Session.qr_code_dynamique_data.contains(ECOLE)
+        )
+
+    def transform(self, row):
+        # Ancien format: "SESSION_{session_id}_{timestamp}"
+        parts = row.qr_code_dynamique_data.split('_')
+        if len(parts) < 3:
+            return None
+
+        session_id = parts[1]
+        timestamp = parts[2]
+
+        # Nouveau format: "SESSION_{ecole}_{nom_salle}_{type_equipement}_{session_id}_{timestamp}"
+        return f"SESSION_{ECOLE}_{row.nom_salle}_{row.type_equipement}_{session_id}_{timestamp}"
+
+
+def qr_code_migrations():
+    """Migrations des QR codes, dans l'ordre d'exécution"""
+    return [EquipmentQrCodeMigration(), SessionQrCodeMigration()]
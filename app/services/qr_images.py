@@ -0,0 +1,105 @@
+import hashlib
+import os
+import time
+from functools import lru_cache
+from io import BytesIO
+import qrcode
+from flask import current_app, has_app_context
+from app.services.metrics import metrics
+
+# Les images pré-rendues (sessions planifiées) sont gardées au-delà de leur
+# période de validité pendant ce délai avant d'être purgées
+CACHE_RETENTION_SECONDS = 24 * 3600
+
+
+def render_qr_png(data):
+    """Génère l'image PNG d'un QR code (sans cache)"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def cache_directory():
+    """Répertoire partagé des images pré-rendues (QR_IMAGE_CACHE_DIR), ou None"""
+    if not has_app_context():
+        return None
+    return current_app.config.get('QR_IMAGE_CACHE_DIR')
+
+
+def _cache_path(directory, data):
+    return os.path.join(directory, hashlib.sha256(data.encode('utf-8')).hexdigest() + '.png')
+
+
+@lru_cache(maxsize=512)
+def qr_code_png(data):
+    """Génère l'image PNG d'un QR code
+
+    Les images sont conservées en mémoire : un QR code d'équipement ne change
+    pas, et le jeton d'une session tournante reste identique pendant toute
+    sa période (plusieurs écrans ou rafraîchissements). Le cache survit aux
+    invocations d'un même conteneur serverless. Une image pré-rendue par une
+    tâche de fond (répertoire QR_IMAGE_CACHE_DIR) est lue sans être générée.
+    """
+    directory = cache_directory()
+    if directory:
+        try:
+            with open(_cache_path(directory, data), 'rb') as f:
+                image = f.read()
+            metrics.inc('qr_images_total', help_text="Images de QR code servies hors cache mémoire", source='pre_rendu')
+            return image
+        except OSError:
+            pass
+
+    metrics.inc('qr_images_total', source='rendu')
+    return render_qr_png(data)
+
+
+def store_qr_png(directory, data, valid_until):
+    """Pré-rend l'image d'un QR code dans le répertoire partagé
+
+    La date de modification du fichier est fixée à la fin de validité du
+    code (timestamp Unix), ce qui permet de purger les images périmées même
+    si elles ont été rendues des semaines à l'avance. Retourne False si
+    l'image existait déjà.
+    """
+    path = _cache_path(directory, data)
+    if os.path.exists(path):
+        return False
+
+    os.makedirs(directory, exist_ok=True)
+    # Écriture atomique : un lecteur ne voit jamais une image partielle
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(render_qr_png(data))
+    os.utime(temporary, (valid_until, valid_until))
+    os.replace(temporary, path)
+    return True
+
+
+def purge_qr_cache(directory, now=None):
+    """Supprime les images pré-rendues périmées, retourne leur nombre"""
+    limit = (now if now is not None else time.time()) - CACHE_RETENTION_SECONDS
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+
+    for entry in entries:
+        if entry.name.endswith('.png') and entry.stat().st_mtime < limit:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
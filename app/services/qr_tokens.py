@@ -0,0 +1,114 @@
+import secrets
+import time
+from calendar import timegm
+from flask import current_app
+from itsdangerous import URLSafeSerializer, BadData, BadSignature
+
+# Le préfixe SESSION_ conserve la compatibilité avec le contrôle de format des scans
+TOKEN_PREFIX = 'SESSION_T.'
+TOKEN_SALT = 'session-qr-token'
+# Donnée de QR code des sessions à jetons signés : aléatoire et refusée par le
+# contrôle de format des scans (seules les sessions antérieures aux jetons
+# gardent une donnée statique SESSION_... scannable)
+UNSCANNABLE_PREFIX = 'JETON_'
+
+# Codes tournants : un nouveau code par période, la période précédente reste acceptée
+DEFAULT_ROTATION_SECONDS = 30
+DEFAULT_ROTATION_GRACE = 1
+# Scan hors ligne : retard maximal (secondes) entre la période du code et l'arrivée au serveur
+DEFAULT_OFFLINE_ALLOWANCE = 300
+
+MESSAGES = {
+    'expired': 'Ce QR code a expiré.',
+    'rotated': "Ce QR code n'est plus valide. Scannez le code actuellement affiché.",
+    'malformed': 'QR code invalide.',
+    'signature': 'QR code invalide.'
+}
+
+
+class InvalidQrToken(Exception):
+    """Jeton de QR code rejeté (reason : malformed, signature, expired ou rotated)"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+        self.message = MESSAGES[reason]
+
+
+def unscannable_payload():
+    """Valeur unique de qr_code_dynamique_data pour une nouvelle session, jamais acceptée au scan"""
+    return f'{UNSCANNABLE_PREFIX}{secrets.token_urlsafe(24)}'
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=TOKEN_SALT)
+
+
+def rotation_seconds():
+    return current_app.config.get('QR_TOKEN_ROTATION_SECONDS', DEFAULT_ROTATION_SECONDS)
+
+
+def is_session_token(payload):
+    return isinstance(payload, str) and payload.startswith(TOKEN_PREFIX)
+
+
+def make_session_token(session, rotating=True, now=None):
+    """Construit le contenu signé du QR code d'une session
+
+    Revendications : identifiant de session, équipement, émission, expiration
+    et numéro de période pour les codes tournants (0 pour un code fixe, ex:
+    QR code imprimé). Le jeton est déterministe pour une période donnée :
+    la rotation ne demande aucune écriture en base.
+    """
+    now = now if now is not None else time.time()
+    period = rotation_seconds() if rotating else 0
+    window = int(now // period) if period else 0
+    issued_at = window * period if period else int(now)
+    expires_at = timegm(session.timestamp_expiration.timetuple()) if session.timestamp_expiration else 0
+
+    claims = [session.id, session.equipment_id, issued_at, expires_at, window]
+    return TOKEN_PREFIX + _serializer().dumps(claims)
+
+
+def verify_session_token(payload, now=None, check_rotation=True, received_at=None):
+    """Vérifie un jeton sans accès à la base et retourne ses revendications
+
+    Lève InvalidQrToken si le jeton est malformé, falsifié, expiré ou, pour
+    un code tournant, issu d'une période trop ancienne. Pour un scan hors
+    ligne, now est l'heure de scan déclarée par le client (non signée) et
+    received_at l'heure d'arrivée au serveur : la période du code tournant
+    doit aussi dater d'au plus QR_TOKEN_OFFLINE_ALLOWANCE secondes (en plus
+    de la période de grâce) à l'arrivée, sinon une photo d'un ancien code
+    serait acceptée avec une heure de scan antidatée.
+    """
+    now = now if now is not None else time.time()
+    if not is_session_token(payload):
+        raise InvalidQrToken('malformed')
+
+    try:
+        claims = _serializer().loads(payload[len(TOKEN_PREFIX):])
+    except BadSignature as e:
+        raise InvalidQrToken('malformed' if e.payload is None else 'signature')
+    except BadData:
+        raise InvalidQrToken('malformed')
+
+    if not isinstance(claims, list) or len(claims) != 5:
+        raise InvalidQrToken('malformed')
+    session_id, equipment_id, issued_at, expires_at, window = claims
+
+    if expires_at and now >= expires_at:
+        raise InvalidQrToken('expired')
+
+    period = rotation_seconds()
+    if check_rotation and window and period:
+        grace = current_app.config.get('QR_TOKEN_ROTATION_GRACE', DEFAULT_ROTATION_GRACE)
+        if not 0 <= int(now // period) - window <= grace:
+            raise InvalidQrToken('rotated')
+        if received_at is not None:
+            allowance = current_app.config.get('QR_TOKEN_OFFLINE_ALLOWANCE', DEFAULT_OFFLINE_ALLOWANCE)
+            if int(received_at // period) - window > grace + allowance // period:
+                raise InvalidQrToken('rotated')
+
+    return {'session_id': session_id, 'equipment_id': equipment_id,
+            'issued_at': issued_at, 'expires_at': expires_at}
+
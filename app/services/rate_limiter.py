@@ -0,0 +1,211 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, jsonify
+from flask_login import current_user
+from app.services.metrics import metrics
+
+# Préfixes des QR codes émis par l'application (sessions et équipements)
+SCAN_PREFIXES = ('SESSION_', 'EAFC-TIC_')
+MAX_SCAN_PAYLOAD_LENGTH = 512
+
+
+def is_valid_scan_payload(value):
+    """Vérification de format peu coûteuse, avant tout accès à la base"""
+    return (isinstance(value, str)
+            and 0 < len(value) <= MAX_SCAN_PAYLOAD_LENGTH
+            and value.startswith(SCAN_PREFIXES)
+            and value.isprintable())
+
+
+def take_token(tokens, updated_at, now, rate, capacity):
+    """Applique l'algorithme du seau à jetons
+
+    Retourne (jetons restants, requête autorisée, secondes avant le prochain jeton).
+    """
+    if tokens is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+    if tokens >= 1:
+        return tokens - 1, True, 0
+    return tokens, False, (1 - tokens) / rate
+
+
+class MemoryRateLimitBackend:
+    """Seaux en mémoire, propres à chaque processus worker
+
+    Les seaux sont gardés du moins au plus récemment utilisé (LRU) : au-delà
+    de max_keys, le plus ancien est oublié en temps constant, même quand une
+    rafale de clés différentes remplit la table.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def consume(self, key, rate, capacity, now):
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (None, now))
+            tokens, allowed, retry_after = take_token(tokens, updated_at, now, rate, capacity)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, retry_after
+
+
+class SqliteRateLimitBackend:
+    """Seaux partagés entre workers via un fichier SQLite (mode WAL)
+
+    Chaque consommation est une transaction BEGIN IMMEDIATE : les workers
+    d'une même machine voient un état cohérent sans serveur externe.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # Une connexion par thread et par processus (pas de partage après fork)
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._local.calls = 0
+        return self._local.connection
+
+    def consume(self, key, rate, capacity, now):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, allowed, retry_after = take_token(row[0] if row else None, row[1] if row else now,
+                                                      now, rate, capacity)
+            connection.execute(
+                'INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+                (key, tokens, now)
+            )
+
+            self._local.calls += 1
+            if self._local.calls % self.PRUNE_EVERY == 0:
+                connection.execute('DELETE FROM rate_limit_buckets WHERE updated_at < ?', (now - capacity / rate,))
+
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+class RateLimiter:
+    """Limitation de débit des endpoints de scan non authentifiés
+
+    Deux seaux à jetons par requête : un par adresse IP (généreux, toute une
+    classe peut partager l'adresse NAT de l'école) et un par utilisateur.
+    Le backend 'memory' est propre à chaque worker ; le backend 'sqlite'
+    partage les compteurs entre les workers d'une même machine.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('RATE_LIMIT_BACKEND', os.environ.get('RATE_LIMIT_BACKEND', 'memory'))
+        app.config.setdefault('RATE_LIMIT_STORAGE', os.path.join(app.instance_path, 'rate_limits.sqlite'))
+        app.config.setdefault('RATE_LIMIT_IP_RATE', float(os.environ.get('RATE_LIMIT_IP_RATE', 10)))
+        app.config.setdefault('RATE_LIMIT_IP_BURST', int(os.environ.get('RATE_LIMIT_IP_BURST', 60)))
+        app.config.setdefault('RATE_LIMIT_USER_RATE', float(os.environ.get('RATE_LIMIT_USER_RATE', 0.5)))
+        app.config.setdefault('RATE_LIMIT_USER_BURST', int(os.environ.get('RATE_LIMIT_USER_BURST', 5)))
+
+        if app.config['RATE_LIMIT_BACKEND'] == 'sqlite':
+            self.backend = SqliteRateLimitBackend(app.config['RATE_LIMIT_STORAGE'])
+        elif app.config['RATE_LIMIT_BACKEND'] == 'memory':
+            self.backend = MemoryRateLimitBackend()
+        else:
+            raise ValueError(f"Backend de limitation inconnu : {app.config['RATE_LIMIT_BACKEND']}")
+
+        app.extensions['rate_limiter'] = self
+
+    def check(self, scope, user_id=None, now=None):
+        """Consomme un jeton par IP et par utilisateur ; retourne le délai d'attente ou None"""
+        config = current_app.config
+        now = now if now is not None else time.time()
+
+        allowed, retry_after = self.backend.consume(
+            f"{scope}:ip:{request.remote_addr}", config['RATE_LIMIT_IP_RATE'], config['RATE_LIMIT_IP_BURST'], now
+        )
+        if not allowed:
+            return 'ip', retry_after
+
+        if user_id:
+            allowed, retry_after = self.backend.consume(
+                f"{scope}:user:{str(user_id).lower()}", config['RATE_LIMIT_USER_RATE'], config['RATE_LIMIT_USER_BURST'], now
+            )
+            if not allowed:
+                return 'user', retry_after
+
+        return None
+
+
+def _reject(endpoint, reason):
+    metrics.inc('scan_rejected_total', help_text="Requêtes de scan rejetées avant traitement",
+                endpoint=endpoint, reason=reason)
+
+
+def rate_limit_response(user_id=None):
+    """Consomme les jetons de la requête courante ; retourne une réponse 429 ou None"""
+    if not current_app.config['RATE_LIMIT_ENABLED']:
+        return None
+
+    limited = current_app.extensions['rate_limiter'].check(request.endpoint, user_id)
+    if limited is None:
+        return None
+
+    reason, retry_after = limited
+    _reject(request.endpoint, f"rate_{reason}")
+    response = jsonify({'success': False,
+                        'message': 'Trop de scans en peu de temps. Veuillez réessayer dans quelques secondes.'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+def limit_scans(view):
+    """Décorateur des endpoints de scan : limitation de débit puis contrôle du format
+
+    Les requêtes rejetées n'atteignent jamais la base de données.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(silent=True) or {}
+
+        limited = rate_limit_response(current_user.id if current_user.is_authenticated else None)
+        if limited is not None:
+            return limited
+
+        if not is_valid_scan_payload(data.get('qr_code') or data.get('qr_data')):
+            _reject(request.endpoint, 'format')
+            return jsonify({'success': False, 'message': 'QR code non reconnu. Veuillez scanner un QR code valide.'}), 400
+
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from flask import current_app, g, request, has_app_context, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.elements import TextClause
+from app.services.metrics import metrics
+
+# Routage des lectures : les requêtes GET (pages, API de consultation,
+# rapports) sont marquées en lecture seule et leurs SELECT partent vers un
+# réplica (READ_REPLICA_URI) ou, sous SQLite, vers un pool de connexions en
+# lecture seule sur le même fichier en mode WAL. Les écritures restent sur
+# la base principale ; dès qu'une requête écrit, ses lectures suivantes y
+# restent aussi (lecture de ses propres écritures).
+
+# Clé de la session HTTP : instant de la dernière écriture de l'utilisateur
+LAST_WRITE_KEY = '_derniere_ecriture'
+
+_READ_PREFIXES = ('SELECT', 'WITH', 'EXPLAIN', 'PRAGMA')
+
+
+def _is_write(clause):
+    """Vrai si l'instruction modifie la base (DML ou SQL textuel autre qu'une lecture)"""
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(_READ_PREFIXES)
+    return bool(getattr(clause, 'is_dml', False))
+
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy qui envoie les lectures des requêtes en lecture seule au réplica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_app_context() or not g.get('lecture_seule'):
+            return engine
+
+        if self._flushing or _is_write(clause) or self.info.get('ecriture'):
+            if not self.info.get('ecriture'):
+                self.info['ecriture'] = True
+                metrics.inc('db_read_routing_switch_total',
+                            help_text="Requêtes en lecture seule basculées sur la base principale après une écriture")
+            return engine
+
+        router = current_app.extensions.get('read_routing')
+        replica = router.replica_for(engine) if router else None
+        return replica if replica is not None else engine
+
+
+class ReadRouter:
+    """Sélection du réplica de lecture et marquage des requêtes en lecture seule
+
+    Le réplica n'est utilisé que si son retard, mesuré au plus une fois
+    toutes les READ_REPLICA_LAG_CHECK_SECONDS, reste sous READ_REPLICA_MAX_LAG
+    secondes ; sinon (ou s'il est injoignable) les lectures restent sur la
+    base principale. Un utilisateur qui vient d'écrire lit aussi sur la base
+    principale pendant READ_REPLICA_MAX_LAG secondes.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._replica = None
+        self._primary = None
+        self._lag = None
+        self._lag_checked = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('READ_ROUTING_ENABLED', os.environ.get('READ_ROUTING_ENABLED', 'false').lower() == 'true')
+        app.config.setdefault('READ_REPLICA_URI', os.environ.get('READ_REPLICA_URI'))
+        app.config.setdefault('READ_REPLICA_MAX_LAG', float(os.environ.get('READ_REPLICA_MAX_LAG', 5)))
+        app.config.setdefault('READ_REPLICA_LAG_CHECK_SECONDS', float(os.environ.get('READ_REPLICA_LAG_CHECK_SECONDS', 5)))
+        # Endpoints GET qui doivent lire la base principale ; la confirmation
+        # d'un scan après connexion écrit : la session tout juste ouverte et le
+        # dédoublonnage des scans doivent être lus sur la base principale
+        app.config.setdefault('READ_ROUTING_EXCLUDED_ENDPOINTS', {'scan.confirm_scan'})
+
+        app.extensions['read_routing'] = self
+
+        if not app.config['READ_ROUTING_ENABLED']:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _replica_url(self, primary):
+        """URL du réplica : READ_REPLICA_URI, ou le fichier SQLite principal ouvert en lecture seule"""
+        configured = current_app.config['READ_REPLICA_URI']
+        if configured:
+            return make_url(configured)
+
+        url = primary.url
+        if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+            return None
+        # Lecteurs et écrivain concurrents sans blocage : journal WAL (persistant)
+        with primary.connect() as connection:
+            connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+        return url.set(database=f'file:{url.database}', query={'mode': 'ro', 'uri': 'true'})
+
+    def replica_for(self, primary):
+        """Moteur de lecture pour la base principale, ou None si le réplica est indisponible ou en retard"""
+        if self._primary is not primary:
+            with self._lock:
+                if self._primary is not primary:
+                    url = self._replica_url(primary)
+                    self._replica = create_engine(url, pool_pre_ping=True) if url is not None else None
+                    self._primary = primary
+                    self._lag_checked = 0
+        if self._replica is None or not g.get('lecture_replica', True):
+            return None
+
+        lag = self.replica_lag()
+        if lag is None or lag > current_app.config['READ_REPLICA_MAX_LAG']:
+            g.lecture_replica = False
+            metrics.inc('db_read_routing_fallback_total', help_text="Requêtes en lecture seule servies par la base principale",
+                        reason='erreur' if lag is None else 'retard')
+            return None
+
+        if not g.get('lecture_replica_comptee'):
+            g.lecture_replica_comptee = True
+            metrics.inc('db_read_routing_requests_total', help_text="Requêtes HTTP par base de lecture",
+                        target='replica')
+        return self._replica
+
+    def replica_lag(self):
+        """Retard du réplica en secondes (None s'il est injoignable), mesuré périodiquement"""
+        now = time.monotonic()
+        if now - self._lag_checked < current_app.config['READ_REPLICA_LAG_CHECK_SECONDS']:
+            return self._lag
+
+        try:
+            with self._replica.connect() as connection:
+                if self._replica.dialect.name == 'postgresql':
+                    lag = connection.execute(text(
+                        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                    )).scalar()
+                else:
+                    # Même fichier SQLite (ou réplica sans mesure de retard)
+                    connection.execute(text('SELECT 1'))
+                    lag = 0
+            self._lag = float(lag or 0)
+        except Exception as e:
+            current_app.logger.warning("Réplica de lecture injoignable : %s", e)
+            self._lag = None
+
+        self._lag_checked = now
+        if self._lag is not None:
+            metrics.set('db_replica_lag_seconds', self._lag, help_text="Retard mesuré du réplica de lecture")
+        return self._lag
+
+    def _before_request(self):
+        if request.method not in ('GET', 'HEAD'):
+            return
+        if request.endpoint in current_app.config['READ_ROUTING_EXCLUDED_ENDPOINTS']:
+            metrics.inc('db_read_routing_fallback_total', reason='exclu')
+            return
+
+        last_write = http_session.get(LAST_WRITE_KEY)
+        if last_write and time.time() - last_write < current_app.config['READ_REPLICA_MAX_LAG']:
+            metrics.inc('db_read_routing_fallback_total', reason='ecriture_recente')
+            return
+        g.lecture_seule = True
+
+    def _after_request(self, response):
+        g.pop('lecture_replica', None)
+        if g.pop('lecture_seule', False):
+            if not g.pop('lecture_replica_comptee', False):
+                metrics.inc('db_read_routing_requests_total', target='principale')
+            return response
+
+        metrics.inc('db_read_routing_requests_total', target='principale')
+        # Un réplica distant peut être en retard : après une requête d'écriture,
+        # l'utilisateur relit ses propres données sur la base principale
+        if request.method not in ('GET', 'HEAD') and current_app.config['READ_REPLICA_URI']:
+            http_session[LAST_WRITE_KEY] = time.time()
+        return response
@@ -0,0 +1,374 @@
+import time
+import uuid
+from calendar import timegm
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import Equipment, Session, LogScan
+from app.services.metrics import metrics
+from app.services.qr_tokens import InvalidQrToken, is_session_token, unscannable_payload, verify_session_token
+from app.services.rate_limiter import is_valid_scan_payload
+from app.services.session_scheduler import compute_expiration
+
+EQUIPMENT_PREFIX = 'EAFC-TIC_'
+DEFAULT_BATCH_MAX_RECORDS = 200
+DEFAULT_BATCH_MAX_AGE_HOURS = 24
+# Tolérance sur l'horloge des appareils
+CLOCK_SKEW = timedelta(minutes=2)
+# Avance avec laquelle un scan de l'enseignant démarre sa session planifiée (minutes)
+DEFAULT_EARLY_START_MINUTES = 10
+
+INVALID_MESSAGE = 'QR code non reconnu. Veuillez scanner un QR code valide.'
+
+# Bases qui savent insérer ou retourner la session active en une requête (INSERT ... ON CONFLICT)
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+class ScanRequest:
+    """Un scan à traiter et son résultat
+
+    scanned_at vaut None pour un scan en direct (la session doit être active),
+    ou l'horodatage client d'un scan hors ligne (le scan doit avoir eu lieu
+    pendant la session). Après traitement, status vaut 'recorded', 'duplicate'
+    ou 'rejected' (reason : invalid, not_found, inactive, outside, forbidden).
+    """
+
+    def __init__(self, payload, scanned_at=None, record_id=None):
+        self.payload = payload
+        self.scanned_at = scanned_at
+        self.record_id = record_id
+        self.is_equipment = isinstance(payload, str) and payload.startswith(EQUIPMENT_PREFIX)
+        self.session_id = None
+        self.session = None
+        self.status = None
+        self.reason = None
+        self.message = None
+
+    @property
+    def pending(self):
+        return self.status is None
+
+    def reject(self, reason, message):
+        self.status, self.reason, self.message = 'rejected', reason, message
+
+    def to_dict(self):
+        result = {'id': self.record_id, 'status': self.status, 'message': self.message}
+        if self.session is not None:
+            result['session_id'] = self.session.id
+        return result
+
+
+def parse_client_timestamp(value):
+    """Convertit un horodatage ISO 8601 du client en datetime UTC naïf (None si invalide)"""
+    if not isinstance(value, str):
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def session_values(equipment, teacher_id, debut, expiration, **extra):
+    """Colonnes d'une nouvelle session (identifiant, nom et donnée de QR code non scannable générés)"""
+    session_id = str(uuid.uuid4())
+    values = {
+        'id': session_id,
+        'nom_session': f"Session {equipment.type_equipement} - {debut.strftime('%d/%m/%Y %H:%M')}",
+        'equipment_id': equipment.id,
+        'user_id_enseignant': teacher_id,
+        'timestamp_debut': debut,
+        'timestamp_expiration': expiration,
+        # Les étudiants scannent un jeton signé (make_session_token), jamais cette valeur
+        'qr_code_dynamique_data': unscannable_payload()
+    }
+    values.update(extra)
+    return values
+
+
+def open_equipment_session(equipment, teacher_id, debut, duree_minutes=None, idempotency_key=None):
+    """Retourne la session active de l'enseignant sur l'équipement, ou en crée une
+
+    Idempotent et sans course : l'index unique partiel sur les sessions
+    actives (équipement, enseignant) garantit une seule session active, et
+    l'insertion se fait en un aller-retour (INSERT ... ON CONFLICT DO UPDATE
+    ... RETURNING) qui retourne la session existante en cas de conflit.
+    Une clé d'idempotence déjà utilisée par l'enseignant retourne la même
+    session, même si elle a été fermée depuis. Si l'enseignant a sur cet
+    équipement une session planifiée (emploi du temps) qui commence dans
+    les QR_PRERENDER_MINUTES, c'est elle qui est activée : les présences
+    du cours restent dans une seule session.
+
+    La session est écrite dans la transaction courante sans être validée :
+    l'appelant valide puis programme sa fermeture automatique.
+    Retourne (session, créée).
+    """
+    if idempotency_key:
+        replayed = Session.query.filter_by(user_id_enseignant=teacher_id, cle_idempotence=idempotency_key).first()
+        if replayed:
+            metrics.inc('session_open_total', help_text="Ouvertures de session par scan d'équipement", outcome='rejouee')
+            return replayed, False
+
+    planned = _start_planned_session(equipment, teacher_id, debut)
+    if planned is not None:
+        metrics.inc('session_open_total', help_text="Ouvertures de session par scan d'équipement", outcome='planifiee')
+        return planned, True
+
+    values = session_values(equipment, teacher_id, debut, compute_expiration(debut, duree_minutes),
+                            actif=True, cle_idempotence=idempotency_key or None)
+    session_id = values['id']
+
+    dialect = db.session.get_bind(Session).dialect.name
+    if dialect in UPSERT_DIALECTS:
+        statement = UPSERT_DIALECTS[dialect](Session).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=['equipment_id', 'user_id_enseignant'],
+            index_where=text('actif'),
+            set_={'actif': statement.excluded.actif}
+        ).returning(Session)
+        session = db.session.execute(statement, execution_options={'populate_existing': True}).scalar_one()
+    else:
+        session = Session.query.filter_by(equipment_id=equipment.id, user_id_enseignant=teacher_id, actif=True).first()
+        if session is None:
+            session = Session(**values)
+            db.session.add(session)
+
+    created = session.id == session_id
+    metrics.inc('session_open_total', help_text="Ouvertures de session par scan d'équipement",
+                outcome='creee' if created else 'existante')
+    return session, created
+
+
+def _start_planned_session(equipment, teacher_id, debut):
+    """Active d'avance la session planifiée de l'enseignant qui commence bientôt sur l'équipement
+
+    Ne fait rien si l'enseignant a déjà une session active sur l'équipement.
+    Le début de la session est avancé à l'heure du scan pour que les scans
+    des étudiants arrivés en avance (hors ligne compris) y soient acceptés ;
+    sa fermeture reste programmée à la fin du créneau.
+    Retourne la session activée, ou None.
+    """
+    lead = timedelta(minutes=current_app.config.get('QR_PRERENDER_MINUTES', DEFAULT_EARLY_START_MINUTES))
+    planned = db.session.execute(
+        select(Session.id, Session.timestamp_debut)
+        .where(Session.equipment_id == equipment.id, Session.user_id_enseignant == teacher_id,
+               Session.planifiee == True, Session.timestamp_debut <= debut + lead,
+               Session.timestamp_expiration > debut)
+        .order_by(Session.timestamp_debut)
+        .limit(1)
+    ).first()
+    if planned is None:
+        return None
+
+    # Conditions sur planifiee et sur l'absence de session active : un scan
+    # concurrent ou l'ordonnanceur a pu l'activer entre-temps
+    other = aliased(Session)
+    active = select(other.id).where(other.equipment_id == equipment.id, other.user_id_enseignant == teacher_id,
+                                    other.actif == True).exists()
+    result = db.session.execute(
+        update(Session)
+        .where(Session.id == planned.id, Session.planifiee == True, ~active)
+        .values(actif=True, planifiee=False, timestamp_debut=min(planned.timestamp_debut, debut))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    return db.session.get(Session, planned.id, populate_existing=True)
+
+
+class ScanEngine:
+    """Pipeline unique de traitement des scans de présence
+
+    resolve → validate → dedupe → record, chaque étape traitant tout le lot
+    à la fois : une requête pour les sessions, une pour les doublons, une
+    seule transaction pour l'enregistrement. Les front-ends (API JSON,
+    confirmation après connexion, envoi groupé) ne font que construire les
+    ScanRequest et formater la réponse. La durée de chaque étape est publiée
+    dans scan_stage_duration_seconds.
+    """
+
+    def __init__(self, frontend, received_at=None):
+        self.frontend = frontend
+        # Heure d'arrivée des scans hors ligne (borne l'âge des codes tournants)
+        self.received_at = received_at
+
+    @contextmanager
+    def _stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.observe('scan_stage_duration_seconds', time.perf_counter() - started,
+                            help_text="Durée des étapes du traitement des scans",
+                            frontend=self.frontend, stage=name)
+
+    def resolve(self, scans, check_rotation=True):
+        """Associe chaque scan à sa session (jetons signés vérifiés sans accès à la base)"""
+        token_ids = set()
+        legacy_payloads = set()
+
+        for scan in scans:
+            if not scan.pending or scan.is_equipment:
+                continue
+            if not is_valid_scan_payload(scan.payload):
+                scan.reject('invalid', INVALID_MESSAGE)
+                continue
+            if not is_session_token(scan.payload):
+                # Donnée statique : seules les sessions antérieures aux jetons signés en ont une
+                legacy_payloads.add(scan.payload)
+                continue
+
+            now = received_at = None
+            if scan.scanned_at:
+                now = timegm(scan.scanned_at.timetuple())
+                received_at = timegm((self.received_at or datetime.utcnow()).timetuple())
+            try:
+                scan.session_id = verify_session_token(scan.payload, now=now, check_rotation=check_rotation,
+                                                       received_at=received_at)['session_id']
+            except InvalidQrToken as e:
+                metrics.inc('qr_token_rejected_total', help_text="Jetons de QR code rejetés sans accès à la base",
+                            reason=e.reason)
+                scan.reject('invalid', e.message)
+                continue
+            token_ids.add(scan.session_id)
+
+        if not token_ids and not legacy_payloads:
+            return
+
+        # Une requête pour toutes les sessions du lot
+        sessions = {}
+        query = Session.query.filter(Session.id.in_(token_ids) | Session.qr_code_dynamique_data.in_(legacy_payloads))
+        for session in query:
+            sessions[session.id] = session
+            sessions[session.qr_code_dynamique_data] = session
+
+        for scan in scans:
+            if scan.pending and not scan.is_equipment:
+                scan.session = sessions.get(scan.session_id or scan.payload)
+
+    def validate(self, scans):
+        """Vérifie que chaque scan a eu lieu pendant une session existante"""
+        for scan in scans:
+            if not scan.pending or scan.is_equipment:
+                continue
+            session = scan.session
+            if session is None:
+                scan.reject('not_found', 'Session non trouvée.')
+                continue
+
+            if scan.scanned_at is None:
+                if not session.actif:
+                    scan.reject('inactive', "Cette session n'est plus active.")
+                continue
+
+            # Scan hors ligne : la session a pu être fermée depuis
+            end = session.timestamp_fin or session.timestamp_expiration
+            if end is None and not session.actif:
+                scan.reject('inactive', "Cette session n'est plus active.")
+            elif scan.scanned_at < session.timestamp_debut - CLOCK_SKEW or (end is not None and scan.scanned_at > end):
+                scan.reject('outside', "Le scan n'a pas eu lieu pendant la session.")
+
+    def dedupe(self, scans, user_id):
+        """Écarte les scans déjà enregistrés (en base ou répétés dans le lot)"""
+        session_ids = {scan.session.id for scan in scans if scan.pending and scan.session is not None}
+        if not session_ids:
+            return
+
+        seen = {session_id for (session_id,) in db.session.query(LogScan.session_id).filter(
+            LogScan.user_id_etudiant == user_id,
+            LogScan.session_id.in_(session_ids)
+        )}
+        for scan in scans:
+            if not scan.pending or scan.session is None:
+                continue
+            if scan.session.id in seen:
+                scan.status = 'duplicate'
+                scan.message = f'Vous avez déjà scanné cette session ({scan.session.nom_session}).'
+            seen.add(scan.session.id)
+
+    def record(self, scans, user_id):
+        """Enregistre les scans retenus dans une seule transaction"""
+        for scan in scans:
+            if not scan.pending or scan.session is None:
+                continue
+            db.session.add(LogScan(session_id=scan.session.id, user_id_etudiant=user_id,
+                                   timestamp_scan=scan.scanned_at or datetime.utcnow()))
+            scan.status = 'recorded'
+            scan.message = f'Scan enregistré pour la session: {scan.session.nom_session}'
+        db.session.commit()
+
+    def lookup(self, scans, check_rotation=True):
+        """Résout et valide sans enregistrer (utilisateur pas encore connecté)"""
+        with self._stage('resolve'):
+            self.resolve(scans, check_rotation)
+        with self._stage('validate'):
+            self.validate(scans)
+        return scans
+
+    def process(self, scans, user_id, check_rotation=True):
+        """Exécute le pipeline complet pour un utilisateur"""
+        self.lookup(scans, check_rotation)
+        with self._stage('dedupe'):
+            self.dedupe(scans, user_id)
+        with self._stage('record'):
+            self.record(scans, user_id)
+
+        for scan in scans:
+            if not scan.is_equipment:
+                metrics.inc('scans_total', help_text="Scans de présence traités",
+                            frontend=self.frontend, status=scan.status)
+        return scans
+
+
+def process_batch(records, user, now=None):
+    """Front-end d'envoi groupé : scans mis en file d'attente hors ligne
+
+    Retourne (scans traités, sessions créées par des scans d'équipement).
+    """
+    now = now or datetime.utcnow()
+    max_age = timedelta(hours=current_app.config.get('SCAN_BATCH_MAX_AGE_HOURS', DEFAULT_BATCH_MAX_AGE_HOURS))
+
+    scans = []
+    for record in records:
+        record = record if isinstance(record, dict) else {}
+        scan = ScanRequest(record.get('qr_code'), parse_client_timestamp(record.get('scanned_at')),
+                           str(record.get('id', ''))[:64])
+        if scan.scanned_at is None or not is_valid_scan_payload(scan.payload):
+            scan.reject('invalid', 'Enregistrement invalide.')
+        elif not now - max_age <= scan.scanned_at <= now + CLOCK_SKEW:
+            scan.reject('invalid', 'Horodatage hors de la plage acceptée.')
+        scans.append(scan)
+
+    ScanEngine('batch', received_at=now).process(scans, user['id'])
+
+    # Scans d'équipement de la page enseignant : création ou reprise de session
+    created = []
+    for scan in scans:
+        if not scan.pending:
+            continue
+        if user['role'] not in ['Admin', 'Enseignant']:
+            scan.reject('forbidden', "Vous n'avez pas les droits pour créer une session.")
+            continue
+        equipment = Equipment.query.filter_by(qr_code_statique_data=scan.payload).first()
+        if not equipment:
+            scan.reject('not_found', 'Équipement non reconnu.')
+            continue
+        # L'identifiant de l'enregistrement sert de clé d'idempotence (renvoi d'un lot)
+        scan.session, is_new = open_equipment_session(equipment, user['id'], scan.scanned_at,
+                                                      idempotency_key=scan.record_id or None)
+        scan.status = 'recorded' if is_new else 'duplicate'
+        scan.message = f"Session pour {equipment.type_equipement} ({equipment.nom_salle})."
+        if is_new:
+            created.append(scan.session)
+    db.session.commit()
+
+    for scan in scans:
+        metrics.inc('scan_batch_records_total', help_text="Enregistrements reçus par l'envoi groupé de scans",
+                    status=scan.status)
+    return scans, created
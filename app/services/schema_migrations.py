@@ -0,0 +1,277 @@
+import json
+import os
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select, text
+
+# Table de suivi des versions appliquées (hors modèles de l'application)
+metadata = MetaData()
+schema_migrations_table = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Décorateur qui enregistre une migration de schéma versionnée"""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+# Requêtes fréquentes dont le plan d'exécution est enregistré avant/après l'ajout d'index
+HOT_QUERIES = {
+    'session_active_equipement': (
+        "SELECT id FROM sessions WHERE actif = :actif AND equipment_id = :equipment_id AND user_id_enseignant = :user_id",
+        {'actif': True, 'equipment_id': 'EQ001', 'user_id': 'prof1@ecole.be'}
+    ),
+    'historique_etudiant': (
+        "SELECT id, session_id, timestamp_scan FROM logs_scans_etudiants "
+        "WHERE user_id_etudiant = :user_id ORDER BY timestamp_scan DESC LIMIT 10",
+        {'user_id': 'etudiant1@ecole.be'}
+    ),
+    'scans_session': (
+        "SELECT id, user_id_etudiant, timestamp_scan FROM logs_scans_etudiants "
+        "WHERE session_id = :session_id ORDER BY timestamp_scan",
+        {'session_id': '00000000-0000-0000-0000-000000000000'}
+    )
+}
+
+
+class MigrationContext:
+    """Opérations de schéma idempotentes, compatibles SQLite et PostgreSQL
+
+    Sur PostgreSQL, la connexion est en autocommit et les index sont créés
+    avec CREATE INDEX CONCURRENTLY pour ne pas bloquer les écritures.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+        self.report = {}
+
+    def execute(self, sql, **params):
+        return self.connection.execute(text(sql), params)
+
+    def has_table(self, table):
+        return inspect(self.connection).has_table(table)
+
+    def columns(self, table):
+        return {column['name'] for column in inspect(self.connection).get_columns(table)}
+
+    def indexes(self, table):
+        return {index['name'] for index in inspect(self.connection).get_indexes(table)}
+
+    def add_column(self, table, name, ddl_type):
+        """Ajoute une colonne si elle n'existe pas encore"""
+        if name not in self.columns(table):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}")
+
+    def create_index(self, name, table, columns, unique=False, where=None):
+        """Crée un index (éventuellement unique ou partiel) s'il n'existe pas encore"""
+        if name in self.indexes(table):
+            return
+
+        concurrently = ' CONCURRENTLY' if self.dialect == 'postgresql' else ''
+        sql = f"CREATE {'UNIQUE ' if unique else ''}INDEX{concurrently} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+        if where:
+            sql += f" WHERE {where}"
+        self.execute(sql)
+
+    def drop_index(self, name, table):
+        """Supprime un index s'il existe"""
+        if name not in self.indexes(table):
+            return
+
+        concurrently = ' CONCURRENTLY' if self.dialect == 'postgresql' else ''
+        self.execute(f"DROP INDEX{concurrently} IF EXISTS {name}")
+
+    def explain(self, sql, params):
+        """Retourne le plan d'exécution d'une requête sous forme de lignes de texte"""
+        if self.dialect == 'sqlite':
+            rows = self.execute(f"EXPLAIN QUERY PLAN {sql}", **params).all()
+            return [row[-1] for row in rows]
+        rows = self.execute(f"EXPLAIN {sql}", **params).all()
+        return [row[0] for row in rows]
+
+    def explain_hot_queries(self):
+        return {name: self.explain(sql, params) for name, (sql, params) in HOT_QUERIES.items()}
+
+
+@migration(1, "Colonnes nom_session, actif et timestamp_fin des sessions")
+def add_session_columns(ctx):
+    ctx.add_column('sessions', 'nom_session', 'VARCHAR(100)')
+    ctx.add_column('sessions', 'actif', 'BOOLEAN DEFAULT TRUE')
+    ctx.add_column('sessions', 'timestamp_fin', 'TIMESTAMP')
+
+
+@migration(2, "Mot de passe et index par rôle des utilisateurs (backend SQL)")
+def add_user_password_hash(ctx):
+    ctx.add_column('users', 'password_hash', 'VARCHAR(256)')
+    ctx.create_index('ix_users_role_nom_complet', 'users', ['role', 'nom_complet'])
+
+
+@migration(3, "Expiration des sessions pour la fermeture automatique")
+def add_session_expiration(ctx):
+    ctx.add_column('sessions', 'timestamp_expiration', 'TIMESTAMP')
+    ctx.create_index('ix_sessions_actif_expiration', 'sessions', ['actif', 'timestamp_expiration'])
+
+
+@migration(4, "Index composites des requêtes de scan et d'historique")
+def add_hot_query_indexes(ctx):
+    ctx.report['explain_avant'] = ctx.explain_hot_queries()
+
+    ctx.create_index('ix_sessions_actif_equipment_enseignant', 'sessions', ['actif', 'equipment_id', 'user_id_enseignant'])
+    ctx.create_index('ix_logs_scans_etudiant_timestamp', 'logs_scans_etudiants', ['user_id_etudiant', 'timestamp_scan'])
+    ctx.create_index('ix_logs_scans_session_timestamp', 'logs_scans_etudiants', ['session_id', 'timestamp_scan'])
+
+    ctx.report['explain_apres'] = ctx.explain_hot_queries()
+
+
+@migration(5, "Index couvrant pour l'historique paginé des étudiants")
+def add_student_history_covering_index(ctx):
+    # (user_id_etudiant, timestamp_scan, session_id) remplace l'index à deux colonnes
+    ctx.create_index('ix_logs_scans_etudiant_historique', 'logs_scans_etudiants',
+                     ['user_id_etudiant', 'timestamp_scan', 'session_id'])
+    ctx.drop_index('ix_logs_scans_etudiant_timestamp', 'logs_scans_etudiants')
+
+
+@migration(6, "Registre des quadrimestres archivés (historique des scans partitionné)")
+def add_attendance_partitions(ctx):
+    from app.models import AttendancePartition
+    AttendancePartition.__table__.create(ctx.connection, checkfirst=True)
+
+
+@migration(7, "File d'attente des tâches de fond")
+def add_jobs(ctx):
+    from app.models import Job
+    Job.__table__.create(ctx.connection, checkfirst=True)
+
+
+@migration(8, "Version du stockage des utilisateurs (identités des sessions signées)")
+def add_user_store_version(ctx):
+    from app.models import UserStoreVersion
+    UserStoreVersion.__table__.create(ctx.connection, checkfirst=True)
+
+
+@migration(9, "Index de recherche plein texte des équipements et des utilisateurs")
+def add_search_indexes(ctx):
+    from app.services.search import SEARCH_TABLES, create_search_index
+    for table in SEARCH_TABLES:
+        if ctx.has_table(table):
+            create_search_index(ctx.connection, table)
+
+
+@migration(10, "Session active unique par enseignant et équipement, clés d'idempotence")
+def add_unique_active_sessions(ctx):
+    ctx.add_column('sessions', 'cle_idempotence', 'VARCHAR(64)')
+
+    # Doublons créés avant l'index unique : seule la session la plus récente reste active
+    closed = ctx.execute(
+        "UPDATE sessions SET actif = :inactif, timestamp_fin = :maintenant "
+        "WHERE actif AND EXISTS (SELECT 1 FROM sessions recente WHERE recente.actif "
+        "AND recente.equipment_id = sessions.equipment_id "
+        "AND recente.user_id_enseignant = sessions.user_id_enseignant "
+        "AND (recente.timestamp_debut > sessions.timestamp_debut "
+        "OR (recente.timestamp_debut = sessions.timestamp_debut AND recente.id > sessions.id)))",
+        inactif=False, maintenant=datetime.utcnow()
+    ).rowcount
+    ctx.report['sessions_dupliquees_fermees'] = closed
+
+    ctx.create_index('ux_sessions_actif_equipment_enseignant', 'sessions', ['equipment_id', 'user_id_enseignant'],
+                     unique=True, where='actif')
+    ctx.create_index('ux_sessions_enseignant_cle_idempotence', 'sessions', ['user_id_enseignant', 'cle_idempotence'],
+                     unique=True)
+
+
+@migration(11, "Sessions planifiées depuis l'emploi du temps")
+def add_scheduled_sessions(ctx):
+    ctx.add_column('sessions', 'planifiee', 'BOOLEAN NOT NULL DEFAULT FALSE')
+    ctx.create_index('ix_sessions_planifiee_debut', 'sessions', ['planifiee', 'timestamp_debut'])
+
+
+@migration(12, "Index couvrant de l'historique des étudiants avec l'ID des scans")
+def add_student_history_scan_id(ctx):
+    # L'historique paginé trie et filtre sur (timestamp_scan, id) : sans l'ID
+    # dans l'index, chaque ligne demande une lecture de la table. Le nouvel
+    # index est créé avant la suppression de l'ancien (tables d'archive comprises)
+    tables = ['logs_scans_etudiants']
+    tables += ctx.execute("SELECT table_name FROM attendance_partitions").scalars().all()
+    for table in tables:
+        old = 'ix_logs_scans_etudiant_historique' if table == 'logs_scans_etudiants' else f'ix_{table}_etudiant'
+        ctx.create_index(f'{old}_id', table, ['user_id_etudiant', 'timestamp_scan', 'id', 'session_id'])
+        ctx.drop_index(old, table)
+    ctx.report['index_remplaces'] = len(tables)
+
+
+@migration(13, "Recherche PostgreSQL sans accents (unaccent)")
+def add_unaccent_search_indexes(ctx):
+    # Les index de la migration 9 gardaient les accents du texte indexé ;
+    # les nouveaux sont créés avant la suppression des anciens
+    if ctx.dialect != 'postgresql':
+        return
+    from app.services.search import SEARCH_TABLES, create_search_index
+    for table in SEARCH_TABLES:
+        if ctx.has_table(table):
+            create_search_index(ctx.connection, table)
+            ctx.drop_index(f'ix_{table}_recherche_tsv', table)
+            ctx.drop_index(f'ix_{table}_recherche_trgm', table)
+
+
+def applied_versions(engine):
+    """Retourne l'ensemble des versions de schéma déjà appliquées"""
+    metadata.create_all(engine)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations_table.c.version)).scalars())
+
+
+def upgrade(engine, report_dir=None, out=print):
+    """Applique les migrations en attente, dans l'ordre des versions
+
+    Chaque migration s'exécute sur sa propre connexion ; les rapports
+    éventuels (plans EXPLAIN) sont écrits dans report_dir.
+    """
+    done = applied_versions(engine)
+    applied = []
+
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+
+        out(f"Migration {version} : {description}...")
+
+        if engine.dialect.name == 'postgresql':
+            # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                ctx = MigrationContext(connection)
+                fn(ctx)
+        else:
+            with engine.begin() as connection:
+                ctx = MigrationContext(connection)
+                fn(ctx)
+
+        with engine.begin() as connection:
+            connection.execute(schema_migrations_table.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+
+        if ctx.report and report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+            report_file = os.path.join(report_dir, f'schema_migration_{version:03d}.json')
+            with open(report_file, 'w') as f:
+                json.dump(ctx.report, f, indent=2, ensure_ascii=False)
+            out(f"Rapport enregistré dans {report_file}")
+
+        applied.append(version)
+
+    if not applied:
+        out("La base de données est à jour.")
+
+    return applied
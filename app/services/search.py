@@ -0,0 +1,218 @@
+import os
+import re
+import unicodedata
+from sqlalchemy import event, text
+from app import db
+
+# Recherche plein texte côté serveur (équipements, salles, utilisateurs).
+# Sous SQLite, chaque table indexée a une table virtuelle FTS5 à contenu
+# externe, tenue à jour par des triggers (insertion, modification,
+# suppression) ; les préfixes de 2 et 3 caractères sont pré-indexés pour la
+# saisie au fil de la frappe. Sous PostgreSQL, des index GIN sur
+# l'expression tsvector et en trigrammes servent les mêmes requêtes, sans
+# table annexe ; le texte indexé est débarrassé de ses accents (unaccent),
+# comme les mots de la requête. Les autres bases utilisent LIKE.
+
+PAGE_SIZE = 25
+# Nombre maximal de mots pris en compte dans une requête
+MAX_TOKENS = 8
+
+SEARCH_TABLES = {
+    'equipments': ('id', 'nom_salle', 'type_equipement'),
+    'users': ('id', 'nom_complet')
+}
+
+# unaccent() est seulement STABLE : cette enveloppe IMMUTABLE (dictionnaire
+# explicite) peut servir dans les expressions des index GIN
+UNACCENT_FUNCTION = 'recherche_sans_accents'
+
+_TOKEN = re.compile(r'\w+')
+
+_listeners_installed = False
+
+
+def normalize(value):
+    """Minuscules sans accents (même découpage que le tokenizer unicode61 de FTS5)"""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def query_tokens(query):
+    """Mots de la requête, normalisés ; le dernier est complété comme un préfixe"""
+    return _TOKEN.findall(normalize(query))[:MAX_TOKENS]
+
+
+def page_info(total, page, per_page):
+    """Numéro de page borné et nombre de pages"""
+    pages = max(1, -(-total // per_page))
+    return min(max(page, 1), pages), pages
+
+
+def _fts_table(table):
+    return f'{table}_fts'
+
+
+def _sqlite_ddl(table):
+    """Table FTS5 à contenu externe et triggers de synchronisation"""
+    fts = _fts_table(table)
+    columns = SEARCH_TABLES[table]
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    old_values = ', '.join(f'old.{c}' for c in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.rowid, {old_values});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.rowid, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END"
+    ]
+
+
+def _document(table, alias=''):
+    """Expression SQL du texte indexé d'une ligne, sans accents (PostgreSQL)"""
+    columns = " || ' ' || ".join(f"coalesce({alias}{c}, '')" for c in SEARCH_TABLES[table])
+    return f"{UNACCENT_FUNCTION}({columns})"
+
+
+def _postgresql_index_ddl(table):
+    """Extensions, fonction sans accents et index GIN d'une table (PostgreSQL)"""
+    document = _document(table)
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        f"CREATE OR REPLACE FUNCTION {UNACCENT_FUNCTION}(text) RETURNS text "
+        f"LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        f"AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_recherche_sans_accents_tsv ON {table} "
+        f"USING gin (to_tsvector('simple', {document}))",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_recherche_sans_accents_trgm ON {table} "
+        f"USING gin (lower({document}) gin_trgm_ops)"
+    ]
+
+
+def _postgresql_match(table, tokens):
+    """Condition, paramètres et tri d'une recherche PostgreSQL (mêmes expressions que les index)"""
+    document = _document(table, alias='t.')
+    condition = (f"(to_tsvector('simple', {document}) @@ to_tsquery('simple', :recherche) "
+                 f"OR lower({document}) LIKE :contient)")
+    params = {
+        'recherche': ' & '.join(f'{token}:*' for token in tokens),
+        'contient': f"%{' '.join(tokens)}%"
+    }
+    rank = f"ts_rank(to_tsvector('simple', {document}), to_tsquery('simple', :recherche)) DESC"
+    return condition, params, rank
+
+
+def create_search_index(connection, table):
+    """Crée (si besoin) l'index de recherche d'une table et l'alimente avec les lignes existantes"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        fts = _fts_table(table)
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': fts}).first()
+        for statement in _sqlite_ddl(table):
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        for statement in _postgresql_index_ddl(table):
+            connection.execute(text(statement))
+
+
+def drop_search_index(connection, table):
+    """Supprime la table FTS5 d'une table (ses triggers disparaissent avec la table indexée)"""
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f"DROP TABLE IF EXISTS {_fts_table(table)}"))
+
+
+def _after_create(target, connection, **kw):
+    create_search_index(connection, target.name)
+
+
+def _before_drop(target, connection, **kw):
+    drop_search_index(connection, target.name)
+
+
+def install_search_listeners():
+    """Crée et supprime les index de recherche avec leurs tables (db.create_all, db.drop_all)"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+
+    for table in SEARCH_TABLES:
+        event.listen(db.metadata.tables[table], 'after_create', _after_create)
+        event.listen(db.metadata.tables[table], 'before_drop', _before_drop)
+    _listeners_installed = True
+
+
+def search_ids(table, query, page=1, per_page=PAGE_SIZE, where=None, params=None, order_by=None):
+    """Recherche les lignes d'une table, retourne (IDs de la page, total)
+
+    Chaque mot doit correspondre au début d'un mot d'une des colonnes
+    indexées (recherche par préfixe). Les résultats sont triés par
+    pertinence, puis selon order_by. where et params ajoutent un filtre SQL
+    sur la table (alias t).
+    """
+    tokens = query_tokens(query)
+    params = dict(params or {})
+    conditions = [where] if where else []
+    order = [order_by or 't.id']
+    source = f'{table} t'
+
+    if tokens:
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            fts = _fts_table(table)
+            # CROSS JOIN : SQLite parcourt d'abord l'index FTS (sinon, avec un
+            # filtre indexé comme le rôle, il interroge FTS ligne par ligne)
+            source = f'{fts} CROSS JOIN {table} t ON t.rowid = {fts}.rowid'
+            conditions.append(f'{fts} MATCH :recherche')
+            params['recherche'] = ' '.join(f'"{token}"*' for token in tokens)
+            order.insert(0, f'{fts}.rank')
+        elif dialect == 'postgresql':
+            condition, match_params, rank = _postgresql_match(table, tokens)
+            conditions.append(condition)
+            params.update(match_params)
+            order.insert(0, rank)
+        else:
+            for i, token in enumerate(tokens):
+                conditions.append('(' + ' OR '.join(f'lower(t.{c}) LIKE :mot{i}' for c in SEARCH_TABLES[table]) + ')')
+                params[f'mot{i}'] = f'%{token}%'
+
+    clause = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    total = db.session.execute(text(f"SELECT count(*) FROM {source}{clause}"), params).scalar()
+    page, _ = page_info(total, page, per_page)
+    ids = db.session.execute(
+        text(f"SELECT t.id FROM {source}{clause} ORDER BY {', '.join(order)} LIMIT :limite OFFSET :decalage"),
+        dict(params, limite=per_page, decalage=(page - 1) * per_page)
+    ).scalars().all()
+    return ids, total
+
+
+def search_equipments(query, page=1, per_page=PAGE_SIZE):
+    """Page de résultats de la recherche d'équipements (ID, salle, type)"""
+    from app.models import Equipment
+
+    ids, total = search_ids('equipments', query, page, per_page)
+    page, pages = page_info(total, page, per_page)
+    found = {equipment.id: equipment for equipment in Equipment.query.filter(Equipment.id.in_(ids))} if ids else {}
+    return {
+        'items': [found[equipment_id] for equipment_id in ids if equipment_id in found],
+        'total': total,
+        'page': page,
+        'pages': pages
+    }
+
+
+class SearchIndex:
+    """Configuration de la recherche plein texte"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_PAGE_SIZE', int(os.environ.get('SEARCH_PAGE_SIZE', PAGE_SIZE)))
+        app.extensions['search_index'] = self
+        install_search_listeners()
@@ -0,0 +1,125 @@
+import base64
+import os
+import threading
+import time
+from sqlalchemy import text
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+# Préfixe des fonctions Netlify (/.netlify/functions/api/... → /api/...)
+FUNCTION_PREFIX = '/.netlify/functions/api'
+TEXT_MIMETYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+_app = None
+_lock = threading.Lock()
+
+# Mesures du conteneur courant : construction de l'application et invocations
+stats = {'app_build_seconds': None, 'invocations': 0}
+
+
+def serverless_config():
+    """Configuration de l'application dans une fonction serverless
+
+    Le système de fichiers de la fonction est éphémère : sans DATABASE_URI,
+    la base SQLite est recréée dans /tmp à chaque démarrage à froid. Avec une
+    base externe, le schéma est géré par `flask db-upgrade` au déploiement
+    et les connexions sont vérifiées avant réutilisation (conteneur gelé
+    entre deux invocations).
+    """
+    uri = os.environ.get('DATABASE_URI', 'sqlite:////tmp/app.db')
+    sqlite = uri.startswith('sqlite')
+    return {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': {} if sqlite else {'pool_pre_ping': True, 'pool_recycle': 300, 'pool_size': 1},
+        'AUTO_CREATE_TABLES': sqlite,
+        # Pas de thread d'arrière-plan : il serait gelé entre deux invocations
+        'SESSION_SCHEDULER_ENABLED': False,
+        # Le CDN de Netlify compresse déjà les réponses
+        'COMPRESSION_ENABLED': False
+    }
+
+
+def get_app():
+    """Application Flask du conteneur, construite à la première invocation seulement
+
+    L'application, son moteur SQLAlchemy (pool de connexions), le cache des
+    utilisateurs et celui des images de QR codes restent en mémoire tant que
+    le conteneur est réutilisé.
+    """
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                from app import create_app, db
+                from app.services.user_backend import get_user_backend
+
+                started = time.perf_counter()
+                app = create_app(serverless_config())
+                with app.app_context():
+                    # Ouvrir la connexion et charger les utilisateurs dès le démarrage
+                    db.session.execute(text('SELECT 1'))
+                    db.session.remove()
+                    get_user_backend().get_users()
+                stats['app_build_seconds'] = time.perf_counter() - started
+                _app = app
+    return _app
+
+
+def event_to_environ(event):
+    """Convertit un événement Lambda (format API Gateway / Netlify) en environnement WSGI"""
+    headers = event.get('headers') or {}
+    path = event.get('path') or '/'
+    if path.startswith(FUNCTION_PREFIX):
+        path = '/api' + path[len(FUNCTION_PREFIX):]
+
+    body = event.get('body') or ''
+    body = base64.b64decode(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+
+    query = event.get('multiValueQueryStringParameters') or {
+        name: [value] for name, value in (event.get('queryStringParameters') or {}).items()
+    }
+    lowered = {name.lower(): value for name, value in headers.items()}
+    client_ip = lowered.get('x-nf-client-connection-ip') or lowered.get('x-forwarded-for', '127.0.0.1').split(',')[0].strip()
+
+    builder = EnvironBuilder(
+        path=path,
+        method=event.get('httpMethod', 'GET'),
+        headers=headers,
+        query_string=[(name, value) for name, values in query.items() for value in values],
+        data=body,
+        base_url=f"{lowered.get('x-forwarded-proto', 'https')}://{lowered.get('host', 'localhost')}",
+        environ_overrides={'REMOTE_ADDR': client_ip}
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+def handle_event(app, event):
+    """Exécute une requête WSGI et retourne la réponse au format Lambda"""
+    app_iter, status, headers = run_wsgi_app(app.wsgi_app, event_to_environ(event), buffered=True)
+    body = b''.join(app_iter)
+
+    mimetype = (headers.get('Content-Type') or '').split(';')[0].strip()
+    is_text = (mimetype.startswith('text/') or mimetype in TEXT_MIMETYPES) and 'Content-Encoding' not in headers
+
+    single, multi = {}, {}
+    for name, value in headers.items():
+        multi.setdefault(name, []).append(value)
+        single[name] = value
+
+    return {
+        'statusCode': int(status.split(' ', 1)[0]),
+        'headers': single,
+        # Set-Cookie peut apparaître plusieurs fois
+        'multiValueHeaders': multi,
+        'body': body.decode('utf-8') if is_text else base64.b64encode(body).decode('ascii'),
+        'isBase64Encoded': not is_text
+    }
+
+
+def lambda_handler(event, context=None):
+    """Point d'entrée de la fonction Netlify"""
+    app = get_app()
+    stats['invocations'] += 1
+    return handle_event(app, event)
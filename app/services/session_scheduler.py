@@ -0,0 +1,311 @@
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, select, and_, or_, func, tuple_
+from app import db
+from app.models import Session
+from app.services.metrics import metrics
+
+
+def compute_expiration(timestamp_debut, duree_minutes=None):
+    """Calcule l'heure d'expiration d'une session à partir de sa durée (en minutes)
+
+    Si la durée n'est pas fournie ou invalide, la durée par défaut de
+    l'application (SESSION_DURATION_MINUTES) est utilisée.
+    """
+    default_duration = current_app.config['SESSION_DURATION_MINUTES']
+    try:
+        duree = int(duree_minutes) if duree_minutes else default_duration
+    except (TypeError, ValueError):
+        duree = default_duration
+
+    if duree <= 0:
+        duree = default_duration
+
+    return timestamp_debut + timedelta(minutes=duree)
+
+
+def close_expired_sessions(now=None):
+    """Ferme en une seule requête UPDATE toutes les sessions actives expirées
+
+    Les sessions sans heure d'expiration (créées avant l'ordonnanceur) sont
+    fermées après la durée par défaut. Retourne la liste des IDs fermés.
+    """
+    now = now or datetime.utcnow()
+    time_limit = now - timedelta(minutes=current_app.config['SESSION_DURATION_MINUTES'])
+
+    condition = and_(
+        Session.actif == True,
+        or_(
+            Session.timestamp_expiration <= now,
+            and_(Session.timestamp_expiration.is_(None), Session.timestamp_debut < time_limit)
+        )
+    )
+    stmt = (
+        update(Session)
+        .where(condition)
+        .values(actif=False, timestamp_fin=func.coalesce(Session.timestamp_expiration, now))
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.engine.dialect.update_returning:
+        closed_ids = db.session.execute(stmt.returning(Session.id)).scalars().all()
+    else:
+        # Pas de RETURNING : récupérer les IDs dans la même transaction
+        closed_ids = db.session.execute(select(Session.id).where(condition)).scalars().all()
+        if closed_ids:
+            db.session.execute(stmt)
+
+    db.session.commit()
+
+    if closed_ids:
+        get_session_scheduler().notify_closed(closed_ids)
+
+    return closed_ids
+
+
+def activate_scheduled_sessions(now=None):
+    """Active les sessions planifiées dont le créneau a commencé
+
+    Une session ouverte à la main par le même enseignant sur le même
+    équipement est fermée : le créneau de l'emploi du temps prend le relais
+    (une seule session active par enseignant et équipement) ; un scan de
+    l'enseignant peu avant le créneau a déjà activé la session planifiée
+    (open_equipment_session), qui n'est plus concernée. Un créneau
+    entièrement passé sans activation (serveur arrêté) est marqué terminé,
+    de même qu'un créneau recouvert par un créneau plus récent du même
+    équipement. Retourne la liste des IDs activés.
+    """
+    now = now or datetime.utcnow()
+    due = db.session.execute(
+        select(Session.id, Session.equipment_id, Session.user_id_enseignant, Session.timestamp_debut,
+               Session.timestamp_expiration)
+        .where(Session.planifiee == True, Session.timestamp_debut <= now)
+        .order_by(Session.timestamp_debut)
+    ).all()
+    if not due:
+        db.session.commit()
+        return []
+
+    latest = {}
+    missed = []
+    replaced = []
+    for row in due:
+        if row.timestamp_expiration is not None and row.timestamp_expiration <= now:
+            missed.append(row.id)
+            continue
+        pair = (row.equipment_id, row.user_id_enseignant)
+        if pair in latest:
+            replaced.append(latest[pair].id)
+        latest[pair] = row
+
+    if missed:
+        db.session.execute(update(Session).where(Session.id.in_(missed))
+                           .values(planifiee=False, timestamp_fin=Session.timestamp_expiration)
+                           .execution_options(synchronize_session=False))
+    if replaced:
+        db.session.execute(update(Session).where(Session.id.in_(replaced))
+                           .values(planifiee=False, timestamp_fin=now)
+                           .execution_options(synchronize_session=False))
+
+    activated = []
+    closed_ids = []
+    if latest:
+        starting = [row.id for row in latest.values()]
+        conflicting = and_(
+            Session.actif == True,
+            tuple_(Session.equipment_id, Session.user_id_enseignant).in_(list(latest)),
+            Session.id.notin_(starting)
+        )
+        closed_ids = db.session.execute(select(Session.id).where(conflicting)).scalars().all()
+        if closed_ids:
+            db.session.execute(update(Session).where(Session.id.in_(closed_ids))
+                               .values(actif=False, timestamp_fin=now)
+                               .execution_options(synchronize_session=False))
+
+        # Condition sur planifiee : un autre worker a pu activer ces sessions entre-temps
+        activate = (update(Session).where(Session.id.in_(starting), Session.planifiee == True)
+                    .values(actif=True, planifiee=False)
+                    .execution_options(synchronize_session=False))
+        if db.engine.dialect.update_returning:
+            activated = db.session.execute(activate.returning(Session.id)).scalars().all()
+        else:
+            activated = db.session.execute(select(Session.id).where(Session.id.in_(starting),
+                                                                    Session.planifiee == True)).scalars().all()
+            db.session.execute(activate)
+
+    db.session.commit()
+
+    metrics.inc('scheduled_sessions_total', len(activated), help_text="Sessions planifiées par issue",
+                outcome='activee')
+    metrics.inc('scheduled_sessions_total', len(missed) + len(replaced), outcome='manquee')
+    scheduler = get_session_scheduler()
+    if closed_ids:
+        scheduler.notify_closed(closed_ids)
+    for row in latest.values():
+        if row.id in activated:
+            scheduler.schedule(row.id, row.timestamp_expiration)
+    return activated
+
+
+def get_session_scheduler():
+    """Retourne l'ordonnanceur de l'application courante"""
+    return current_app.extensions['session_scheduler']
+
+
+class SessionScheduler:
+    """Ferme les sessions à leur heure d'expiration exacte et active les sessions planifiées
+
+    Les échéances sont gardées dans un tas (min-heap) : un thread unique dort
+    jusqu'à la prochaine échéance, puis exécute close_expired_sessions() qui
+    ferme en une requête toutes les sessions arrivées à expiration. Un
+    rattrapage périodique couvre les sessions créées par d'autres workers.
+    """
+
+    def __init__(self, app=None):
+        self._heap = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._listeners = []
+        self.app = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Enregistre l'ordonnanceur sur l'application"""
+        app.config.setdefault('SESSION_DURATION_MINUTES', int(os.environ.get('SESSION_DURATION_MINUTES', 60)))
+        app.config.setdefault('SESSION_SCHEDULER_ENABLED', os.environ.get('SESSION_SCHEDULER_ENABLED', 'true').lower() == 'true')
+        app.config.setdefault('SESSION_CATCHUP_INTERVAL', int(os.environ.get('SESSION_CATCHUP_INTERVAL', 300)))
+
+        self.app = app
+        app.extensions['session_scheduler'] = self
+
+        # Démarrage paresseux au premier appel : le thread doit vivre dans le
+        # processus worker (gunicorn fork après le chargement de l'application)
+        app.before_request(self._ensure_started)
+
+    def add_close_listener(self, listener):
+        """Enregistre une fonction appelée avec la liste des IDs de sessions fermées"""
+        self._listeners.append(listener)
+
+    def notify_closed(self, session_ids):
+        """Prévient les écouteurs (caches...) que des sessions ont été fermées"""
+        for listener in self._listeners:
+            try:
+                listener(list(session_ids))
+            except Exception as e:
+                print(f"Erreur lors de la notification de fermeture de sessions: {e}")
+
+    def schedule(self, session_id, timestamp_expiration):
+        """Programme la fermeture d'une session à son heure d'expiration
+
+        Sert aussi à programmer l'activation d'une session planifiée (heure
+        de début) : à chaque échéance, le thread ferme les sessions expirées
+        puis active les sessions planifiées arrivées à leur début.
+        """
+        if timestamp_expiration is None:
+            return
+
+        with self._condition:
+            heapq.heappush(self._heap, (timestamp_expiration, session_id))
+            # Réveiller le thread si cette échéance est la plus proche
+            if self._heap[0][1] == session_id:
+                self._condition.notify()
+
+    def _ensure_started(self):
+        if self._thread is not None or self.app.testing or not self.app.config['SESSION_SCHEDULER_ENABLED']:
+            return
+
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='session-scheduler', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Arrête le thread de l'ordonnanceur et attend sa fin"""
+        with self._condition:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._condition.notify()
+
+        thread.join(timeout)
+        with self._condition:
+            self._thread = None
+            self._stopping = False
+
+    def _load_pending(self):
+        """Charge les échéances des sessions actives déjà en base"""
+        rows = db.session.execute(
+            select(Session.id, Session.timestamp_expiration).where(
+                Session.actif == True,
+                Session.timestamp_expiration.isnot(None)
+            )
+        ).all()
+
+        # Sessions planifiées : début (activation) et fin (fermeture)
+        planned = db.session.execute(
+            select(Session.id, Session.timestamp_debut, Session.timestamp_expiration).where(Session.planifiee == True)
+        ).all()
+
+        with self._condition:
+            for session_id, timestamp_expiration in rows:
+                heapq.heappush(self._heap, (timestamp_expiration, session_id))
+            for session_id, timestamp_debut, timestamp_expiration in planned:
+                heapq.heappush(self._heap, (timestamp_debut, session_id))
+                if timestamp_expiration is not None:
+                    heapq.heappush(self._heap, (timestamp_expiration, session_id))
+
+    def _pop_due(self, now):
+        """Retire du tas les échéances atteintes, retourne True s'il y en avait"""
+        due = False
+        while self._heap and self._heap[0][0] <= now:
+            heapq.heappop(self._heap)
+            due = True
+        return due
+
+    def _run(self):
+        interval = self.app.config['SESSION_CATCHUP_INTERVAL']
+
+        with self.app.app_context():
+            try:
+                self._load_pending()
+            except Exception as e:
+                print(f"Erreur lors du chargement des sessions actives: {e}")
+
+        next_catchup = 0
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                timeout = next_catchup - time.monotonic()
+                if self._heap:
+                    until_next = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                    timeout = min(timeout, until_next)
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+
+                due = self._pop_due(datetime.utcnow())
+
+            catchup = time.monotonic() >= next_catchup
+            if not due and not catchup:
+                continue
+
+            with self.app.app_context():
+                try:
+                    close_expired_sessions()
+                    activate_scheduled_sessions()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erreur lors de la fermeture automatique des sessions: {e}")
+
+            if catchup:
+                next_catchup = time.monotonic() + interval
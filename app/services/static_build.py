@@ -0,0 +1,212 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from datetime import datetime
+from multiprocessing import get_context
+from urllib.parse import unquote, urlsplit
+from flask import url_for
+from flask_frozen import UrlForLogger, conditional_context, patch_url_for, walk_directory
+from werkzeug.exceptions import HTTPException
+
+MANIFEST_NAME = 'build-manifest.json'
+
+# Configuration commune au processus principal et aux processus de rendu
+BUILD_CONFIG = {
+    'FREEZER_RELATIVE_URLS': True,
+    # Pas de fermeture automatique des sessions pendant le build
+    'SESSION_SCHEDULER_ENABLED': False
+}
+
+# Routes jamais rendues : leur vue a des effets de bord (auth.test_users
+# réécrit data/test_users.json et invalide les identités signées)
+EXCLUDED_ENDPOINTS = {'auth.test_users'}
+
+_worker_state = {}
+
+
+def _init_worker(config):
+    from app import create_app
+
+    app = create_app(dict(BUILD_CONFIG, **config))
+    _worker_state.clear()
+    _worker_state.update({'app': app, 'logger': UrlForLogger(app)})
+
+
+def url_to_filepath(url, mimetype='text/html'):
+    """/sessions/ → sessions/index.html, /equipments → equipments.html
+
+    Une page HTML sans extension ne peut pas être un simple fichier :
+    /equipments et /equipments/<id> entreraient en conflit. L'hébergeur sert
+    /equipments depuis equipments.html.
+    """
+    if url.endswith('/'):
+        url += 'index.html'
+    elif mimetype == 'text/html' and '.' not in url.rsplit('/', 1)[-1]:
+        url += '.html'
+    return url.lstrip('/')
+
+
+def resolve_urls(app, generated):
+    """Convertit des (endpoint, valeurs) ou des chemins en URL locales sans paramètres
+
+    Les routes de EXCLUDED_ENDPOINTS sont écartées, y compris quand une page
+    rendue y fait un lien.
+    """
+    urls = []
+    with app.test_request_context():
+        adapter = app.url_map.bind('localhost')
+        for item in generated:
+            url = unquote(item if isinstance(item, str) else url_for(item[0], **item[1]))
+            parsed = urlsplit(url)
+            if parsed.scheme or parsed.netloc:
+                raise ValueError(f"URL externe non prise en charge : {url}")
+            try:
+                endpoint = adapter.match(parsed.path)[0]
+            except HTTPException:
+                endpoint = None
+            if endpoint not in EXCLUDED_ENDPOINTS:
+                urls.append(parsed.path)
+    return urls
+
+
+def initial_urls(app, generators=()):
+    """Fichiers statiques, routes GET sans paramètre et URL des générateurs"""
+    generated = [('static', {'filename': filename}) for filename in walk_directory(app.static_folder)]
+    generated += [(rule.endpoint, {}) for rule in app.url_map.iter_rules()
+                  if not rule.arguments and 'GET' in rule.methods]
+    for generator in generators:
+        generated.extend(generator())
+    return resolve_urls(app, generated)
+
+
+def _render_urls(urls):
+    """Rend une liste d'URL ; retourne (url, contenu, type MIME, durée, URL découvertes) pour chacune
+
+    Les URL découvertes sont celles générées par url_for pendant le rendu
+    (liens, fichiers statiques) : elles sont rendues à la vague suivante.
+    """
+    app = _worker_state['app']
+    logger = _worker_state['logger']
+
+    results = []
+    for url in urls:
+        # Un client neuf par URL, comme Frozen-Flask : aucune session partagée entre pages
+        client = app.test_client()
+        started = time.perf_counter()
+        with logger:
+            with conditional_context(patch_url_for(app), app.config['FREEZER_RELATIVE_URLS']):
+                response = client.get(url, follow_redirects=True)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise ValueError(f"Statut inattendu {response.status} pour l'URL {url}")
+        content, mimetype = response.data, response.mimetype
+        response.close()
+        results.append((url, content, mimetype, elapsed, resolve_urls(app, logger.iter_calls())))
+    return results
+
+
+def load_build_manifest(destination):
+    try:
+        with open(os.path.join(destination, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'routes': {}}
+
+
+def _write_if_changed(path, content, digest, previous):
+    if previous and previous.get('sha256') == digest and os.path.isfile(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(content)
+    os.replace(path + '.tmp', path)
+    return True
+
+
+def freeze_site(destination, config=None, generators=(), processes=None, clean=False, out=print):
+    """Génère le site statique de façon incrémentale et parallèle
+
+    Chaque route est rendue par un pool de processus ; son contenu est haché
+    et le fichier n'est réécrit que si l'empreinte a changé depuis le build
+    précédent (build-manifest.json). Les fichiers des routes disparues sont
+    supprimés. Le manifeste liste pour chaque route le fichier, l'empreinte,
+    la taille et la durée de rendu, ainsi que les fichiers écrits et
+    supprimés : un déploiement peut n'envoyer que ceux-là.
+    """
+    from app import create_app
+
+    destination = os.path.abspath(destination)
+    if clean and os.path.exists(destination):
+        shutil.rmtree(destination)
+    os.makedirs(destination, exist_ok=True)
+
+    config = config or {}
+    app = create_app(dict(BUILD_CONFIG, **config))
+
+    previous = {'routes': {}} if clean else load_build_manifest(destination)
+    started = time.perf_counter()
+    routes = {}
+    written = []
+
+    def store(results, pending):
+        for url, content, mimetype, elapsed, discovered in results:
+            filename = url_to_filepath(url, mimetype)
+            digest = hashlib.sha256(content).hexdigest()
+            changed = _write_if_changed(os.path.join(destination, *filename.split('/')), content, digest,
+                                        previous['routes'].get(url))
+            if changed:
+                written.append(filename)
+            routes[url] = {'file': filename, 'sha256': digest, 'bytes': len(content),
+                           'render_ms': round(elapsed * 1000, 2), 'status': 'written' if changed else 'unchanged'}
+            pending.extend(discovered)
+
+    def waves(render):
+        pending = initial_urls(app, generators)
+        while pending:
+            wave = [url for url in dict.fromkeys(pending) if url not in routes]
+            pending = []
+            if wave:
+                render(wave, pending)
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _worker_state.update({'app': app, 'logger': UrlForLogger(app)})
+        waves(lambda wave, pending: store(_render_urls(wave), pending))
+    else:
+        with get_context('spawn').Pool(processes, initializer=_init_worker, initargs=(config,)) as pool:
+            def render(wave, pending):
+                size = max(1, math.ceil(len(wave) / (4 * processes)))
+                chunks = [wave[i:i + size] for i in range(0, len(wave), size)]
+                for results in pool.imap_unordered(_render_urls, chunks):
+                    store(results, pending)
+            waves(render)
+
+    # Fichiers des routes qui n'existent plus
+    built_files = {route['file'] for route in routes.values()}
+    removed = sorted({route['file'] for route in previous['routes'].values()} - built_files)
+    for filename in removed:
+        path = os.path.join(destination, *filename.split('/'))
+        if os.path.isfile(path):
+            os.remove(path)
+            directory = os.path.dirname(path)
+            while directory != destination and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+
+    manifest = {
+        'generated_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'processes': processes,
+        'duration_s': round(time.perf_counter() - started, 3),
+        'written': sorted(written),
+        'removed': removed,
+        'routes': dict(sorted(routes.items()))
+    }
+    with open(os.path.join(destination, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    out(f"{len(routes)} route(s) en {manifest['duration_s']}s ({processes} processus) : "
+        f"{len(written)} fichier(s) écrit(s), {len(removed)} supprimé(s)")
+    return manifest
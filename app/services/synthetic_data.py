@@ -0,0 +1,259 @@
+import math
+import os
+import random
+import uuid
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User, Equipment, Session, LogScan
+from app.services.academic_terms import term_for, term_bounds
+from app.services.qr_tokens import UNSCANNABLE_PREFIX
+
+ECOLE = "EAFC-TIC"
+DEFAULT_PASSWORD = '1234'
+BATCH_SIZE = 10000
+
+TYPES_EQUIPEMENT = ["Microscope", "Balance", "Oscilloscope", "Projecteur", "Imprimante 3D",
+                    "Centrifugeuse", "Spectromètre", "Tableau interactif"]
+PRENOMS = ["Marie", "Jean", "Sophie", "Lucas", "Emma", "Noah", "Léa", "Louis", "Chloé", "Hugo",
+           "Camille", "Arthur", "Manon", "Jules", "Sarah", "Nathan", "Julie", "Tom", "Inès", "Adam"]
+NOMS = ["Martin", "Dupont", "Dubois", "Lambert", "Peeters", "Janssens", "Leroy", "Simon", "Laurent",
+        "Lefebvre", "Michel", "Renard", "Fontaine", "Claes", "Goossens", "Mertens", "Lemaire", "Denis"]
+
+# Préréglages de volume : locaux, enseignants, étudiants, taille moyenne des
+# classes, créneaux hebdomadaires par enseignant et années d'historique
+SCALES = {
+    'small': dict(n_rooms=10, equipment_per_room=3, n_teachers=10, n_students=300,
+                  class_size=20, slots_per_teacher=6, years=1),
+    'medium': dict(n_rooms=40, equipment_per_room=4, n_teachers=60, n_students=3000,
+                   class_size=24, slots_per_teacher=10, years=2),
+    'large': dict(n_rooms=150, equipment_per_room=4, n_teachers=250, n_students=15000,
+                  class_size=25, slots_per_teacher=14, years=4)
+}
+
+HOURS = [8, 9, 10, 11, 13, 14, 15, 16, 17]
+DURATIONS = [60, 60, 120, 120, 180]
+
+# État partagé par les processus du pool (initialisé une fois par processus)
+_worker_state = {}
+
+
+def school_weeks(end_date, years):
+    """Retourne les lundis des semaines de cours sur les `years` dernières années
+
+    Sont exclus : juillet-août, le début septembre, les vacances d'hiver
+    (deux dernières semaines de décembre) et de printemps (début avril).
+    """
+    monday = end_date - timedelta(days=365 * years)
+    monday -= timedelta(days=monday.weekday())
+    weeks = []
+    while monday <= end_date:
+        holiday = (
+            monday.month in (7, 8)
+            or (monday.month == 9 and monday.day < 14)
+            or (monday.month == 12 and monday.day >= 20)
+            or (monday.month == 1 and monday.day < 3)
+            or (monday.month == 4 and monday.day <= 14)
+        )
+        if not holiday:
+            weeks.append(monday)
+        monday += timedelta(days=7)
+    return weeks
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _build_structure(rng, n_rooms, equipment_per_room, n_teachers, n_students, class_size, slots_per_teacher):
+    """Génère les données de référence : utilisateurs, locaux, classes et horaires"""
+    teachers = [{'id': f"prof{i}@ecole.be",
+                 'nom_complet': f"{rng.choice(PRENOMS)} {rng.choice(NOMS)}", 'role': 'Enseignant'}
+                for i in range(n_teachers)]
+    students = [{'id': f"etudiant{i}@ecole.be",
+                 'nom_complet': f"{rng.choice(PRENOMS)} {rng.choice(NOMS)}", 'role': 'Etudiant'}
+                for i in range(n_students)]
+
+    equipments = []
+    for room in range(n_rooms):
+        nom_salle = f"Local {100 + room}"
+        for type_equipement in rng.sample(TYPES_EQUIPEMENT, min(equipment_per_room, len(TYPES_EQUIPEMENT))):
+            equipment_id = f"EQ{len(equipments) + 1:05d}"
+            equipments.append({
+                'id': equipment_id,
+                'nom_salle': nom_salle,
+                'type_equipement': type_equipement,
+                'qr_code_statique_data': f"{ECOLE}_{equipment_id}_{type_equipement}_{nom_salle}"
+            })
+
+    # Classes de tailles variables autour de la taille moyenne
+    order = list(range(n_students))
+    rng.shuffle(order)
+    classes = []
+    position = 0
+    while position < n_students:
+        size = max(5, min(2 * class_size, int(rng.gauss(class_size, class_size * 0.2))))
+        classes.append(order[position:position + size])
+        position += size
+
+    # Assiduité propre à chaque étudiant (moyenne ~80 %)
+    attendance = [rng.betavariate(8, 2) for _ in range(n_students)]
+
+    # Horaire hebdomadaire : (enseignant, jour, heure, durée, équipement, classe)
+    schedule = []
+    for teacher_index in range(n_teachers):
+        busy = set()
+        for _ in range(slots_per_teacher):
+            weekday, hour = rng.randrange(5), rng.choice(HOURS)
+            if (weekday, hour) in busy:
+                continue
+            busy.add((weekday, hour))
+            schedule.append((teacher_index, weekday, hour, rng.choice(DURATIONS),
+                             rng.randrange(len(equipments)), rng.randrange(len(classes))))
+
+    return teachers, students, equipments, classes, attendance, schedule
+
+
+def _init_worker(state):
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def _generate_week(args):
+    """Génère les sessions et les scans d'une semaine de cours
+
+    Chaque semaine a sa propre graine dérivée de la graine globale : le
+    résultat ne dépend ni du nombre de processus ni de l'ordre d'exécution.
+    """
+    seed, monday = args
+    state = _worker_state
+    rng = random.Random(f"{seed}:{monday.isoformat()}")
+
+    # L'assiduité baisse légèrement au fil du quadrimestre
+    term_start, term_end = term_bounds(term_for(datetime.combine(monday, datetime.min.time())))
+    progress = (datetime.combine(monday, datetime.min.time()) - term_start) / (term_end - term_start)
+    fatigue = 1 - 0.15 * progress
+
+    sessions = []
+    logs = []
+    for teacher_index, weekday, hour, duration, equipment_index, class_index in state['schedule']:
+        # Quelques séances annulées (absence, jour férié)
+        if rng.random() < 0.05:
+            continue
+
+        teacher = state['teacher_ids'][teacher_index]
+        equipment = state['equipments'][equipment_index]
+        debut = datetime.combine(monday + timedelta(days=weekday), datetime.min.time()).replace(
+            hour=hour, minute=rng.choice([0, 0, 0, 5, 10]))
+        fin = debut + timedelta(minutes=duration)
+        session_id = _uuid(rng)
+        sessions.append({
+            'id': session_id,
+            'nom_session': f"Session {equipment['type_equipement']} - {debut.strftime('%d/%m/%Y %H:%M')}",
+            'timestamp_debut': debut,
+            'timestamp_fin': fin,
+            'timestamp_expiration': fin,
+            'user_id_enseignant': teacher,
+            'equipment_id': equipment['id'],
+            'qr_code_dynamique_data': f"{UNSCANNABLE_PREFIX}{session_id}",
+            'actif': False
+        })
+
+        for student_index in state['classes'][class_index]:
+            if rng.random() >= state['attendance'][student_index] * fatigue:
+                continue
+            # La plupart des étudiants scannent dans les premières minutes
+            delay = min(duration - 1, rng.expovariate(1 / 4))
+            logs.append({
+                'id': _uuid(rng),
+                'timestamp_scan': debut + timedelta(minutes=delay),
+                'session_id': session_id,
+                'user_id_etudiant': state['student_ids'][student_index]
+            })
+
+    return sessions, logs
+
+
+def _insert_batches(connection, model, rows):
+    # INSERT Core (executemany) : évite la couche ORM, inutile pour des dictionnaires
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(model.__table__), rows[start:start + BATCH_SIZE])
+
+
+def generate_dataset(scale='small', seed=42, processes=None, end_date=None, out=print, **overrides):
+    """Remplit la base avec un jeu de données synthétique réaliste
+
+    La génération des semaines de cours est répartie sur un pool de processus
+    et les lignes sont insérées par lots (INSERT multi-lignes) dans une seule
+    transaction. À graine et date de fin identiques, le jeu de données est
+    identique. Tous les utilisateurs ont le mot de passe '1234'.
+
+    Retourne un résumé : nombre de lignes par table et identifiants générés.
+    """
+    params = dict(SCALES[scale], **overrides)
+    years = params.pop('years')
+    end_date = end_date or date.today()
+    rng = random.Random(seed)
+
+    teachers, students, equipments, classes, attendance, schedule = _build_structure(rng, **params)
+
+    # Un seul hash partagé : le hachage est volontairement coûteux
+    password_hash = generate_password_hash(DEFAULT_PASSWORD)
+    users = [{'id': 'admin@ecole.be', 'nom_complet': 'Administrateur', 'role': 'Admin'}] + teachers + students
+    for user in users:
+        user['password_hash'] = password_hash
+    connection = db.session.connection()
+    _insert_batches(connection, User, users)
+    _insert_batches(connection, Equipment, equipments)
+
+    state = {
+        'schedule': schedule,
+        'classes': classes,
+        'attendance': attendance,
+        'equipments': equipments,
+        'teacher_ids': [teacher['id'] for teacher in teachers],
+        'student_ids': [student['id'] for student in students]
+    }
+    tasks = [(seed, monday) for monday in school_weeks(end_date, years)]
+
+    counts = {'sessions': 0, 'logs': 0}
+
+    # Les index secondaires sont reconstruits en une passe après le chargement,
+    # bien plus rapide que leur maintenance ligne par ligne
+    secondary_indexes = [index for model in (Session, LogScan) for index in model.__table__.indexes]
+    for index in secondary_indexes:
+        index.drop(connection, checkfirst=True)
+
+    def store(week_rows):
+        sessions, logs = week_rows
+        _insert_batches(connection, Session, sessions)
+        _insert_batches(connection, LogScan, logs)
+        counts['sessions'] += len(sessions)
+        counts['logs'] += len(logs)
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _init_worker(state)
+        for task in tasks:
+            store(_generate_week(task))
+    else:
+        with get_context('spawn').Pool(processes, initializer=_init_worker, initargs=(state,)) as pool:
+            # imap conserve l'ordre des semaines : l'ordre d'insertion est stable
+            chunksize = max(1, math.ceil(len(tasks) / (4 * processes)))
+            for week_rows in pool.imap(_generate_week, tasks, chunksize=chunksize):
+                store(week_rows)
+
+    for index in secondary_indexes:
+        index.create(connection)
+    db.session.commit()
+
+    summary = {
+        'counts': {'users': len(users), 'equipments': len(equipments), 'weeks': len(tasks), **counts},
+        'teacher_ids': state['teacher_ids'],
+        'student_ids': state['student_ids'],
+        'equipments': equipments
+    }
+    out(f"Jeu de données '{scale}' généré : {summary['counts']}")
+    return summary
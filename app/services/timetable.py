@@ -0,0 +1,447 @@
+import csv
+import io
+import os
+import re
+from calendar import timegm
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+from sqlalchemy import insert, select
+from app import db
+from app.models import Equipment, Session
+from app.services.jobs import enqueue
+from app.services.qr_images import cache_directory, store_qr_png
+from app.services.qr_tokens import DEFAULT_ROTATION_GRACE, make_session_token, rotation_seconds
+from app.services.scan_engine import UPSERT_DIALECTS, session_values
+from app.services.search import normalize
+from app.services.session_scheduler import get_session_scheduler
+from app.services.user_backend import get_user_backend
+
+# Emploi du temps : les créneaux importés (CSV ou iCalendar) deviennent des
+# sessions planifiées, créées d'avance en une insertion groupée. Leurs QR
+# codes tournants des premières minutes sont pré-rendus par des tâches de
+# fond (le pool de `flask jobs worker --processes N`) ; l'ordonnanceur
+# active chaque session au début de son créneau et la ferme à la fin. Le
+# scan de l'équipement par l'enseignant retrouve alors la session active et
+# son QR code est servi depuis le cache.
+
+DEFAULT_TIMEZONE = 'Europe/Brussels'
+PRERENDER_MINUTES = 10
+PRERENDER_CHUNK = 25
+# Sessions insérées par requête (limite du nombre de paramètres SQL)
+INSERT_CHUNK = 500
+# Occurrences générées au plus par événement récurrent
+MAX_OCCURRENCES = 500
+KEY_PREFIX = 'edt'
+
+CSV_COLUMNS = {
+    'equipement': 'equipement', 'salle': 'equipement',
+    'debut': 'debut', 'fin': 'fin',
+    'enseignant': 'enseignant',
+    'nom': 'nom', 'cours': 'nom'
+}
+
+_DURATION = re.compile(r'^P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+class Slot:
+    """Un créneau de l'emploi du temps (heures en UTC naïves, comme les sessions)"""
+
+    def __init__(self, line, equipment, start, end, teacher=None, name=None):
+        self.line = line
+        self.equipment = equipment
+        self.start = start
+        self.end = end
+        self.teacher = teacher
+        self.name = name
+
+
+def _to_utc(value, tz):
+    """Convertit une date locale (naïve, fuseau de l'école) ou avec fuseau en UTC naïf"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz)
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_csv_datetime(value):
+    value = (value or '').strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%d/%m/%Y %H:%M')
+
+
+def parse_csv(text, tz):
+    """Lit un emploi du temps CSV (séparateur ; , ou tabulation)
+
+    Colonnes : equipement (ID ou salle), debut, fin, enseignant et nom
+    (facultatifs). Retourne (créneaux, erreurs [(ligne, message)]).
+    """
+    try:
+        delimiter = csv.Sniffer().sniff(text[:4096], delimiters=';,\t').delimiter
+    except csv.Error:
+        delimiter = ';'
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+
+    header = next(reader, None)
+    if not header:
+        raise ValueError("Fichier vide.")
+    columns = {}
+    for i, name in enumerate(header):
+        key = CSV_COLUMNS.get(normalize(name).strip().replace(' ', '_'))
+        if key and key not in columns:
+            columns[key] = i
+    missing = [name for name in ('equipement', 'debut', 'fin') if name not in columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}.")
+
+    slots, errors = [], []
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        values = {key: row[i].strip() if i < len(row) else '' for key, i in columns.items()}
+        try:
+            start = _to_utc(_parse_csv_datetime(values['debut']), tz)
+            end = _to_utc(_parse_csv_datetime(values['fin']), tz)
+        except ValueError:
+            errors.append((reader.line_num, "Date invalide (AAAA-MM-JJ HH:MM attendu)."))
+            continue
+        slots.append(Slot(reader.line_num, values['equipement'], start, end,
+                          values.get('enseignant') or None, values.get('nom') or None))
+    return slots, errors
+
+
+def _ical_lines(text):
+    """Lignes iCalendar dépliées (une ligne commençant par un espace prolonge la précédente)"""
+    lines = []
+    for number, raw in enumerate(text.splitlines(), 1):
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] = (lines[-1][0], lines[-1][1] + raw[1:])
+        elif raw.strip():
+            lines.append((number, raw))
+    return lines
+
+
+def _ical_property(line):
+    name_part, _, value = line.partition(':')
+    name, *params = name_part.split(';')
+    return name.upper(), dict(param.split('=', 1) for param in params if '=' in param), value
+
+
+def _ical_text(value):
+    return (value.replace('\\n', ' ').replace('\\N', ' ').replace('\\,', ',')
+            .replace('\\;', ';').replace('\\\\', '\\').strip())
+
+
+def _ical_datetime(value, params, tz):
+    """Date iCalendar avec fuseau (UTC, TZID ou heure locale de l'école)"""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        raise ValueError("Événement sur une journée entière.")
+    if value.endswith('Z'):
+        return datetime.strptime(value[:-1], '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc)
+    zone = tz
+    if 'TZID' in params:
+        try:
+            zone = ZoneInfo(params['TZID'].strip('"'))
+        except (ZoneInfoNotFoundError, ValueError):
+            zone = tz
+    return datetime.strptime(value, '%Y%m%dT%H%M%S').replace(tzinfo=zone)
+
+
+def _ical_duration(value):
+    match = _DURATION.match(value.strip().lstrip('+'))
+    if not match or not any(match.groups()):
+        raise ValueError("Durée invalide.")
+    weeks, days, hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def _occurrences(start, rule):
+    """Débuts des occurrences d'un événement (RRULE quotidienne ou hebdomadaire)
+
+    Les occurrences sont calculées en heure locale : un cours de 8 h reste
+    à 8 h après un changement d'heure.
+    """
+    if not rule:
+        return [start]
+
+    parts = dict(part.split('=', 1) for part in rule.split(';') if '=' in part)
+    steps = {'DAILY': timedelta(days=1), 'WEEKLY': timedelta(weeks=1)}
+    if parts.get('FREQ') not in steps:
+        raise ValueError("Récurrence non prise en charge (quotidienne ou hebdomadaire uniquement).")
+    if 'BYDAY' in parts and parts['BYDAY'] != 'MO TU WE TH FR SA SU'.split()[start.weekday()]:
+        raise ValueError("Récurrence non prise en charge (BYDAY différent du jour de début).")
+
+    step = steps[parts['FREQ']] * int(parts.get('INTERVAL', 1))
+    count = min(int(parts.get('COUNT', MAX_OCCURRENCES)), MAX_OCCURRENCES)
+    until = None
+    if 'UNTIL' in parts:
+        until = _ical_datetime(parts['UNTIL'] if 'T' in parts['UNTIL'] else parts['UNTIL'] + 'T235959',
+                               {}, start.tzinfo)
+
+    occurrences = []
+    for k in range(count):
+        occurrence = start + step * k
+        if until is not None and occurrence > until:
+            break
+        occurrences.append(occurrence)
+    return occurrences
+
+
+def parse_ical(text, tz):
+    """Lit un emploi du temps iCalendar (.ics)
+
+    Chaque VEVENT donne un créneau par occurrence : l'équipement est
+    X-EQUIPEMENT ou LOCATION (ID ou salle), l'enseignant l'ORGANIZER
+    (facultatif), le nom de la session le SUMMARY.
+    Retourne (créneaux, erreurs [(ligne, message)]).
+    """
+    slots, errors = [], []
+    event = None
+    for line_number, line in _ical_lines(text):
+        name, params, value = _ical_property(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {'line': line_number, 'exdates': []}
+        elif name == 'END' and value.upper() == 'VEVENT' and event is not None:
+            try:
+                slots.extend(_event_slots(event, tz))
+            except (KeyError, ValueError) as e:
+                message = f"Propriété {e} manquante." if isinstance(e, KeyError) else str(e)
+                errors.append((event['line'], message))
+            event = None
+        elif event is not None:
+            if name == 'EXDATE':
+                event['exdates'].extend((params, item) for item in value.split(','))
+            elif name in ('DTSTART', 'DTEND', 'DURATION', 'RRULE', 'SUMMARY', 'LOCATION', 'X-EQUIPEMENT', 'ORGANIZER'):
+                event[name] = (params, value)
+    if not slots and not errors:
+        raise ValueError("Aucun événement (VEVENT) dans le fichier.")
+    return slots, errors
+
+
+def _event_slots(event, tz):
+    start = _ical_datetime(event['DTSTART'][1], event['DTSTART'][0], tz)
+    if 'DTEND' in event:
+        duration = _ical_datetime(event['DTEND'][1], event['DTEND'][0], tz) - start
+    else:
+        duration = _ical_duration(event['DURATION'][1])
+
+    equipment = _ical_text((event.get('X-EQUIPEMENT') or event['LOCATION'])[1])
+    teacher = None
+    if 'ORGANIZER' in event:
+        teacher = re.sub(r'^mailto:', '', event['ORGANIZER'][1], flags=re.IGNORECASE).strip() or None
+    name = _ical_text(event['SUMMARY'][1]) if 'SUMMARY' in event else None
+
+    exdates = {_to_utc(_ical_datetime(value, params, tz), tz) for params, value in event['exdates']}
+    rule = event['RRULE'][1] if 'RRULE' in event else None
+    return [Slot(event['line'], equipment, _to_utc(occurrence, tz), _to_utc(occurrence + duration, tz), teacher, name)
+            for occurrence in _occurrences(start, rule)
+            if _to_utc(occurrence, tz) not in exdates]
+
+
+def timetable_timezone():
+    """Fuseau horaire des heures de l'emploi du temps (TIMETABLE_TIMEZONE)"""
+    try:
+        return ZoneInfo(current_app.config['TIMETABLE_TIMEZONE'])
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Fuseau horaire inconnu : {current_app.config['TIMETABLE_TIMEZONE']}")
+
+
+def parse_timetable(content, filename=None):
+    """Lit un fichier d'emploi du temps (CSV ou iCalendar selon l'extension ou le contenu)"""
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            content = content.decode('latin-1')
+
+    tz = timetable_timezone()
+    if (filename or '').lower().endswith('.ics') or content.lstrip().upper().startswith('BEGIN:VCALENDAR'):
+        return parse_ical(content, tz)
+    return parse_csv(content, tz)
+
+
+def provision_sessions(rows):
+    """Insère les sessions planifiées par lots, retourne les IDs créés
+
+    Un créneau déjà importé (même enseignant et même clé d'idempotence :
+    équipement et heure de début) est ignoré : réimporter le même emploi du
+    temps ne crée pas de doublons.
+    """
+    created = []
+    dialect = db.session.get_bind(Session).dialect.name
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        if dialect in UPSERT_DIALECTS:
+            statement = (UPSERT_DIALECTS[dialect](Session).values(chunk)
+                         .on_conflict_do_nothing(index_elements=['user_id_enseignant', 'cle_idempotence'])
+                         .returning(Session.id))
+            created.extend(db.session.execute(statement).scalars())
+        else:
+            existing = set(db.session.execute(
+                select(Session.user_id_enseignant, Session.cle_idempotence)
+                .where(Session.cle_idempotence.in_([row['cle_idempotence'] for row in chunk]))
+            ).tuples())
+            chunk = [row for row in chunk if (row['user_id_enseignant'], row['cle_idempotence']) not in existing]
+            if chunk:
+                db.session.execute(insert(Session), chunk)
+            created.extend(row['id'] for row in chunk)
+    db.session.commit()
+    return created
+
+
+def import_timetable(content, filename=None, teacher_id=None, created_by=None, now=None):
+    """Importe un emploi du temps et pré-crée les sessions de ses créneaux à venir
+
+    teacher_id impose l'enseignant (import par un enseignant de son propre
+    emploi du temps) ; sinon la colonne enseignant (ORGANIZER en iCalendar)
+    est obligatoire. Les créneaux passés sont ignorés, les lignes invalides
+    sont signalées sans bloquer les autres. Les sessions créées sont
+    programmées dans l'ordonnanceur et leurs QR codes pré-rendus par des
+    tâches de fond. Retourne le bilan de l'import.
+    """
+    now = now or datetime.utcnow()
+    slots, errors = parse_timetable(content, filename)
+
+    equipments = {}
+    rooms = defaultdict(list)
+    for equipment in Equipment.query.all():
+        equipments[equipment.id.lower()] = equipment
+        rooms[normalize(equipment.nom_salle)].append(equipment)
+    db.session.commit()
+
+    teachers = {}
+    if teacher_id is None:
+        teachers = get_user_backend().get_users_by_ids({slot.teacher for slot in slots if slot.teacher})
+
+    rows = []
+    planned = defaultdict(list)
+    past = 0
+    for slot in slots:
+        equipment = equipments.get(slot.equipment.lower())
+        if equipment is None:
+            candidates = rooms.get(normalize(slot.equipment), [])
+            equipment = candidates[0] if len(candidates) == 1 else None
+            if len(candidates) > 1:
+                errors.append((slot.line, f"Salle {slot.equipment} : plusieurs équipements, indiquez l'ID."))
+                continue
+        if equipment is None:
+            errors.append((slot.line, f"Équipement inconnu : {slot.equipment}."))
+            continue
+
+        teacher = teacher_id
+        if teacher is None:
+            user = teachers.get((slot.teacher or '').lower())
+            if user is None or user['role'] not in ['Admin', 'Enseignant']:
+                errors.append((slot.line, f"Enseignant inconnu : {slot.teacher or '(vide)'}."))
+                continue
+            teacher = user['id']
+
+        if slot.end <= slot.start:
+            errors.append((slot.line, "La fin du créneau précède son début."))
+            continue
+        if slot.end <= now:
+            past += 1
+            continue
+
+        # Une seule session active par enseignant et équipement : pas de chevauchement
+        pair = (equipment.id, teacher)
+        if any(slot.start < end and start < slot.end for start, end in planned[pair]):
+            errors.append((slot.line, "Ce créneau chevauche un autre créneau du même équipement."))
+            continue
+        planned[pair].append((slot.start, slot.end))
+
+        extra = {'nom_session': slot.name[:100]} if slot.name else {}
+        rows.append(session_values(equipment, teacher, slot.start, slot.end, actif=False, planifiee=True,
+                                   cle_idempotence=f"{KEY_PREFIX}:{equipment.id}:{slot.start.strftime('%Y%m%dT%H%M')}",
+                                   **extra))
+
+    created = provision_sessions(rows)
+
+    # Activation au début du créneau et fermeture à la fin
+    scheduler = get_session_scheduler()
+    created_ids = set(created)
+    for row in rows:
+        if row['id'] in created_ids:
+            scheduler.schedule(row['id'], row['timestamp_debut'])
+            scheduler.schedule(row['id'], row['timestamp_expiration'])
+
+    return {
+        'creees': len(created),
+        'existantes': len(rows) - len(created),
+        'passees': past,
+        'erreurs': sorted(errors),
+        'taches': enqueue_prerender(created, created_by)
+    }
+
+
+def enqueue_prerender(session_ids, created_by=None):
+    """Met en file le pré-rendu des QR codes, par lots de sessions, retourne le nombre de tâches"""
+    chunk = current_app.config['QR_PRERENDER_CHUNK']
+    if not session_ids or not cache_directory() or not rotation_seconds():
+        return 0
+
+    count = 0
+    for start in range(0, len(session_ids), chunk):
+        enqueue('prerendu_qr_sessions', {'session_ids': session_ids[start:start + chunk], 'purge': start == 0},
+                created_by=created_by)
+        count += 1
+    return count
+
+
+def session_qr_payloads(session, minutes):
+    """Jetons tournants des premières minutes d'une session et leur fin de validité (timestamp Unix)
+
+    Le jeton d'une période est déterministe : il peut être rendu des
+    semaines à l'avance.
+    """
+    period = rotation_seconds()
+    if not period:
+        return []
+
+    grace = current_app.config.get('QR_TOKEN_ROTATION_GRACE', DEFAULT_ROTATION_GRACE)
+    start = timegm(session.timestamp_debut.timetuple())
+    end = start + minutes * 60
+    if session.timestamp_expiration is not None:
+        end = min(end, timegm(session.timestamp_expiration.timetuple()))
+
+    first = start - start % period
+    return [(make_session_token(session, now=t), t + period * (1 + grace)) for t in range(first, end, period)]
+
+
+def prerender_session_qr_codes(session_ids, progress=None):
+    """Rend les QR codes des sessions dans le cache partagé, retourne le nombre d'images écrites"""
+    directory = cache_directory()
+    if not directory:
+        return 0
+
+    minutes = current_app.config['QR_PRERENDER_MINUTES']
+    sessions = Session.query.filter(Session.id.in_(session_ids)).all()
+    payloads = [session_qr_payloads(session, minutes) for session in sessions]
+    db.session.commit()
+
+    written = 0
+    for i, session_payloads in enumerate(payloads):
+        if progress is not None:
+            progress(i, len(session_ids))
+        for data, valid_until in session_payloads:
+            written += store_qr_png(directory, data, valid_until)
+    return written
+
+
+class TimetableImport:
+    """Configuration de l'import de l'emploi du temps et du pré-rendu des QR codes"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TIMETABLE_TIMEZONE', os.environ.get('TIMETABLE_TIMEZONE', DEFAULT_TIMEZONE))
+        # Minutes de QR codes tournants pré-rendues à partir du début de chaque créneau
+        app.config.setdefault('QR_PRERENDER_MINUTES', int(os.environ.get('QR_PRERENDER_MINUTES', PRERENDER_MINUTES)))
+        app.config.setdefault('QR_PRERENDER_CHUNK', int(os.environ.get('QR_PRERENDER_CHUNK', PRERENDER_CHUNK)))
+        app.config.setdefault('QR_IMAGE_CACHE_DIR',
+                              os.environ.get('QR_IMAGE_CACHE_DIR', os.path.join(app.instance_path, 'qr_cache')))
+        app.extensions['timetable'] = self
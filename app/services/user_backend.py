@@ -0,0 +1,324 @@
+import os
+import time
+from bisect import bisect_left
+from werkzeug.security import generate_password_hash, check_password_hash
+from dotenv import load_dotenv
+from app import db
+from app.models import User, UserStoreVersion
+from app.services.search import PAGE_SIZE, normalize, query_tokens, page_info, search_ids
+
+load_dotenv()
+
+VALID_ROLES = ["Admin", "Enseignant", "Etudiant"]
+
+
+class UserBackend:
+    """Interface commune des sources d'utilisateurs (fichier JSON, base de données...)
+
+    Les utilisateurs sont toujours échangés sous forme de dictionnaires
+    (id, nom_complet, role, password_hash) pour que les contrôleurs
+    n'aient pas à connaître le stockage sous-jacent.
+    """
+
+    def get_users(self, force_refresh=False):
+        """Récupère la liste de tous les utilisateurs"""
+        raise NotImplementedError
+
+    def get_user_by_id(self, user_id):
+        """Récupère un utilisateur par son ID (email), ou None"""
+        raise NotImplementedError
+
+    def get_users_by_ids(self, user_ids):
+        """Récupère plusieurs utilisateurs en une seule opération, indexés par ID"""
+        raise NotImplementedError
+
+    def get_users_by_role(self, role):
+        """Récupère tous les utilisateurs ayant un rôle spécifique"""
+        raise NotImplementedError
+
+    def authenticate_user(self, email, password):
+        """Authentifie un utilisateur, retourne ses données ou None"""
+        raise NotImplementedError
+
+    def create_user(self, email, nom_complet, role, password):
+        """Crée un nouvel utilisateur, retourne (succès, message)"""
+        raise NotImplementedError
+
+    def update_user(self, email, nom_complet=None, role=None, password=None):
+        """Met à jour un utilisateur existant, retourne (succès, message)"""
+        raise NotImplementedError
+
+    def delete_user(self, email):
+        """Supprime un utilisateur, retourne (succès, message)"""
+        raise NotImplementedError
+
+    def create_test_users_file(self):
+        """Crée les utilisateurs de test et les retourne"""
+        raise NotImplementedError
+
+    def version(self):
+        """Version courante du stockage, modifiée par toute écriture (None si non suivie)"""
+        return None
+
+    def search_users(self, query, role=None, page=1, per_page=PAGE_SIZE):
+        """Recherche par préfixe sur le nom et l'email, résultats paginés triés par rôle puis nom
+
+        Implémentation en mémoire : index trié (mot, utilisateur) reconstruit
+        quand la version du stockage change, chaque mot de la requête est
+        cherché par dichotomie.
+        """
+        users = self.get_users()
+        key = (self.version(), id(users), len(users))
+        cached = getattr(self, '_search_index', None)
+        if cached is None or cached[0] != key:
+            entries = sorted({(word, i) for i, user in enumerate(users)
+                              for word in query_tokens(f"{user['id']} {user['nom_complet']}")})
+            cached = (key, [word for word, _ in entries], [i for _, i in entries])
+            self._search_index = cached
+        _, words, positions = cached
+
+        matches = None
+        for token in query_tokens(query):
+            found = set()
+            j = bisect_left(words, token)
+            while j < len(words) and words[j].startswith(token):
+                found.add(positions[j])
+                j += 1
+            matches = found if matches is None else matches & found
+
+        results = [users[i] for i in matches] if matches is not None else list(users)
+        if role:
+            results = [user for user in results if user['role'] == role]
+        results.sort(key=lambda user: (user['role'], normalize(user['nom_complet'])))
+
+        page, pages = page_info(len(results), page, per_page)
+        return {
+            'items': results[(page - 1) * per_page:page * per_page],
+            'total': len(results),
+            'page': page,
+            'pages': pages
+        }
+
+    def cached_version(self, ttl):
+        """Version du stockage relue au plus une fois toutes les ttl secondes
+
+        Les écritures faites par ce processus invalident le cache (voir
+        version_changed) ; celles d'autres processus sont vues après ttl.
+        """
+        now = time.monotonic()
+        checked = getattr(self, '_version_checked', None)
+        if checked is None or now - checked[0] >= ttl:
+            checked = (now, self.version())
+            self._version_checked = checked
+        return checked[1]
+
+    def version_changed(self):
+        """Oublie la version en cache après une écriture"""
+        self._version_checked = None
+
+
+def build_test_users():
+    """Construit la liste des utilisateurs de test (mot de passe '1234')"""
+    test_users = [
+        ("admin@ecole.be", "Administrateur", "Admin"),
+        ("prof1@ecole.be", "Jean Dupont", "Enseignant"),
+        ("prof2@ecole.be", "Marie Curie", "Enseignant"),
+        ("prof3@ecole.be", "Albert Einstein", "Enseignant"),
+        ("etudiant1@ecole.be", "Pierre Martin", "Etudiant"),
+        ("etudiant2@ecole.be", "Sophie Dubois", "Etudiant"),
+        ("etudiant3@ecole.be", "Lucas Bernard", "Etudiant")
+    ]
+    return [
+        {"id": email, "nom_complet": nom, "role": role, "password": "1234", "password_hash": generate_password_hash("1234")}
+        for email, nom, role in test_users
+    ]
+
+
+class SqlUserBackend(UserBackend):
+    """Stocke les utilisateurs dans la table 'users' de la base de données
+
+    Les IDs (emails) sont normalisés en minuscules à l'écriture, ce qui permet
+    d'utiliser la clé primaire pour les recherches insensibles à la casse.
+    Les sessions et les scans référencent directement cette table, les
+    jointures enseignant/étudiant se font donc en SQL.
+    """
+
+    def version(self):
+        row = db.session.get(UserStoreVersion, 1)
+        return row.version if row else 0
+
+    def search_users(self, query, role=None, page=1, per_page=PAGE_SIZE):
+        """Recherche plein texte (FTS5 sous SQLite, tsvector/trigrammes sous PostgreSQL)"""
+        ids, total = search_ids('users', query, page, per_page,
+                                where='t.role = :role' if role else None, params={'role': role},
+                                order_by='t.role, t.nom_complet')
+        page, pages = page_info(total, page, per_page)
+        users = self.get_users_by_ids(ids)
+        return {
+            'items': [users[user_id] for user_id in ids if user_id in users],
+            'total': total,
+            'page': page,
+            'pages': pages
+        }
+
+    def _bump_version(self):
+        """Incrémente la version du stockage dans la transaction en cours"""
+        row = db.session.get(UserStoreVersion, 1)
+        if row is None:
+            db.session.add(UserStoreVersion(id=1, version=1))
+        else:
+            row.version = UserStoreVersion.version + 1
+        self.version_changed()
+
+    def _to_dict(self, user):
+        """Convertit un modèle User en dictionnaire"""
+        return {
+            'id': user.id,
+            'nom_complet': user.nom_complet,
+            'role': user.role,
+            'password_hash': user.password_hash
+        }
+
+    def get_users(self, force_refresh=False):
+        users = User.query.order_by(User.role, User.nom_complet).all()
+        return [self._to_dict(user) for user in users]
+
+    def get_user_by_id(self, user_id):
+        if not user_id:
+            return None
+        user = db.session.get(User, user_id.lower())
+        return self._to_dict(user) if user else None
+
+    def get_users_by_ids(self, user_ids):
+        ids = {user_id.lower() for user_id in user_ids if user_id}
+        if not ids:
+            return {}
+        users = User.query.filter(User.id.in_(ids)).all()
+        return {user.id: self._to_dict(user) for user in users}
+
+    def get_users_by_role(self, role):
+        users = User.query.filter_by(role=role).order_by(User.nom_complet).all()
+        return [self._to_dict(user) for user in users]
+
+    def authenticate_user(self, email, password):
+        user = self.get_user_by_id(email)
+        if user and user['password_hash'] and check_password_hash(user['password_hash'], password):
+            return user
+        return None
+
+    def create_user(self, email, nom_complet, role, password):
+        if self.get_user_by_id(email):
+            return False, "Un utilisateur avec cet email existe déjà"
+
+        if role not in VALID_ROLES:
+            return False, f"Le rôle doit être l'un des suivants : {', '.join(VALID_ROLES)}"
+
+        try:
+            db.session.add(User(
+                id=email.lower(),
+                nom_complet=nom_complet,
+                role=role,
+                password_hash=generate_password_hash(password)
+            ))
+            self._bump_version()
+            db.session.commit()
+            return True, "Utilisateur créé avec succès"
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Erreur lors de la création de l'utilisateur : {str(e)}"
+
+    def update_user(self, email, nom_complet=None, role=None, password=None):
+        user = db.session.get(User, email.lower())
+        if not user:
+            return False, "Utilisateur non trouvé"
+
+        if role and role not in VALID_ROLES:
+            return False, f"Le rôle doit être l'un des suivants : {', '.join(VALID_ROLES)}"
+
+        if nom_complet:
+            user.nom_complet = nom_complet
+        if role:
+            user.role = role
+        if password:
+            user.password_hash = generate_password_hash(password)
+
+        try:
+            self._bump_version()
+            db.session.commit()
+            return True, "Utilisateur mis à jour avec succès"
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Erreur lors de la mise à jour de l'utilisateur : {str(e)}"
+
+    def delete_user(self, email):
+        user = db.session.get(User, email.lower())
+        if not user:
+            return False, "Utilisateur non trouvé"
+
+        # Vérifier si c'est le dernier administrateur
+        if user.role == 'Admin' and User.query.filter_by(role='Admin').count() <= 1:
+            return False, "Impossible de supprimer le dernier administrateur"
+
+        try:
+            db.session.delete(user)
+            self._bump_version()
+            db.session.commit()
+            return True, "Utilisateur supprimé avec succès"
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Erreur lors de la suppression de l'utilisateur : {str(e)}"
+
+    def import_users(self, users):
+        """Insère ou met à jour une liste d'utilisateurs (format JSON) en une transaction"""
+        existing = {user.id: user for user in User.query.filter(
+            User.id.in_([u['id'].lower() for u in users])
+        ).all()}
+
+        for data in users:
+            user_id = data['id'].lower()
+            password_hash = data.get('password_hash') or generate_password_hash(data.get('password', '1234'))
+            user = existing.get(user_id)
+            if user:
+                user.nom_complet = data['nom_complet']
+                user.role = data['role']
+                user.password_hash = password_hash
+            else:
+                db.session.add(User(
+                    id=user_id,
+                    nom_complet=data['nom_complet'],
+                    role=data['role'],
+                    password_hash=password_hash
+                ))
+
+        self._bump_version()
+        db.session.commit()
+        return len(users)
+
+    def create_test_users_file(self):
+        test_users = build_test_users()
+        self.import_users(test_users)
+        return test_users
+
+
+_backend = None
+
+
+def get_user_backend():
+    """Retourne l'instance partagée du backend d'utilisateurs configuré
+
+    Le backend est choisi par la variable d'environnement USER_BACKEND :
+    'json' (par défaut, fichier data/test_users.json) ou 'sql' (table users).
+    """
+    global _backend
+
+    if _backend is None:
+        backend_name = os.environ.get('USER_BACKEND', 'json').lower()
+        if backend_name == 'sql':
+            _backend = SqlUserBackend()
+        elif backend_name == 'json':
+            from app.services.auth_service import AuthService
+            _backend = AuthService()
+        else:
+            raise ValueError(f"Backend d'utilisateurs inconnu : {backend_name}")
+
+    return _backend
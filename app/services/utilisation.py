@@ -0,0 +1,265 @@
+import calendar
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, func, cast, Integer
+from app import db
+from app.models import Session, Equipment
+from app.services.attendance_store import scan_source
+
+HOURS_PER_WEEK = 168
+DEFAULT_WEEKS = 12
+# Période maximale : les tableaux horaires grandissent avec le nombre de semaines
+MAX_WEEKS = 104
+
+# Heures d'ouverture : du lundi au vendredi, de 8 h à 18 h
+OPENING_DAYS = range(5)
+OPENING_HOURS = (8, 18)
+
+# Une session dure au plus une journée
+MAX_SESSION = timedelta(days=1)
+
+
+def _epoch(timestamp):
+    """Secondes depuis l'epoch d'une date naïve en UTC"""
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+def _epoch_column(column, dialect):
+    """Expression SQL des secondes depuis l'epoch (évite de construire des datetime en Python)"""
+    if dialect == 'sqlite':
+        return cast(func.strftime('%s', column), Integer)
+    return cast(func.extract('epoch', column), Integer)
+
+
+def default_window(now=None):
+    """Période par défaut : les DEFAULT_WEEKS dernières semaines, jusqu'à la fin de la journée"""
+    end = datetime.combine((now or datetime.utcnow()).date() + timedelta(days=1), datetime.min.time())
+    return end - timedelta(weeks=DEFAULT_WEEKS), end
+
+
+def opening_mask():
+    """Masque (168,) des heures d'ouverture de la semaine, lundi 0 h en premier"""
+    mask = np.zeros(HOURS_PER_WEEK, dtype=bool)
+    for day in OPENING_DAYS:
+        mask[day * 24 + OPENING_HOURS[0]:day * 24 + OPENING_HOURS[1]] = True
+    return mask
+
+
+def load_sessions(start, end, equipment_ids, now=None):
+    """Charge en bloc les sessions de la période dans des tableaux NumPy
+
+    Une seule requête retourne, pour chaque session, l'équipement, le début
+    et la fin (en secondes depuis l'epoch, calculés en SQL) et le nombre de
+    scans (table vivante et archives). Une session sans fin connue est
+    considérée comme ouverte jusqu'à maintenant.
+
+    Retourne (indices d'équipement, débuts, fins, scans) ; les indices
+    renvoient à equipment_ids (trié).
+    """
+    dialect = db.engine.dialect.name
+    scans = scan_source(start=start - MAX_SESSION, end=end + MAX_SESSION)
+    counts = select(scans.c.session_id, func.count().label('nb_scans')).group_by(scans.c.session_id).subquery()
+
+    stmt = (
+        select(
+            Session.equipment_id,
+            _epoch_column(Session.timestamp_debut, dialect),
+            func.coalesce(_epoch_column(Session.timestamp_fin, dialect),
+                          _epoch_column(Session.timestamp_expiration, dialect),
+                          _epoch(now or datetime.utcnow())),
+            func.coalesce(counts.c.nb_scans, 0)
+        )
+        .outerjoin(counts, counts.c.session_id == Session.id)
+        .where(Session.timestamp_debut >= start - MAX_SESSION, Session.timestamp_debut < end)
+    )
+    # Curseur DB-API directement : colonnes entières ou textuelles, sans
+    # construction d'objets Row par SQLAlchemy
+    rows = db.session.connection().execute(stmt).cursor.fetchall()
+    if not rows or not len(equipment_ids):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    session_equipments, starts, ends, nb_scans = zip(*rows)
+    session_equipments = np.array(session_equipments, dtype=str)
+    codes = np.minimum(np.searchsorted(equipment_ids, session_equipments), len(equipment_ids) - 1)
+    # Sessions d'équipements supprimés : ignorées
+    known = equipment_ids[codes] == session_equipments
+
+    return (codes[known],
+            np.array(starts, dtype=np.int64)[known],
+            np.array(ends, dtype=np.int64)[known],
+            np.array(nb_scans, dtype=np.int64)[known])
+
+
+def hourly_occupancy(groups, starts, ends, n_groups, n_hours):
+    """Heures occupées par groupe et par heure, tableau (n_groups, n_hours)
+
+    starts et ends sont exprimés en heures (flottants) depuis l'origine. Les
+    heures partielles de début et de fin sont ajoutées par bincount, les
+    heures pleines intermédiaires par un tableau de différences cumulé :
+    aucun parcours des sessions en Python.
+    """
+    size = n_hours + 1
+    first = np.floor(starts).astype(np.int64)
+    last = np.floor(ends).astype(np.int64)
+    base = groups * size
+    same = first == last
+    length = n_groups * size
+
+    partial = np.bincount(base + first, weights=np.where(same, ends - starts, first + 1 - starts), minlength=length)
+    partial += np.bincount(base[~same] + last[~same], weights=(ends - last)[~same], minlength=length)
+
+    inner = last - first > 1
+    diff = (np.bincount(base[inner] + first[inner] + 1, minlength=length)
+            - np.bincount(base[inner] + last[inner], minlength=length))
+    full = np.cumsum(diff.reshape(n_groups, size), axis=1)
+
+    return (partial.reshape(n_groups, size) + full)[:, :n_hours]
+
+
+def peak_concurrency(groups, starts, ends, n_groups):
+    """Nombre maximal de sessions simultanées par groupe et moment du pic
+
+    Balayage d'événements vectorisé : les fins (-1) puis les débuts (+1) sont
+    triés (tri stable, une fin passe donc avant un début au même instant)
+    sur une clé unique groupe × durée + instant, et la somme cumulée donne
+    l'occupation courante. Chaque groupe totalise zéro, la somme cumulée
+    globale est donc exacte groupe par groupe.
+    Retourne (pics, instants des pics) ; l'instant vaut NaN sans session.
+    """
+    peaks = np.zeros(n_groups, dtype=np.int64)
+    moments = np.full(n_groups, np.nan)
+    if not len(starts):
+        return peaks, moments
+
+    event_groups = np.concatenate([groups, groups])
+    times = np.concatenate([ends, starts])
+    deltas = np.concatenate([-np.ones(len(ends), dtype=np.int64), np.ones(len(starts), dtype=np.int64)])
+
+    span = float(times.max()) + 1
+    order = np.argsort(event_groups * span + times, kind='stable')
+    event_groups, times = event_groups[order], times[order]
+    running = np.cumsum(deltas[order])
+
+    boundaries = np.flatnonzero(np.r_[True, event_groups[1:] != event_groups[:-1]])
+    present = event_groups[boundaries]
+    peaks[present] = np.maximum.reduceat(running, boundaries)
+
+    hits = np.flatnonzero(running == peaks[event_groups])
+    hit_groups, first_hit = np.unique(event_groups[hits], return_index=True)
+    moments[hit_groups] = times[hits[first_hit]]
+
+    return peaks, moments
+
+
+def weekly_trend(weekly):
+    """Pente (unités par semaine) de la régression linéaire de chaque ligne"""
+    weeks = weekly.shape[1]
+    if weeks < 2:
+        return np.zeros(weekly.shape[0])
+    x = np.arange(weeks) - (weeks - 1) / 2
+    return (weekly - weekly.mean(axis=1, keepdims=True)) @ x / (x @ x)
+
+
+def utilisation_report(start=None, end=None, now=None):
+    """Rapport d'utilisation des salles et des équipements sur [start, end[
+
+    - carte de chaleur salle × heure de la semaine (sessions simultanées
+      moyennes par créneau)
+    - taux d'occupation sur les heures d'ouverture, par salle et par équipement
+    - pics de sessions simultanées (global, par salle, par équipement)
+    - heures d'utilisation et scans par semaine et tendance par équipement
+    """
+    if start is None or end is None:
+        start, end = default_window(now)
+    if end <= start:
+        raise ValueError("La fin de la période doit suivre son début")
+    if end - start > timedelta(weeks=MAX_WEEKS):
+        raise ValueError(f"La période ne peut pas dépasser {MAX_WEEKS} semaines")
+
+    # Triés en Python (ordre des points de code, comme NumPy) pour searchsorted
+    equipments = sorted(db.session.execute(
+        select(Equipment.id, Equipment.nom_salle, Equipment.type_equipement)
+    ).all(), key=lambda row: row.id)
+    equipment_ids = np.array([row.id for row in equipments], dtype=str)
+    rooms, room_of_equipment = np.unique(np.array([row.nom_salle for row in equipments], dtype=str), return_inverse=True)
+    n_equipments, n_rooms = len(equipments), len(rooms)
+
+    # Origine : le lundi 0 h précédant le début, pour replier le temps en semaines
+    origin = datetime.combine(start.date() - timedelta(days=start.weekday()), datetime.min.time())
+    weeks = -(-(end - origin) // timedelta(weeks=1))
+    n_hours = weeks * HOURS_PER_WEEK
+    t0, t_start, t_end = _epoch(origin), _epoch(start), _epoch(end)
+
+    codes, starts, ends, nb_scans = load_sessions(start, end, equipment_ids, now=now)
+    starts = (np.clip(starts, t_start, t_end) - t0) / 3600
+    ends = (np.clip(ends, t_start, t_end) - t0) / 3600
+    keep = ends > starts
+    codes, starts, ends, nb_scans = codes[keep], starts[keep], ends[keep], nb_scans[keep]
+
+    # Heures de la période et heures d'ouverture, sur la chronologie complète
+    hours = np.arange(n_hours)
+    in_window = (hours >= (t_start - t0) / 3600) & (hours + 1 <= (t_end - t0) / 3600)
+    open_hours = in_window & np.tile(opening_mask(), weeks)
+    available = int(open_hours.sum())
+    slot_weeks = np.maximum(in_window.reshape(weeks, HOURS_PER_WEEK).sum(axis=0), 1)
+
+    occupied = hourly_occupancy(codes, starts, ends, n_equipments, n_hours)
+    room_occupied = np.zeros((n_rooms, n_hours))
+    np.add.at(room_occupied, room_of_equipment, occupied)
+
+    busy = np.minimum(occupied, 1)
+    room_busy = np.minimum(room_occupied, 1)
+    rate = busy[:, open_hours].sum(axis=1) / available if available else np.zeros(n_equipments)
+    room_rate = room_busy[:, open_hours].sum(axis=1) / available if available else np.zeros(n_rooms)
+
+    heatmap = room_occupied.reshape(n_rooms, weeks, HOURS_PER_WEEK).sum(axis=1) / slot_weeks
+    weekly_hours = busy.reshape(n_equipments, weeks, HOURS_PER_WEEK).sum(axis=2)
+    session_weeks = np.minimum((starts // HOURS_PER_WEEK).astype(np.int64), weeks - 1)
+    weekly_scans = np.bincount(codes * weeks + session_weeks, weights=nb_scans,
+                               minlength=n_equipments * weeks).reshape(n_equipments, weeks)
+    trend = weekly_trend(weekly_hours)
+
+    peaks, _ = peak_concurrency(codes, starts, ends, n_equipments)
+    room_peaks, _ = peak_concurrency(room_of_equipment[codes], starts, ends, n_rooms)
+    global_peak, global_moment = peak_concurrency(np.zeros(len(starts), dtype=np.int64), starts, ends, 1)
+
+    sessions_per_equipment = np.bincount(codes, minlength=n_equipments)
+    scans_per_equipment = np.bincount(codes, weights=nb_scans, minlength=n_equipments)
+
+    return {
+        'debut': start.isoformat(),
+        'fin': end.isoformat(),
+        'semaines': [(origin + timedelta(weeks=week)).date().isoformat() for week in range(weeks)],
+        'heures_ouverture': available,
+        'nb_sessions': int(len(starts)),
+        'pic_simultane': {
+            'sessions': int(global_peak[0]),
+            'moment': (origin + timedelta(hours=float(global_moment[0]))).isoformat() if global_peak[0] else None
+        },
+        'salles': [
+            {
+                'nom_salle': str(rooms[i]),
+                'taux_occupation': round(float(room_rate[i]), 4),
+                'pic_simultane': int(room_peaks[i]),
+                'heatmap': np.round(heatmap[i], 2).tolist()
+            }
+            for i in range(n_rooms)
+        ],
+        'equipements': [
+            {
+                'id': row.id,
+                'nom_salle': row.nom_salle,
+                'type_equipement': row.type_equipement,
+                'sessions': int(sessions_per_equipment[i]),
+                'scans': int(scans_per_equipment[i]),
+                'heures_occupees': round(float(busy[i].sum()), 2),
+                'taux_occupation': round(float(rate[i]), 4),
+                'pic_simultane': int(peaks[i]),
+                'heures_par_semaine': np.round(weekly_hours[i], 2).tolist(),
+                'scans_par_semaine': weekly_scans[i].astype(np.int64).tolist(),
+                'tendance_heures_par_semaine': round(float(trend[i]), 3)
+            }
+            for i, row in enumerate(equipments)
+        ]
+    }
@@ -22,6 +22,41 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }, 5000);
 
+    // Recherche au fil de la frappe : la page de résultats est rechargée côté
+    // serveur et seul le bloc de résultats est remplacé
+    document.querySelectorAll('form[data-recherche]').forEach(function(form) {
+        var timer = null;
+        var pending = null;
+        var refresh = function() {
+            var url = form.action.split('?')[0] + '?' + new URLSearchParams(new FormData(form)).toString();
+            if (pending) {
+                pending.abort();
+            }
+            pending = new AbortController();
+            fetch(url, {signal: pending.signal, headers: {'X-Requested-With': 'fetch'}})
+                .then(function(response) { return response.text(); })
+                .then(function(html) {
+                    var page = new DOMParser().parseFromString(html, 'text/html');
+                    var target = document.querySelector(form.dataset.recherche);
+                    var results = page.querySelector(form.dataset.recherche);
+                    if (target && results) {
+                        target.innerHTML = results.innerHTML;
+                        history.replaceState(null, '', url);
+                    }
+                })
+                .catch(function() {});
+        };
+        form.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(refresh, 200);
+        });
+        form.addEventListener('change', refresh);
+        form.addEventListener('submit', function(event) {
+            event.preventDefault();
+            refresh();
+        });
+    });
+
     // Fonction pour simuler le scan d'un QR code (pour la démo)
     window.simulateScan = function(qrData) {
         alert('QR Code scanné: ' + qrData);
@@ -40,6 +75,25 @@ function printQRCode() {
     
     // Réinitialiser les scripts Bootstrap après l'impression
     var scriptElement = document.createElement('script');
-    scriptElement.src = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js';
+    scriptElement.src = document.querySelector('script[data-app-script]').src;
     document.body.appendChild(scriptElement);
 }
+
+// Charge des scripts dans l'ordre, une seule fois par page (bundles chargés à la demande)
+var loadedScripts = {};
+function loadScripts(urls) {
+    return urls.reduce(function(previous, url) {
+        return previous.then(function() {
+            if (!loadedScripts[url]) {
+                loadedScripts[url] = new Promise(function(resolve, reject) {
+                    var script = document.createElement('script');
+                    script.src = url;
+                    script.onload = resolve;
+                    script.onerror = reject;
+                    document.head.appendChild(script);
+                });
+            }
+            return loadedScripts[url];
+        });
+    }, Promise.resolve());
+}
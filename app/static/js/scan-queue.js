@@ -0,0 +1,46 @@
+// File d'attente hors ligne des pages de scan
+//
+// Enregistre le service worker (/scan-sw.js), demande l'envoi de la file au
+// retour du réseau et affiche le nombre de scans en attente dans l'élément
+// #offline-queue-status s'il existe.
+
+(function() {
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+
+    function showStatus(pending, results) {
+        const status = document.getElementById('offline-queue-status');
+        if (!status) {
+            return;
+        }
+        const recorded = results.filter(result => result.status === 'recorded').length;
+        if (pending > 0) {
+            status.textContent = `${pending} scan(s) en attente d'envoi (hors ligne).`;
+            status.className = 'alert alert-warning mt-3';
+        } else if (recorded > 0) {
+            status.textContent = `${recorded} scan(s) enregistré(s) après le retour du réseau.`;
+            status.className = 'alert alert-success mt-3';
+        } else {
+            status.className = 'hidden';
+        }
+    }
+
+    function flush() {
+        if (navigator.serviceWorker.controller) {
+            navigator.serviceWorker.controller.postMessage({ type: 'flush' });
+        }
+    }
+
+    navigator.serviceWorker.register('/scan-sw.js', { scope: '/' }).then(() => {
+        navigator.serviceWorker.ready.then(flush);
+    });
+
+    navigator.serviceWorker.addEventListener('message', event => {
+        if (event.data && event.data.type === 'scan-queue') {
+            showStatus(event.data.pending, event.data.results);
+        }
+    });
+
+    window.addEventListener('online', flush);
+})();
@@ -0,0 +1,142 @@
+// Service worker : file d'attente hors ligne des scans
+//
+// Les POST vers /api/scan et /api/scan-equipment qui échouent faute de réseau
+// sont conservés dans IndexedDB avec leur horodatage, puis envoyés par lots
+// à /api/scan/batch au retour de la connexion (un seul POST par lot).
+
+const DB_NAME = 'scan-queue';
+const STORE = 'scans';
+const BATCH_SIZE = 50;
+const SCAN_URLS = ['/api/scan', '/api/scan-equipment'];
+
+self.addEventListener('install', () => self.skipWaiting());
+self.addEventListener('activate', event => event.waitUntil(self.clients.claim()));
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore(STORE, { keyPath: 'id' });
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function withStore(mode, action) {
+    return openQueue().then(db => new Promise((resolve, reject) => {
+        const transaction = db.transaction(STORE, mode);
+        const result = action(transaction.objectStore(STORE));
+        transaction.oncomplete = () => resolve(result.result !== undefined ? result.result : result);
+        transaction.onerror = () => reject(transaction.error);
+    }));
+}
+
+function enqueue(record) {
+    return withStore('readwrite', store => store.put(record));
+}
+
+function pendingRecords(limit) {
+    return withStore('readonly', store => store.getAll(null, limit));
+}
+
+function removeRecords(ids) {
+    return withStore('readwrite', store => {
+        ids.forEach(id => store.delete(id));
+        return {};
+    });
+}
+
+function notifyClients(message) {
+    return self.clients.matchAll().then(clients => clients.forEach(client => client.postMessage(message)));
+}
+
+let flushing = null;
+
+// Envoie la file par lots ; les enregistrements restent en file tant que le
+// serveur ne les a pas traités (réseau absent, utilisateur déconnecté, erreur 5xx)
+function flushQueue() {
+    if (flushing) {
+        return flushing;
+    }
+    flushing = (async () => {
+        let results = [];
+        while (true) {
+            const records = await pendingRecords(BATCH_SIZE);
+            if (!records.length) {
+                break;
+            }
+            let response;
+            try {
+                response = await fetch('/api/scan/batch', {
+                    method: 'POST',
+                    credentials: 'same-origin',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ records: records.map(({ id, qr_code, scanned_at }) => ({ id, qr_code, scanned_at })) })
+                });
+            } catch (error) {
+                break;
+            }
+            if (!response.ok) {
+                break;
+            }
+            const data = await response.json();
+            await removeRecords(data.results.map(result => result.id));
+            results = results.concat(data.results);
+        }
+        const remaining = await pendingRecords();
+        await notifyClients({ type: 'scan-queue', pending: remaining.length, results: results });
+    })().finally(() => { flushing = null; });
+    return flushing;
+}
+
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'POST' || url.origin !== self.location.origin || !SCAN_URLS.includes(url.pathname)) {
+        return;
+    }
+
+    event.respondWith((async () => {
+        const body = await event.request.clone().text();
+        try {
+            const response = await fetch(event.request);
+            // Réseau rétabli : vider la file en arrière-plan
+            flushQueue();
+            return response;
+        } catch (error) {
+            let payload = {};
+            try {
+                payload = JSON.parse(body);
+            } catch (parseError) {
+                // Corps illisible : rien à mettre en file
+            }
+            const qrCode = payload.qr_code || payload.qr_data;
+            if (!qrCode) {
+                throw error;
+            }
+            // La clé d'idempotence du scan sert d'identifiant : le serveur reconnaît un renvoi
+            const id = payload.idempotency_key || self.crypto.randomUUID();
+            await enqueue({ id, qr_code: qrCode, scanned_at: new Date().toISOString() });
+            if (self.registration.sync) {
+                self.registration.sync.register('scan-queue').catch(() => {});
+            }
+            const pending = await pendingRecords();
+            notifyClients({ type: 'scan-queue', pending: pending.length, results: [] });
+            return new Response(JSON.stringify({
+                success: true,
+                queued: true,
+                message: 'Hors ligne : le scan est enregistré sur cet appareil et sera envoyé dès le retour du réseau.'
+            }), { status: 202, headers: { 'Content-Type': 'application/json' } });
+        }
+    })());
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === 'scan-queue') {
+        event.waitUntil(flushQueue());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'flush') {
+        event.waitUntil(flushQueue());
+    }
+});
@@ -0,0 +1 @@
+# Benchmarks des parcours critiques de l'application (voir benchmarks/run.py)
@@ -0,0 +1,46 @@
+import http.cookiejar
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def _open(opener, request):
+    try:
+        with opener.open(request, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def http_worker(args):
+    """Processus générateur de charge : se connecte puis répète une requête jusqu'à l'échéance
+
+    Les charges utiles sont utilisées à tour de rôle. Ce module n'importe pas
+    l'application : les processus enfants restent légers.
+    Retourne (latences en secondes, nombre d'erreurs).
+    """
+    base_url, method, path, payloads, email, duration = args
+
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    login_data = urllib.parse.urlencode({'email': email, 'password': '1234'}).encode()
+    _open(opener, urllib.request.Request(f"{base_url}/login", data=login_data, method='POST'))
+
+    bodies = [json.dumps(payload).encode() if payload is not None else None for payload in payloads]
+    headers = {'Content-Type': 'application/json'} if bodies[0] is not None else {}
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        body = bodies[len(latencies) % len(bodies)]
+        request = urllib.request.Request(f"{base_url}{path}", data=body, headers=headers, method=method)
+        started = time.perf_counter()
+        status = _open(opener, request)
+        latencies.append(time.perf_counter() - started)
+        if status >= 400:
+            errors += 1
+
+    return latencies, errors
@@ -0,0 +1,260 @@
+"""Benchmarks des parcours critiques : scans, sessions, tableaux de bord, QR codes et analyses
+
+Exemples :
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --http --processes 4 --duration 10
+    python -m benchmarks.run --update-baseline
+
+Les résultats sont écrits en JSON et comparés à une référence enregistrée
+(benchmarks/baseline.json) : une régression du p95 au-delà de la tolérance
+fait échouer l'exécution (code de sortie 1).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from multiprocessing import get_context
+
+# Les utilisateurs générés sont stockés en base : le backend SQL doit être
+# choisi avant l'import de l'application
+os.environ['USER_BACKEND'] = 'sql'
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+from app import create_app
+from benchmarks.load import http_worker
+from app.services.synthetic_data import SCALES
+from benchmarks.seed import seed_database
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = [
+    {'name': 'api_scan', 'role': 'student', 'method': 'POST', 'path': '/api/scan',
+     'json': {'qr_code': '{active_session_qr}'}},
+    {'name': 'api_scan_equipment', 'role': 'teacher', 'method': 'POST', 'path': '/api/scan-equipment',
+     'json': {'qr_code': '{equipment_qr}'}},
+    {'name': 'list_sessions_teacher', 'role': 'teacher', 'method': 'GET', 'path': '/sessions'},
+    {'name': 'list_sessions_admin', 'role': 'admin', 'method': 'GET', 'path': '/sessions'},
+    {'name': 'view_session', 'role': 'teacher', 'method': 'GET', 'path': '/sessions/{teacher_session_id}'},
+    {'name': 'dashboard_admin', 'role': 'admin', 'method': 'GET', 'path': '/dashboard'},
+    {'name': 'dashboard_teacher', 'role': 'teacher', 'method': 'GET', 'path': '/dashboard'},
+    {'name': 'dashboard_student', 'role': 'student', 'method': 'GET', 'path': '/dashboard'},
+    {'name': 'session_qr_code', 'role': 'teacher', 'method': 'GET', 'path': '/sessions/{active_session_id}/qr-code'},
+    {'name': 'equipment_qr_code', 'role': 'teacher', 'method': 'GET', 'path': '/equipments/{equipment_id}'},
+    {'name': 'api_utilisation', 'role': 'admin', 'method': 'GET', 'path': '/api/analytics/utilisation'},
+    {'name': 'api_search_equipments', 'role': 'teacher', 'method': 'GET', 'path': '/api/equipments/search?q=lab'},
+    {'name': 'api_search_users', 'role': 'admin', 'method': 'GET', 'path': '/api/users/search?q=mar&role=Etudiant'}
+]
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Gestionnaire HTTP sans journal d'accès (le journal fausserait les mesures)"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def resolve(scenario, context):
+    """Remplace les identifiants générés dans le chemin et la charge utile d'un scénario
+
+    Le scan est enregistré pour l'étudiant connecté : après le premier
+    passage, les requêtes suivantes mesurent le chemin « déjà scanné »
+    (résolution, validation et dédoublonnage, sans écriture).
+    """
+    path = scenario['path'].format(**context)
+    payload = None
+    if 'json' in scenario:
+        payload = {key: value.format(**context) for key, value in scenario['json'].items()}
+    return path, payload
+
+
+def user_for(role, context, index=0):
+    if role == 'admin':
+        return 'admin@ecole.be'
+    if role == 'teacher':
+        return context['teacher_id']
+    return context['student_ids'][index % len(context['student_ids'])]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Calcule les percentiles (en millisecondes) et le débit"""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'count': 0, 'errors': errors}
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1)] * 1000
+
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'throughput_rps': len(ordered) / elapsed if elapsed > 0 else 0
+    }
+
+
+def run_client_benchmarks(app, context, iterations, warmup, out=print):
+    """Mesure chaque scénario en séquence avec le client de test Flask"""
+    results = {}
+    clients = {}
+
+    for scenario in SCENARIOS:
+        role = scenario['role']
+        if role not in clients:
+            client = app.test_client()
+            client.post('/login', data={'email': user_for(role, context), 'password': '1234'})
+            clients[role] = client
+        client = clients[role]
+        path, payload = resolve(scenario, context)
+
+        def call(i):
+            return client.open(path, method=scenario['method'], json=payload)
+
+        for i in range(warmup):
+            call(i)
+
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        for i in range(warmup, warmup + iterations):
+            t0 = time.perf_counter()
+            response = call(i)
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code >= 400:
+                errors += 1
+        results[scenario['name']] = summarize(latencies, time.perf_counter() - started, errors)
+        out(f"[client] {scenario['name']:<24} p50={results[scenario['name']]['p50']:.2f}ms "
+            f"p95={results[scenario['name']]['p95']:.2f}ms p99={results[scenario['name']]['p99']:.2f}ms")
+
+    return results
+
+
+def run_http_benchmarks(app, context, processes, duration, out=print):
+    """Mesure chaque scénario sous charge : serveur HTTP local et processus générateurs"""
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = {}
+    try:
+        with get_context('spawn').Pool(processes) as pool:
+            for scenario in SCENARIOS:
+                path, payload = resolve(scenario, context)
+                # Chaque processus se connecte avec son propre étudiant
+                args = [(base_url, scenario['method'], path, [payload],
+                         user_for(scenario['role'], context, i), duration)
+                        for i in range(processes)]
+                started = time.perf_counter()
+                outcomes = pool.map(http_worker, args)
+                elapsed = time.perf_counter() - started
+
+                latencies = [latency for worker_latencies, _ in outcomes for latency in worker_latencies]
+                errors = sum(worker_errors for _, worker_errors in outcomes)
+                results[scenario['name']] = summarize(latencies, elapsed, errors)
+                out(f"[http]   {scenario['name']:<24} p50={results[scenario['name']]['p50']:.2f}ms "
+                    f"p95={results[scenario['name']]['p95']:.2f}ms {results[scenario['name']]['throughput_rps']:.0f} req/s")
+    finally:
+        server.shutdown()
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Retourne la liste des scénarios dont le p95 a régressé au-delà de la tolérance"""
+    regressions = []
+    for mode in ('client', 'http'):
+        for name, stats in results.get(mode, {}).items():
+            reference = baseline.get(mode, {}).get(name)
+            if not reference or not stats.get('count') or not reference.get('p95'):
+                continue
+            if stats['p95'] > reference['p95'] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p95 {stats['p95']:.2f}ms > référence {reference['p95']:.2f}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des parcours critiques de l'application")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help="Volume des données générées")
+    parser.add_argument('--seed', type=int, default=42, help="Graine du générateur de données")
+    parser.add_argument('--iterations', type=int, default=50, help="Requêtes par scénario (client de test)")
+    parser.add_argument('--warmup', type=int, default=5, help="Requêtes d'échauffement par scénario")
+    parser.add_argument('--http', action='store_true', help="Exécuter aussi le test de charge HTTP multi-processus")
+    parser.add_argument('--processes', type=int, default=4, help="Processus générateurs de charge (mode HTTP)")
+    parser.add_argument('--duration', type=float, default=5.0, help="Durée de charge par scénario en secondes (mode HTTP)")
+    parser.add_argument('--output', default=os.path.join(BENCHMARKS_DIR, 'results', 'latest.json'), help="Fichier de résultats JSON")
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARKS_DIR, 'baseline.json'), help="Fichier de référence")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Régression tolérée sur le p95 (0.25 = +25%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Enregistrer les résultats comme nouvelle référence")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+            'SESSION_SCHEDULER_ENABLED': False,
+            # Les générateurs de charge partagent une seule adresse IP
+            'RATE_LIMIT_ENABLED': False
+        })
+
+        with app.app_context():
+            started = time.perf_counter()
+            context = seed_database(args.scale, seed=args.seed)
+            print(f"Données générées en {time.perf_counter() - started:.1f}s : {context['counts']}")
+
+        results = {
+            'meta': {
+                'scale': args.scale,
+                'seed': args.seed,
+                'date': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'iterations': args.iterations,
+                'counts': context['counts']
+            },
+            'client': run_client_benchmarks(app, context, args.iterations, args.warmup)
+        }
+        if args.http:
+            results['http'] = run_http_benchmarks(app, context, args.processes, args.duration)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats enregistrés dans {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Référence mise à jour : {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Aucune référence trouvée, comparaison ignorée (utiliser --update-baseline).")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if baseline.get('meta', {}).get('scale') != args.scale:
+        print(f"La référence a été mesurée à l'échelle '{baseline.get('meta', {}).get('scale')}', comparaison ignorée.")
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Régressions détectées :")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print("Aucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
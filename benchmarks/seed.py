@@ -0,0 +1,46 @@
+import uuid
+from datetime import datetime, timedelta
+from app import db
+from app.models import Session
+from app.services.synthetic_data import ECOLE, generate_dataset
+
+
+def seed_database(scale='small', seed=42, processes=None):
+    """Remplit la base avec le jeu de données synthétique et une session active
+
+    Retourne un dictionnaire décrivant les données créées (identifiants utiles
+    aux scénarios). Tous les utilisateurs ont le mot de passe '1234'.
+    """
+    summary = generate_dataset(scale, seed=seed, processes=processes, out=lambda message: None)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    teacher_id = summary['teacher_ids'][0]
+
+    # Session active utilisée par les scénarios de scan
+    equipment = summary['equipments'][0]
+    active_session_id = str(uuid.UUID(int=seed, version=4))
+    active_qr = f"SESSION_{ECOLE}_{equipment['nom_salle']}_{equipment['type_equipement']}_{active_session_id}_{now.strftime('%Y%m%d%H%M%S')}"
+    db.session.add(Session(
+        id=active_session_id,
+        nom_session=f"Session {equipment['type_equipement']} - {now.strftime('%d/%m/%Y %H:%M')}",
+        timestamp_debut=now,
+        timestamp_expiration=now + timedelta(days=1),
+        user_id_enseignant=teacher_id,
+        equipment_id=equipment['id'],
+        qr_code_dynamique_data=active_qr,
+        actif=True
+    ))
+    db.session.commit()
+
+    teacher_session = (Session.query.filter_by(user_id_enseignant=teacher_id, actif=False)
+                       .order_by(Session.timestamp_debut.desc()).first())
+
+    return {
+        'teacher_id': teacher_id,
+        'student_ids': summary['student_ids'],
+        'equipment_id': equipment['id'],
+        'equipment_qr': equipment['qr_code_statique_data'],
+        'active_session_id': active_session_id,
+        'teacher_session_id': teacher_session.id if teacher_session else active_session_id,
+        'active_session_qr': active_qr,
+        'counts': summary['counts']
+    }
@@ -0,0 +1,91 @@
+"""Démarrages à froid et à chaud de la fonction Netlify
+
+Exemple :
+    python -m benchmarks.serverless --containers 5 --invocations 20
+
+Chaque conteneur est simulé par un processus neuf : le module de la fonction
+y est importé, puis invoqué plusieurs fois comme le ferait la plateforme.
+La première invocation (froide) construit l'application ; les suivantes
+(chaudes) la réutilisent.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import time
+from multiprocessing import get_context
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNCTION_PATH = os.path.join(BENCHMARKS_DIR, '..', 'netlify', 'functions', 'api.py')
+PATHS = ['/', '/help', '/login', '/mobile-scan']
+
+
+def event_for(path):
+    """Événement minimal au format API Gateway / Netlify"""
+    return {'path': path, 'httpMethod': 'GET', 'headers': {'host': 'localhost'}, 'body': '', 'isBase64Encoded': False}
+
+
+def container(invocations):
+    """Simule un conteneur : import du module, invocation froide puis invocations chaudes
+
+    Retourne (durée d'import, latence froide, latences chaudes) en secondes.
+    """
+    started = time.perf_counter()
+    spec = importlib.util.spec_from_file_location('netlify_api', FUNCTION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    import_seconds = time.perf_counter() - started
+
+    latencies = []
+    for i in range(invocations):
+        started = time.perf_counter()
+        response = module.handler(event_for(PATHS[i % len(PATHS)]), None)
+        latencies.append(time.perf_counter() - started)
+        if response['statusCode'] >= 500:
+            raise RuntimeError(f"Erreur {response['statusCode']} sur {PATHS[i % len(PATHS)]}")
+    return import_seconds, latencies[0], latencies[1:]
+
+
+def percentiles(values):
+    """p50 et p95 en millisecondes"""
+    ordered = sorted(values)
+    if not ordered:
+        return {'p50': None, 'p95': None}
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+
+    return {'p50': percentile(50), 'p95': percentile(95)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Démarrages à froid et à chaud de la fonction Netlify")
+    parser.add_argument('--containers', type=int, default=5, help="Conteneurs simulés (démarrages à froid)")
+    parser.add_argument('--invocations', type=int, default=20, help="Invocations par conteneur")
+    parser.add_argument('--output', default=None, help="Fichier de résultats JSON")
+    args = parser.parse_args(argv)
+
+    imports, cold, warm = [], [], []
+    ctx = get_context('spawn')
+    for _ in range(args.containers):
+        # Un processus neuf par conteneur : aucun état partagé entre deux démarrages
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            import_seconds, cold_seconds, warm_seconds = pool.apply(container, (args.invocations,))
+        imports.append(import_seconds)
+        cold.append(cold_seconds)
+        warm.extend(warm_seconds)
+
+    results = {'import': percentiles(imports), 'cold': percentiles(cold), 'warm': percentiles(warm),
+               'containers': args.containers, 'invocations': args.invocations}
+    print(f"{'':<8} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for name in ('import', 'cold', 'warm'):
+        print(f"{name:<8} {results[name]['p50']:>10} {results[name]['p95']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -16,8 +16,8 @@ with app.app_context():
     etudiant = User(id="etudiant1@ecole.be", nom_complet="Marie Martin", role="Etudiant")
     
     # Ajouter des équipements de test
-    eq1 = Equipment(id="EQ001", nom_salle="Labo 101", type_equipement="Microscope", qr_code_statique_data="MS101")
-    eq2 = Equipment(id="EQ002", nom_salle="Labo 102", type_equipement="Balance", qr_code_statique_data="BA102")
+    eq1 = Equipment(id="EQ001", nom_salle="Labo 101", type_equipement="Microscope", qr_code_statique_data="EAFC-TIC_EQ001_Microscope_Labo 101")
+    eq2 = Equipment(id="EQ002", nom_salle="Labo 102", type_equipement="Balance", qr_code_statique_data="EAFC-TIC_EQ002_Balance_Labo 102")
     
     db.session.add_all([admin, prof, etudiant, eq1, eq2])
     db.session.commit()
@@ -1,8 +1,5 @@
-from app import create_app
-from netlify_lambda_wsgi import make_lambda_handler
+from app.services.serverless import lambda_handler
 
-# Créer l'application Flask
-app = create_app()
-
-# Créer le handler Lambda pour Netlify
-handler = make_lambda_handler(app)
+# Handler de la fonction Netlify : l'application est construite à la première
+# invocation puis réutilisée tant que le conteneur reste chaud
+handler = lambda_handler
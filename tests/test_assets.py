@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.services.assets import VENDOR, asset_urls, build_assets, first_paint_report, vendor_path
+
+FAKE_VENDOR = {
+    'bootstrap.css': b'.btn{color:red}\n/*# sourceMappingURL=bootstrap.min.css.map */',
+    'bootstrap.js': b'var bootstrap={}\n//# sourceMappingURL=bootstrap.bundle.min.js.map',
+    'fontawesome.css': b'@font-face{src:url(../webfonts/fa-solid-900.woff2) format("woff2")}',
+    'html5-qrcode.js': b'var Html5Qrcode=function(){}'
+}
+
+class AssetsTestCase(unittest.TestCase):
+    """Tests pour la construction des bundles CSS/JS"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.tmp_dir = tempfile.mkdtemp()
+        self.static_folder = os.path.join(self.tmp_dir, 'static')
+        shutil.copytree(self.app.static_folder, self.static_folder, ignore=shutil.ignore_patterns('dist'))
+
+        # Copies locales factices des bibliothèques tierces (aucun accès réseau)
+        self.vendor_dir = os.path.join(self.tmp_dir, 'vendor')
+        for name, content in FAKE_VENDOR.items():
+            self.write_vendor(VENDOR[name], content)
+        self.write_vendor('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/webfonts/fa-solid-900.woff2', b'woff2')
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        shutil.rmtree(self.tmp_dir)
+
+    def write_vendor(self, url, content):
+        path = vendor_path(url, self.vendor_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def read_static(self, path):
+        with open(os.path.join(self.static_folder, path), encoding='utf-8') as f:
+            return f.read()
+
+    def test_build_bundles(self):
+        """Tester les bundles nommés par empreinte, la minification et la copie des polices"""
+        manifest = build_assets(self.static_folder, self.vendor_dir, offline=True)
+        self.assertEqual(set(manifest), {'app.css', 'app.js', 'scanner.js'})
+        self.assertRegex(manifest['app.css'], r'^dist/app\.[0-9a-f]{10}\.css$')
+
+        css = self.read_static(manifest['app.css'])
+        self.assertNotIn('sourceMappingURL', css)
+        self.assertNotIn('/*', css)
+        self.assertRegex(css, r'url\(resources/fa-solid-900\.[0-9a-f]{10}\.woff2\)')
+        font = css.split('url(')[1].split(')')[0]
+        self.assertTrue(os.path.exists(os.path.join(self.static_folder, 'dist', font)))
+
+        scanner = self.read_static(manifest['scanner.js'])
+        self.assertIn('Html5Qrcode', scanner)
+        self.assertIn("navigator.serviceWorker.register", scanner)
+
+    def test_offline_build_requires_vendor_copy(self):
+        """Tester l'erreur explicite quand une bibliothèque n'a pas été copiée"""
+        os.remove(vendor_path(VENDOR['html5-qrcode.js'], self.vendor_dir))
+        with self.assertRaises(RuntimeError):
+            build_assets(self.static_folder, self.vendor_dir, offline=True)
+
+    def test_pages_use_local_bundles(self):
+        """Tester les URL des templates avec et sans build"""
+        with self.app.test_request_context():
+            self.assertEqual(asset_urls('app.js')[0], VENDOR['bootstrap.js'])
+
+        manifest = build_assets(self.static_folder, self.vendor_dir, offline=True)
+        self.app.static_folder = self.static_folder
+        with self.app.test_request_context():
+            urls = asset_urls('app.css')
+        self.assertEqual(len(urls), 1)
+        self.assertTrue(urls[0].startswith('/static/' + manifest['app.css']))
+
+        report = first_paint_report(self.app)
+        self.assertEqual(report['first_paint']['external_requests'], 0)
+        self.assertEqual(report['end_of_body']['external'], [])
+        self.assertGreater(report['lazy']['raw'], 0)
+        html = self.app.test_client().get('/mobile-scan').get_data(as_text=True)
+        self.assertNotIn('unpkg.com', html)
+        self.assertIn(manifest['scanner.js'], html)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.attendance_history import get_student_history
+
+class AttendanceHistoryTestCase(unittest.TestCase):
+    """Tests pour l'historique de présence paginé des étudiants"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope', qr_code_statique_data='EAFC-TIC_EQ001'))
+        start = datetime(2024, 11, 4, 8, 0)
+        for i in range(25):
+            # Deux scans par créneau pour vérifier le départage par ID
+            timestamp = start + timedelta(days=i // 2 * 30)
+            db.session.add(Session(id=f'session-{i:03d}', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                                   timestamp_debut=timestamp, qr_code_dynamique_data=f'SESSION_{i}', actif=False))
+            db.session.add(LogScan(id=f'log-{i:03d}', session_id=f'session-{i:03d}',
+                                   user_id_etudiant='etudiant1@ecole.be', timestamp_scan=timestamp))
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_keyset_pagination_visits_every_scan_once(self):
+        """Tester que la pagination par curseur parcourt tous les scans sans doublon, du plus récent au plus ancien"""
+        seen = []
+        cursor = None
+        while True:
+            page = get_student_history('etudiant1@ecole.be', cursor=cursor, limit=10)
+            seen.extend(item['id'] for item in page['items'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, [f'log-{i:03d}' for i in reversed(range(25))])
+
+    def test_history_rows_are_joined(self):
+        """Tester que les données de session, d'équipement et d'enseignant sont jointes"""
+        item = get_student_history('etudiant1@ecole.be', limit=1)['items'][0]
+        self.assertEqual(item['nom_salle'], 'Labo 101')
+        self.assertEqual(item['type_equipement'], 'Microscope')
+        self.assertEqual(item['nom_enseignant'], 'Jean Dupont')
+
+    def test_term_filter(self):
+        """Tester le filtre par quadrimestre"""
+        page = get_student_history('etudiant1@ecole.be', term='2024-2025-Q1', limit=100)
+        self.assertTrue(page['items'])
+        for item in page['items']:
+            self.assertTrue(datetime(2024, 9, 1) <= item['timestamp_scan'] < datetime(2025, 2, 1))
+
+        with self.assertRaises(ValueError):
+            get_student_history('etudiant1@ecole.be', term='2024-Q3')
+
+    def test_history_page(self):
+        """Tester la page d'historique et le tableau de bord étudiant"""
+        self.client.get('/auto-login/student')
+
+        response = self.client.get('/sessions/historique?quadrimestre=2024-2025-Q1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Labo 101', response.data.decode())
+
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Jean Dupont', response.data.decode())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import io
+import os
+import sys
+import zipfile
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.attendance_matrix import build_attendance_matrix
+from app.services.attendance_store import archive_term
+
+TERM = '2024-2025-Q1'
+ATTENDANCE = {
+    'etudiant1@ecole.be': [0, 1, 2, 3, 4],
+    'etudiant2@ecole.be': [0, 3],
+    'etudiant3@ecole.be': [1]
+}
+
+class AttendanceMatrixTestCase(unittest.TestCase):
+    """Tests pour la matrice de présence creuse et ses exports"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope', qr_code_statique_data='EAFC-TIC_EQ001'))
+        start = datetime(2024, 10, 7, 9, 0)
+        for j in range(5):
+            db.session.add(Session(id=f'cours-{j}', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                                   timestamp_debut=start + timedelta(weeks=j), qr_code_dynamique_data=f'SESSION_{j}', actif=False))
+        # Sessions hors cours : autre enseignant, autre quadrimestre
+        db.session.add(Session(id='autre-prof', user_id_enseignant='prof2@ecole.be', equipment_id='EQ001',
+                               timestamp_debut=start, qr_code_dynamique_data='SESSION_P2', actif=False))
+        db.session.add(Session(id='autre-term', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                               timestamp_debut=datetime(2025, 3, 3, 9, 0), qr_code_dynamique_data='SESSION_Q2', actif=False))
+        for student, columns in ATTENDANCE.items():
+            for j in columns:
+                db.session.add(LogScan(session_id=f'cours-{j}', user_id_etudiant=student,
+                                       timestamp_scan=start + timedelta(weeks=j, minutes=5)))
+            db.session.add(LogScan(session_id='autre-prof', user_id_etudiant=student, timestamp_scan=start))
+            db.session.add(LogScan(session_id='autre-term', user_id_etudiant=student, timestamp_scan=datetime(2025, 3, 3, 9, 5)))
+        # Scan en double : compté une seule fois
+        db.session.add(LogScan(session_id='cours-0', user_id_etudiant='etudiant1@ecole.be', timestamp_scan=start))
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assert_course_matrix(self, matrix):
+        self.assertEqual(matrix.shape, (3, 5))
+        self.assertEqual(matrix.students, sorted(ATTENDANCE))
+        self.assertEqual(matrix.attended().tolist(), [5, 2, 1])
+        self.assertEqual(matrix.attendance_rates().tolist(), [1.0, 0.4, 0.2])
+        self.assertEqual(matrix.session_turnout().tolist(), [2, 2, 1, 2, 1])
+        longest, current = matrix.absence_streaks()
+        self.assertEqual(longest.tolist(), [0, 2, 3])
+        self.assertEqual(current.tolist(), [0, 1, 3])
+        self.assertEqual(matrix.row(1).tolist(), [True, False, False, True, False])
+
+    def test_course_matrix(self):
+        """Tester la matrice et les statistiques d'un cours (enseignant et quadrimestre)"""
+        self.assert_course_matrix(build_attendance_matrix(teacher_id='prof1@ecole.be', term=TERM))
+
+    def test_matrix_reads_archived_term(self):
+        """Tester la matrice d'un quadrimestre archivé"""
+        archive_term(TERM, now=datetime(2026, 1, 1), out=lambda message: None)
+        self.assert_course_matrix(build_attendance_matrix(teacher_id='prof1@ecole.be', term=TERM))
+
+    def test_streamed_exports(self):
+        """Tester les exports CSV et XLSX envoyés en flux"""
+        self.client.get('/auto-login/teacher')
+
+        response = self.client.get(f'/sessions/presences/export.csv?quadrimestre={TERM}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        lines = response.get_data(as_text=True).lstrip('\ufeff').splitlines()
+        self.assertEqual(len(lines), 5)
+        rows = {line.split(';')[0]: line.split(';')[2:] for line in lines[1:-1]}
+        self.assertEqual(rows['etudiant2@ecole.be'], ['P', 'A', 'A', 'P', 'A', '2', '40.0'])
+        self.assertEqual(lines[-1].split(';')[2:7], ['2', '2', '1', '2', '1'])
+
+        response = self.client.get(f'/sessions/presences/export.xlsx?quadrimestre={TERM}')
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+            self.assertIn('xl/workbook.xml', archive.namelist())
+        self.assertEqual(len(sheet.findall('.//{*}row')), 5)
+
+        self.assertEqual(self.client.get(f'/sessions/presences?quadrimestre={TERM}').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import gzip
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import url_for
+from app import create_app, db
+from app.services.http_cache import static_file_hash
+from app.services.metrics import metrics
+
+class HttpCacheTestCase(unittest.TestCase):
+    """Tests pour le cache des pages publiques, la compression et les fichiers statiques"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        metrics.reset()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_public_page_cached_for_anonymous(self):
+        """Tester la mise en cache d'une page publique et la revalidation par ETag"""
+        first = self.client.get('/help')
+        second = self.client.get('/help')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(metrics.get('response_cache_total', endpoint='main.help', result='miss'), 1)
+        self.assertEqual(metrics.get('response_cache_total', endpoint='main.help', result='hit'), 1)
+        self.assertIn('max-age=300', second.headers['Cache-Control'])
+
+        response = self.client.get('/help', headers={'If-None-Match': second.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_logged_in_users_bypass_cache(self):
+        """Tester que la page d'un utilisateur connecté n'est ni servie ni stockée par le cache"""
+        self.client.get('/about')
+        self.client.get('/auto-login/student')
+        response = self.client.get('/about')
+        self.assertIn('Déconnexion', response.get_data(as_text=True))
+        self.assertEqual(metrics.get('response_cache_total', endpoint='main.about', result='miss'), 1)
+        self.assertEqual(metrics.get('response_cache_total', endpoint='main.about', result='hit'), 0)
+
+    def test_gzip_compression(self):
+        """Tester la compression des réponses HTML selon Accept-Encoding"""
+        plain = self.client.get('/scan-guide')
+        self.assertNotIn('Content-Encoding', plain.headers)
+
+        response = self.client.get('/scan-guide', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+
+    def test_static_urls_are_fingerprinted(self):
+        """Tester l'empreinte des URL statiques et le cache d'un an"""
+        with self.app.test_request_context():
+            url = url_for('static', filename='css/style.css')
+        digest = static_file_hash(os.path.join(self.app.static_folder, 'css', 'style.css'))
+        self.assertTrue(url.endswith(f'?v={digest}'))
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', response.headers['Cache-Control'])
+        response.close()
+
+        # Ancienne empreinte : pas de cache longue durée
+        response = self.client.get('/static/css/style.css?v=ancienne')
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.services.user_backend import get_user_backend
+
+class SignedIdentityTestCase(unittest.TestCase):
+    """Tests pour l'identité lue dans la session signée"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        # Copie du fichier d'utilisateurs : les tests modifient rôles et comptes
+        self.directory = tempfile.mkdtemp()
+        self.backend = get_user_backend()
+        self.users_file = self.backend.test_users_file
+        self.backend.test_users_file = os.path.join(self.directory, 'users.json')
+        self.backend.create_test_users_file()
+        self.backend.get_users(force_refresh=True)
+
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'IDENTITY_VERSION_TTL': 0})
+        self.client = self.app.test_client()
+        # Pas de contexte d'application maintenu entre les requêtes : l'utilisateur
+        # courant (mis en cache dans g) doit être rechargé à chaque requête
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        with self.app.app_context():
+            db.drop_all()
+        self.backend.test_users_file = self.users_file
+        self.backend.get_users(force_refresh=True)
+        self.backend.version_changed()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_claims_skip_user_loading(self):
+        """Tester que les requêtes authentifiées ne relisent pas l'utilisateur"""
+        self.client.get('/auto-login/teacher')
+        with mock.patch.object(self.backend, 'get_user_by_id', wraps=self.backend.get_user_by_id) as loader:
+            for _ in range(3):
+                self.assertEqual(self.client.get('/sessions').status_code, 200)
+        loader.assert_not_called()
+
+    def test_role_change_and_deletion_take_effect(self):
+        """Tester qu'un changement de rôle puis une suppression invalident l'identité de la session"""
+        self.client.get('/auto-login/teacher')
+        self.assertEqual(self.client.get('/sessions').status_code, 200)
+
+        self.backend.update_user('prof1@ecole.be', role='Etudiant')
+        response = self.client.get('/sessions')
+        self.assertEqual(response.status_code, 302)
+        with self.client.session_transaction() as session:
+            self.assertEqual(session['user_data']['role'], 'Etudiant')
+
+        self.backend.delete_user('prof1@ecole.be')
+        response = self.client.get('/sessions')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login', response.headers['Location'])
+
+    def test_store_mode(self):
+        """Tester le mode historique : l'utilisateur est relu à chaque requête"""
+        self.app.config['IDENTITY_MODE'] = 'store'
+        self.client.get('/auto-login/teacher')
+        with mock.patch.object(self.backend, 'get_user_by_id', wraps=self.backend.get_user_by_id) as loader:
+            self.client.get('/sessions')
+            self.client.get('/sessions')
+        self.assertEqual(loader.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
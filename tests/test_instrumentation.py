@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session
+from app.services.instrumentation import statement_shape
+from app.services.metrics import metrics
+
+class InstrumentationTestCase(unittest.TestCase):
+    """Tests pour l'instrumentation des requêtes et l'export des métriques"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'INSTRUMENTATION_ENABLED': True,
+            'INSTRUMENTATION_PROFILE_DIR': self.tmp_dir.name,
+            'INSTRUMENTATION_TOKEN': 'secret-metriques'
+        })
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        metrics.reset()
+
+        # Suffisamment de sessions pour que le chargement paresseux du template produise un N+1
+        for i in range(10):
+            db.session.add(Equipment(id=f'EQ{i:03d}', nom_salle=f'Labo {i}', type_equipement='Microscope',
+                                     qr_code_statique_data=f'EAFC-TIC_EQ{i:03d}'))
+            db.session.add(Session(id=f'session-{i:03d}', user_id_enseignant='admin@ecole.be',
+                                   equipment_id=f'EQ{i:03d}', qr_code_dynamique_data=f'SESSION_{i}'))
+        db.session.commit()
+
+        self.client.get('/auto-login/admin')
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.tmp_dir.cleanup()
+
+    def test_statement_shape_collapses_in_lists(self):
+        """Tester que les listes IN de tailles différentes ont la même forme"""
+        self.assertEqual(statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)"),
+                         statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?)"))
+
+    def test_metrics_and_n_plus_one_detection(self):
+        """Tester l'enregistrement des métriques SQL et la détection des N+1"""
+        response = self.client.get('/sessions')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertGreater(metrics.get('sql_queries_total', endpoint='session.list_sessions'), 10)
+        self.assertEqual(metrics.get('sql_n_plus_one_total', endpoint='session.list_sessions'), 1)
+
+        response = self.client.get('/metrics')
+        body = response.data.decode()
+        self.assertIn('text/plain', response.content_type)
+        self.assertIn('http_requests_total{endpoint="session.list_sessions",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket', body)
+
+    def test_profile_written_when_header_set(self):
+        """Tester l'écriture d'un profil sur disque pour une requête échantillonnée"""
+        self.client.get('/sessions')
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+        self.client.get('/sessions', headers={'X-Profile': '1'})
+        files = sorted(os.listdir(self.tmp_dir.name))
+        self.assertEqual(len(files), 2)
+        self.assertTrue(files[0].endswith('.json'))
+        self.assertTrue(files[1].endswith('.prof'))
+
+    def test_anonymous_access_requires_token(self):
+        """Tester que /metrics et le profilage sont refusés aux visiteurs anonymes sans le secret"""
+        client = self.client
+        # Déconnexion de l'administrateur de setUp
+        client.get('/logout')
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        self.assertEqual(client.get('/metrics', headers={'Authorization': 'Bearer autre'}).status_code, 403)
+        self.assertEqual(client.get('/metrics', headers={'Authorization': 'Bearer secret-metriques'}).status_code, 200)
+
+        client.get('/about', headers={'X-Profile': '1'})
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+        client.get('/about', headers={'X-Profile': 'secret-metriques'})
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
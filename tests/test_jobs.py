@@ -0,0 +1,240 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Job
+from app.services.jobs import job, enqueue, claim_next, run_job, cancel, retry, requeue_stale, run_worker
+
+calls = []
+
+@job('test_echec', params={'failures': int})
+def failing_job(ctx, failures=1):
+    """Tâche de test qui échoue lors de ses premières tentatives"""
+    calls.append('test_echec')
+    if len(calls) <= failures:
+        raise RuntimeError('Erreur simulée')
+    return {'appels': len(calls)}
+
+@job('test_annulation')
+def cancellable_job(ctx):
+    """Tâche de test dont l'annulation est demandée pendant l'exécution"""
+    ctx.progress(1, 10, force=True)
+    cancel(ctx.job_id)
+    ctx.progress(2, 10, force=True)
+    return {'termine': True}
+
+@job('test_lente', params={'seconds': float})
+def slow_job(ctx, seconds=1.5):
+    """Tâche de test longue qui ne publie pas son avancement"""
+    calls.append('test_lente')
+    time.sleep(seconds)
+    return {'appels': calls.count('test_lente')}
+
+class JobsTestCase(unittest.TestCase):
+    """Tests pour la file de tâches de fond"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        calls.clear()
+        self.instance = tempfile.mkdtemp()
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.app.instance_path = self.instance
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        for i in range(3):
+            db.session.add(Equipment(id=f'EQ00{i}', nom_salle='Labo 101', type_equipement='Microscope',
+                                     qr_code_statique_data=f'EAFC-TIC_EQ00{i}'))
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.instance, ignore_errors=True)
+
+    def work(self):
+        run_worker(self.app, once=True, poll_interval=0, out=lambda message: None)
+
+    def test_worker_runs_job_with_output_file(self):
+        """Tester l'exécution d'une tâche et le téléchargement de son fichier"""
+        new_job = enqueue('qr_codes_equipements')
+        self.work()
+
+        job_obj = db.session.get(Job, new_job.id)
+        self.assertEqual(job_obj.statut, 'termine')
+        self.assertEqual((job_obj.avancement, job_obj.total), (3, 3))
+        self.assertEqual(json.loads(job_obj.resultat)['equipements'], 3)
+
+        self.client.get('/auto-login/admin')
+        response = self.client.get(f'/jobs/{new_job.id}/download')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[:2], b'PK')
+
+    def test_claim_is_exclusive(self):
+        """Tester qu'une tâche n'est réservée qu'une fois"""
+        new_job = enqueue('fermeture_sessions')
+        self.assertEqual(claim_next('worker-a'), new_job.id)
+        self.assertIsNone(claim_next('worker-b'))
+
+    def test_retry_with_backoff_then_failure(self):
+        """Tester la reprogrammation d'une tâche en échec puis l'échec définitif"""
+        new_job = enqueue('test_echec', {'failures': 5}, max_attempts=2)
+
+        self.assertEqual(run_job(claim_next('worker')), 'en_attente')
+        job_obj = db.session.get(Job, new_job.id)
+        self.assertGreater(job_obj.execute_apres, datetime.utcnow() + timedelta(seconds=20))
+        self.assertIn('Erreur simulée', job_obj.erreur)
+
+        # Pas encore prête : le délai n'est pas écoulé
+        self.assertIsNone(claim_next('worker'))
+        job_obj.execute_apres = datetime.utcnow()
+        db.session.commit()
+
+        self.assertEqual(run_job(claim_next('worker')), 'echec')
+        self.assertEqual(db.session.get(Job, new_job.id).tentatives, 2)
+
+        # Relance manuelle : nouvelle série de tentatives
+        self.assertTrue(retry(new_job.id))
+        calls.clear()
+        job_obj = db.session.get(Job, new_job.id)
+        job_obj.params = json.dumps({'failures': 0})
+        db.session.commit()
+        self.work()
+        self.assertEqual(db.session.get(Job, new_job.id).statut, 'termine')
+
+    def test_cancellation(self):
+        """Tester l'annulation d'une tâche en attente et d'une tâche en cours"""
+        pending = enqueue('fermeture_sessions')
+        self.assertTrue(cancel(pending.id))
+        self.assertEqual(db.session.get(Job, pending.id).statut, 'annule')
+        self.assertFalse(cancel(pending.id))
+
+        running = enqueue('test_annulation')
+        self.work()
+        job_obj = db.session.get(Job, running.id)
+        self.assertEqual(job_obj.statut, 'annule')
+        self.assertEqual(job_obj.avancement, 2)
+
+    def test_stale_jobs_requeued(self):
+        """Tester la remise en file des tâches d'un worker disparu"""
+        new_job = enqueue('fermeture_sessions')
+        claim_next('worker')
+        job_obj = db.session.get(Job, new_job.id)
+        job_obj.timestamp_heartbeat = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        self.assertEqual(requeue_stale(300), 1)
+        self.assertEqual(db.session.get(Job, new_job.id).statut, 'en_attente')
+
+    def test_api(self):
+        """Tester les endpoints de création, d'état et d'annulation"""
+        self.client.get('/auto-login/student')
+        self.assertEqual(self.client.get('/api/jobs').status_code, 403)
+        self.client.get('/logout')
+
+        self.client.get('/auto-login/admin')
+        response = self.client.post('/api/jobs', json={'type': 'inconnu'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/jobs', json={'type': 'analyse_utilisation'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['id']
+
+        data = self.client.get(f'/api/jobs/{job_id}').get_json()
+        self.assertEqual(data['statut'], 'en_attente')
+        self.assertEqual(data['cree_par'], 'admin@ecole.be')
+
+        self.work()
+        data = self.client.get(f'/api/jobs/{job_id}').get_json()
+        self.assertEqual(data['statut'], 'termine')
+        self.assertEqual(len(data['resultat']['equipements']), 3)
+
+        self.assertEqual(self.client.post(f'/api/jobs/{job_id}/cancel').status_code, 409)
+        self.assertEqual(self.client.get('/jobs').status_code, 200)
+
+    def test_params_validated_per_job_type(self):
+        """Tester la conversion des paramètres saisis et le refus des paramètres inconnus ou invalides"""
+        self.client.get('/auto-login/admin')
+        response = self.client.post('/jobs/create', data={'type': 'prerendu_qr_sessions',
+                                                          'params': 'session_ids=s1, s2\npurge=false'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(json.loads(Job.query.one().params), {'session_ids': ['s1', 's2'], 'purge': False})
+
+        for params in ('session_ids=s1\ninconnu=1', 'purge=true', 'session_ids=s1\npurge=peut-etre', 'session_ids'):
+            response = self.client.post('/jobs/create', data={'type': 'prerendu_qr_sessions', 'params': params},
+                                        follow_redirects=True)
+            self.assertIn('alert-danger', response.get_data(as_text=True))
+        self.assertEqual(Job.query.count(), 1)
+
+        with self.assertRaises(ValueError):
+            enqueue('archivage_quadrimestre', {'term': '2024-2025-Q1', 'chunk_size': '0'})
+        self.assertEqual(enqueue('archivage_quadrimestre', {'term': '2024-2025-Q1', 'chunk_size': '500'}).params,
+                         json.dumps({'term': '2024-2025-Q1', 'chunk_size': 500}))
+
+        response = self.client.post('/api/jobs', json={'type': 'analyse_utilisation', 'params': {'debut': 'hier'}})
+        self.assertEqual(response.status_code, 400)
+
+class JobsProcessPoolTestCase(unittest.TestCase):
+    """Tests du worker avec un pool de processus (base SQLite fichier partagée)"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.directory = tempfile.mkdtemp()
+        uri = 'sqlite:///' + os.path.join(self.directory, 'jobs.db')
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri})
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_pool_runs_all_jobs(self):
+        """Tester l'exécution de plusieurs tâches par un pool de deux processus"""
+        ids = [enqueue('fermeture_sessions').id for _ in range(4)]
+        db.session.remove()
+
+        run_worker(self.app, processes=2, once=True, poll_interval=0.05, out=lambda message: None)
+
+        statuses = {job_obj.id: job_obj.statut for job_obj in Job.query.all()}
+        self.assertEqual(statuses, {job_id: 'termine' for job_id in ids})
+
+    def test_inline_job_keeps_heartbeat(self):
+        """Tester qu'un second worker ne remet pas en file une tâche longue exécutée dans le processus du premier"""
+        calls.clear()
+        self.app.config['JOBS_STALE_SECONDS'] = 1
+        job_id = enqueue('test_lente').id
+        db.session.remove()
+
+        first = threading.Thread(target=run_worker, args=(self.app,),
+                                 kwargs={'once': True, 'poll_interval': 0.05, 'out': lambda message: None})
+        first.start()
+        # Le second worker démarre après JOBS_STALE_SECONDS, pendant l'exécution de la tâche
+        time.sleep(1.2)
+        run_worker(self.app, once=True, poll_interval=0.05, out=lambda message: None)
+        first.join()
+
+        job_obj = db.session.get(Job, job_id)
+        self.assertEqual((job_obj.statut, job_obj.tentatives), ('termine', 1))
+        self.assertEqual(calls, ['test_lente'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session
+from app.services.payload_migration import PayloadMigrationRunner
+from app.services.qr_code_migrations import EquipmentQrCodeMigration, SessionQrCodeMigration
+
+class FailingSessionMigration(SessionQrCodeMigration):
+    """Migration qui échoue après un certain nombre de lignes (simule une interruption)"""
+
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.seen = 0
+
+    def transform(self, row):
+        self.seen += 1
+        if self.seen > self.fail_after:
+            raise RuntimeError("Interruption simulée")
+        return super().transform(row)
+
+class PayloadMigrationTestCase(unittest.TestCase):
+    """Tests pour la migration par lots des QR codes"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SESSION_SCHEDULER_ENABLED': False})
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_file = os.path.join(self.tmp_dir.name, 'checkpoints.json')
+
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope', qr_code_statique_data='EQ001_Microscope_Labo 101'))
+        for i in range(25):
+            db.session.add(Session(
+                id=f'session-{i:03d}',
+                user_id_enseignant='prof1@ecole.be',
+                equipment_id='EQ001',
+                qr_code_dynamique_data=f'SESSION_session-{i:03d}_20250101080000',
+                actif=False
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.tmp_dir.cleanup()
+
+    def make_runner(self, **kwargs):
+        return PayloadMigrationRunner(chunk_size=10, checkpoint_file=self.checkpoint_file, out=lambda message: None, **kwargs)
+
+    def test_migrate_all_payloads(self):
+        """Tester la migration complète des équipements et des sessions"""
+        self.assertEqual(self.make_runner().run(EquipmentQrCodeMigration()), 1)
+        self.assertEqual(self.make_runner().run(SessionQrCodeMigration()), 25)
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Equipment, 'EQ001').qr_code_statique_data, 'EAFC-TIC_EQ001_Microscope_Labo 101')
+        self.assertEqual(db.session.get(Session, 'session-000').qr_code_dynamique_data,
+                         'SESSION_EAFC-TIC_Labo 101_Microscope_session-000_20250101080000')
+
+        # Une seconde exécution ne trouve plus rien à migrer
+        self.assertEqual(self.make_runner().run(SessionQrCodeMigration()), 0)
+
+    def test_dry_run_does_not_write(self):
+        """Tester que le mode dry-run ne modifie aucune ligne"""
+        self.assertEqual(self.make_runner(dry_run=True).run(SessionQrCodeMigration()), 0)
+        self.assertEqual(Session.query.filter(Session.qr_code_dynamique_data.contains('EAFC-TIC')).count(), 0)
+
+    def test_resume_after_interruption(self):
+        """Tester la reprise d'une migration interrompue à partir du dernier lot validé"""
+        with self.assertRaises(RuntimeError):
+            self.make_runner().run(FailingSessionMigration(fail_after=15))
+        db.session.rollback()
+
+        # Le premier lot (10 lignes) a été validé avant l'interruption
+        self.assertEqual(Session.query.filter(Session.qr_code_dynamique_data.contains('EAFC-TIC')).count(), 10)
+
+        self.assertEqual(self.make_runner().run(SessionQrCodeMigration()), 15)
+        self.assertFalse(os.path.exists(self.checkpoint_file) and 'session_qr_codes' in open(self.checkpoint_file).read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from itsdangerous import URLSafeSerializer
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.qr_tokens import TOKEN_PREFIX, TOKEN_SALT, InvalidQrToken, make_session_token, verify_session_token
+
+class QrTokensTestCase(unittest.TestCase):
+    """Tests pour les jetons signés des QR codes de session"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'QR_TOKEN_ROTATION_SECONDS': 30
+        })
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope',
+                                 qr_code_statique_data='EAFC-TIC_EQ001_Microscope_Labo 101'))
+        self.session = Session(id='session-001', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                               qr_code_dynamique_data='SESSION_EAFC-TIC_Labo 101_Microscope_session-001',
+                               timestamp_expiration=datetime.utcnow() + timedelta(hours=1))
+        db.session.add(self.session)
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assertRejected(self, payload, reason, **kwargs):
+        with self.assertRaises(InvalidQrToken) as context:
+            verify_session_token(payload, **kwargs)
+        self.assertEqual(context.exception.reason, reason)
+
+    def test_round_trip(self):
+        """Tester qu'un jeton émis est accepté et porte les bonnes revendications"""
+        claims = verify_session_token(make_session_token(self.session))
+        self.assertEqual(claims['session_id'], 'session-001')
+        self.assertEqual(claims['equipment_id'], 'EQ001')
+
+    def test_forged_and_malformed_tokens(self):
+        """Tester le rejet des jetons falsifiés ou malformés"""
+        token = make_session_token(self.session)
+        self.assertRejected(token[:-2] + ('AA' if not token.endswith('AA') else 'BB'), 'signature')
+        self.assertRejected('SESSION_T.abc', 'malformed')
+
+    def test_expiry_and_rotation(self):
+        """Tester l'expiration et la rotation des codes"""
+        now = time.time()
+        token = make_session_token(self.session, now=now)
+
+        # La période précédente reste acceptée, pas la suivante
+        verify_session_token(token, now=now + 30)
+        self.assertRejected(token, 'rotated', now=now + 90)
+        self.assertRejected(token, 'expired', now=now + 7200)
+
+        # Un code fixe (imprimé) ne tourne pas
+        verify_session_token(make_session_token(self.session, rotating=False, now=now), now=now + 600)
+
+    def test_scan_with_token(self):
+        """Tester un scan par jeton et le rejet d'un jeton falsifié sans accès à la base"""
+        self.client.get('/auto-login/student')
+        token = make_session_token(self.session)
+        response = self.client.post('/api/scan', json={'qr_code': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(LogScan.query.filter_by(session_id='session-001').count(), 1)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            claims = ['session-001', 'EQ001', 0, 0, 0]
+            forged = TOKEN_PREFIX + URLSafeSerializer('autre-cle', salt=TOKEN_SALT).dumps(claims)
+            response = self.client.post('/api/scan', json={'qr_code': forged})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['message'], 'QR code invalide.')
+        self.assertFalse([statement for statement in statements if 'sessions' in statement])
+
+if __name__ == '__main__':
+    unittest.main()
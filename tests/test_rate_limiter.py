@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.services.metrics import metrics
+from app.services.rate_limiter import MemoryRateLimitBackend, SqliteRateLimitBackend, is_valid_scan_payload, take_token
+
+class RateLimiterTestCase(unittest.TestCase):
+    """Tests pour la limitation de débit des endpoints de scan"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'RATE_LIMIT_IP_BURST': 3,
+            'RATE_LIMIT_IP_RATE': 0.001
+        })
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        metrics.reset()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_token_bucket_refill(self):
+        """Tester la consommation et le remplissage du seau à jetons"""
+        tokens, allowed, _ = take_token(None, 0, 0, rate=1, capacity=2)
+        self.assertEqual((tokens, allowed), (1, True))
+        tokens, allowed, _ = take_token(tokens, 0, 0, rate=1, capacity=2)
+        tokens, allowed, retry_after = take_token(tokens, 0, 0, rate=1, capacity=2)
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 1)
+        self.assertTrue(take_token(tokens, 0, 1, rate=1, capacity=2)[1])
+
+    def test_payload_format_precheck(self):
+        """Tester le rejet des charges utiles au format inconnu"""
+        self.assertTrue(is_valid_scan_payload('SESSION_EAFC-TIC_Labo 101_Microscope_abc_20250101080000'))
+        self.assertTrue(is_valid_scan_payload('EAFC-TIC_EQ001_Microscope_Labo 101'))
+        self.assertFalse(is_valid_scan_payload("' OR 1=1 --"))
+        self.assertFalse(is_valid_scan_payload('SESSION_' + 'x' * 600))
+        self.assertFalse(is_valid_scan_payload(None))
+
+        response = self.client.post('/api/scan', json={'qr_code': 'n-importe-quoi'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(metrics.get('scan_rejected_total', endpoint='scan.process_scan', reason='format'), 1)
+
+    def test_burst_is_limited_per_ip(self):
+        """Tester le rejet (429) une fois la rafale autorisée épuisée"""
+        statuses = [self.client.post('/api/scan', json={'qr_data': 'SESSION_inconnue'}).status_code for i in range(5)]
+        self.assertEqual(statuses, [404, 404, 404, 429, 429])
+
+        response = self.client.post('/api/scan', json={'qr_data': 'SESSION_inconnue'})
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(metrics.get('scan_rejected_total', endpoint='scan.process_scan', reason='rate_ip'), 3)
+
+    def test_sqlite_backend_is_shared(self):
+        """Tester que deux workers partagent les mêmes seaux via SQLite"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'rate_limits.sqlite')
+            worker_a, worker_b = SqliteRateLimitBackend(path), SqliteRateLimitBackend(path)
+
+            self.assertTrue(worker_a.consume('ip:1', 0.001, 2, now=100)[0])
+            self.assertTrue(worker_b.consume('ip:1', 0.001, 2, now=100)[0])
+            self.assertFalse(worker_a.consume('ip:1', 0.001, 2, now=100)[0])
+            self.assertTrue(worker_b.consume('ip:2', 0.001, 2, now=100)[0])
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        """Tester que la table en mémoire reste bornée face à une rafale d'adresses différentes"""
+        backend = MemoryRateLimitBackend(max_keys=3)
+        self.assertTrue(backend.consume('ip:1', 0.001, 1, now=100)[0])
+        for i in range(2, 10):
+            backend.consume(f'ip:{i}', 0.001, 1, now=100)
+            # ip:1 reste utilisée : elle n'est jamais la plus ancienne
+            self.assertFalse(backend.consume('ip:1', 0.001, 1, now=100)[0])
+
+        self.assertEqual(list(backend._buckets), ['ip:8', 'ip:9', 'ip:1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import mock
+from flask import g
+from sqlalchemy import create_engine, text
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.metrics import metrics
+from app.services.qr_tokens import make_session_token
+
+class ReadRoutingTestCase(unittest.TestCase):
+    """Tests pour le routage des lectures vers le pool SQLite en lecture seule"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        metrics.reset()
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(self.directory, 'app.db'),
+            'READ_ROUTING_ENABLED': True
+        })
+        self.client = self.app.test_client()
+        self.router = self.app.extensions['read_routing']
+        # Pas de contexte d'application maintenu : chaque requête a son propre g
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope',
+                                     qr_code_statique_data='EAFC-TIC_EQ001'))
+            db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        if self.router._replica is not None:
+            self.router._replica.dispose()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_requests_read_from_replica(self):
+        """Tester que les pages GET lisent via le pool en lecture seule (WAL)"""
+        self.client.get('/auto-login/teacher')
+        self.assertEqual(self.client.get('/sessions').status_code, 200)
+
+        self.assertEqual(metrics.get('db_read_routing_requests_total', target='replica'), 1)
+        self.assertEqual(self.router._replica.url.query['mode'], 'ro')
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+
+    def test_writes_stay_on_primary(self):
+        """Tester qu'une écriture dans une requête en lecture seule part sur la base principale"""
+        with self.app.test_request_context('/sessions'):
+            g.lecture_seule = True
+            self.assertEqual(db.session.get(Equipment, 'EQ001').nom_salle, 'Labo 101')
+
+            db.session.add(Session(id='session-001', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                                   timestamp_debut=datetime.utcnow(), qr_code_dynamique_data='SESSION_1'))
+            db.session.commit()
+
+            # Lecture de ses propres écritures : la requête reste sur la base principale
+            self.assertIsNotNone(db.session.get(Session, 'session-001'))
+            self.assertIs(db.session.get_bind(), db.engine)
+        self.assertEqual(metrics.get('db_read_routing_switch_total'), 1)
+
+    def test_lagging_or_unreachable_replica_falls_back(self):
+        """Tester le repli sur la base principale quand le réplica est en retard ou injoignable"""
+        self.client.get('/auto-login/teacher')
+        with mock.patch.object(self.router, 'replica_lag', return_value=60.0):
+            self.assertEqual(self.client.get('/sessions').status_code, 200)
+        self.assertEqual(metrics.get('db_read_routing_fallback_total', reason='retard'), 1)
+
+        with mock.patch.object(self.router, 'replica_lag', return_value=None):
+            self.assertEqual(self.client.get('/sessions').status_code, 200)
+        self.assertEqual(metrics.get('db_read_routing_fallback_total', reason='erreur'), 1)
+        self.assertEqual(metrics.get('db_read_routing_requests_total', target='replica'), 0)
+
+    def test_recent_write_reads_primary_with_remote_replica(self):
+        """Tester qu'un utilisateur relit ses écritures sur la base principale (réplica distant)"""
+        self.app.config['READ_REPLICA_URI'] = 'sqlite:///' + os.path.join(self.directory, 'app.db')
+        self.client.get('/auto-login/admin')
+        self.client.post('/jobs/create', data={'type': 'fermeture_sessions'})
+
+        self.client.get('/jobs')
+        self.assertEqual(metrics.get('db_read_routing_fallback_total', reason='ecriture_recente'), 1)
+
+    def test_confirm_scan_reads_primary(self):
+        """Tester que la confirmation d'un scan (GET qui écrit) ne lit pas un réplica en retard"""
+        # Réplica en retard : la session que l'enseignant vient d'ouvrir n'y est pas encore
+        replica = os.path.join(self.directory, 'replica.db')
+        self.app.config['READ_REPLICA_URI'] = 'sqlite:///' + replica
+        with self.app.app_context():
+            opened = Session(id='session-001', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                             timestamp_debut=datetime.utcnow(), qr_code_dynamique_data='SESSION_1')
+            db.session.add(opened)
+            db.session.commit()
+            token = make_session_token(opened, rotating=False)
+            replica_engine = create_engine('sqlite:///' + replica)
+            db.metadata.create_all(replica_engine)
+            replica_engine.dispose()
+
+        self.client.get('/auto-login/student')
+        for _ in range(2):
+            with self.client.session_transaction() as http_session:
+                http_session['pending_scan'] = token
+            self.assertEqual(self.client.get('/confirm-scan').status_code, 200)
+
+        with self.app.app_context():
+            self.assertEqual(LogScan.query.filter_by(session_id='session-001').count(), 1)
+        self.assertEqual(metrics.get('db_read_routing_fallback_total', reason='exclu'), 2)
+        self.assertEqual(metrics.get('scans_total', frontend='confirm', status='recorded'), 1)
+        self.assertEqual(metrics.get('scans_total', frontend='confirm', status='duplicate'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
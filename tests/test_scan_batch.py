@@ -0,0 +1,102 @@
+import unittest
+import os
+import sys
+from calendar import timegm
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.qr_tokens import make_session_token
+
+class ScanBatchTestCase(unittest.TestCase):
+    """Tests pour l'envoi groupé des scans mis en file d'attente hors ligne"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        now = datetime.utcnow()
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope',
+                                 qr_code_statique_data='EAFC-TIC_EQ001_Microscope_Labo 101'))
+        # Session fermée pendant la coupure réseau : les scans faits pendant la session restent valables
+        self.closed = Session(id='session-fermee', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                              qr_code_dynamique_data='SESSION_EAFC-TIC_fermee', actif=False,
+                              timestamp_debut=now - timedelta(hours=2), timestamp_fin=now - timedelta(hours=1))
+        self.active = Session(id='session-active', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                              qr_code_dynamique_data='SESSION_EAFC-TIC_active',
+                              timestamp_debut=now - timedelta(minutes=30), timestamp_expiration=now + timedelta(minutes=30))
+        db.session.add_all([self.closed, self.active])
+        db.session.commit()
+        self.now = now
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def record(self, record_id, qr_code, minutes_ago):
+        return {'id': record_id, 'qr_code': qr_code,
+                'scanned_at': (self.now - timedelta(minutes=minutes_ago)).isoformat() + 'Z'}
+
+    def test_batch_records_and_dedupes(self):
+        """Tester l'enregistrement d'un lot avec doublons et enregistrements invalides"""
+        self.client.get('/auto-login/student')
+        scanned = self.now - timedelta(minutes=90)
+        token = make_session_token(self.closed, rotating=False, now=timegm(scanned.timetuple()))
+
+        response = self.client.post('/api/scan/batch', json={'records': [
+            self.record('a', token, 90),
+            self.record('b', 'SESSION_EAFC-TIC_active', 10),
+            self.record('c', 'SESSION_EAFC-TIC_active', 9),
+            self.record('d', 'SESSION_EAFC-TIC_fermee', 5),
+            self.record('e', 'pas-un-qr-code', 5)
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        statuses = {result['id']: result['status'] for result in response.get_json()['results']}
+        self.assertEqual(statuses, {'a': 'recorded', 'b': 'recorded', 'c': 'duplicate', 'd': 'rejected', 'e': 'rejected'})
+        self.assertEqual(LogScan.query.filter_by(user_id_etudiant='etudiant1@ecole.be').count(), 2)
+
+        # Un nouvel envoi du même lot (réponse perdue) ne crée aucun doublon
+        response = self.client.post('/api/scan/batch', json={'records': [self.record('b', 'SESSION_EAFC-TIC_active', 10)]})
+        self.assertEqual(response.get_json()['results'][0]['status'], 'duplicate')
+        self.assertEqual(LogScan.query.count(), 2)
+
+    def test_batch_rejects_replayed_rotating_code(self):
+        """Tester qu'une photo d'un ancien code tournant, avec une heure de scan antidatée, est rejetée"""
+        self.client.get('/auto-login/student')
+
+        def rotating(minutes_ago):
+            return make_session_token(self.active, now=timegm((self.now - timedelta(minutes=minutes_ago)).timetuple()))
+
+        response = self.client.post('/api/scan/batch', json={'records': [
+            self.record('photo', rotating(20), 20),
+            self.record('hors-ligne', rotating(2), 2)
+        ]})
+
+        results = {result['id']: result for result in response.get_json()['results']}
+        self.assertEqual(results['photo']['status'], 'rejected')
+        self.assertIn("n'est plus valide", results['photo']['message'])
+        # Coupure réseau de quelques minutes : le scan reste accepté
+        self.assertEqual(results['hors-ligne']['status'], 'recorded')
+
+    def test_batch_requires_login_and_limits_size(self):
+        """Tester l'authentification et la taille maximale d'un lot"""
+        response = self.client.post('/api/scan/batch', json={'records': [self.record('a', 'SESSION_EAFC-TIC_active', 1)]})
+        self.assertEqual(response.status_code, 302)
+
+        self.client.get('/auto-login/student')
+        self.app.config['SCAN_BATCH_MAX_RECORDS'] = 2
+        records = [self.record(str(i), 'SESSION_EAFC-TIC_active', 1) for i in range(3)]
+        self.assertEqual(self.client.post('/api/scan/batch', json={'records': records}).status_code, 413)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.metrics import metrics
+from app.services.qr_tokens import make_session_token
+from app.services.scan_engine import open_equipment_session
+
+class ScanEngineTestCase(unittest.TestCase):
+    """Tests pour le moteur de scan et ses front-ends"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        metrics.reset()
+
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope',
+                                 qr_code_statique_data='EAFC-TIC_EQ001_Microscope_Labo 101'))
+        self.session = Session(id='session-001', user_id_enseignant='prof1@ecole.be', equipment_id='EQ001',
+                               nom_session='Session Microscope', qr_code_dynamique_data='SESSION_EAFC-TIC_001',
+                               timestamp_expiration=datetime.utcnow() + timedelta(hours=1))
+        db.session.add(self.session)
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_single_scan_route(self):
+        """Tester qu'une seule vue est enregistrée pour /api/scan"""
+        rules = [rule.endpoint for rule in self.app.url_map.iter_rules() if rule.rule == '/api/scan']
+        self.assertEqual(rules, ['scan.process_scan'])
+
+    def test_api_scan_records_then_dedupes(self):
+        """Tester l'enregistrement puis le dédoublonnage d'un scan via l'API JSON"""
+        self.client.get('/auto-login/student')
+
+        response = self.client.post('/api/scan', json={'qr_code': make_session_token(self.session)})
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(data['duplicate'])
+        self.assertEqual(data['session_info']['teacher'], 'Jean Dupont')
+
+        response = self.client.post('/api/scan', json={'qr_code': 'SESSION_EAFC-TIC_001'})
+        self.assertTrue(response.get_json()['duplicate'])
+        self.assertEqual(LogScan.query.count(), 1)
+
+        self.assertEqual(metrics.get('scans_total', frontend='api', status='recorded'), 1)
+        self.assertEqual(metrics.get('scans_total', frontend='api', status='duplicate'), 1)
+        for stage in ('resolve', 'validate', 'dedupe', 'record'):
+            self.assertEqual(metrics.get('scan_stage_duration_seconds', frontend='api', stage=stage), 2)
+
+    def test_pending_scan_confirmed_after_login(self):
+        """Tester le scan anonyme conservé puis confirmé après connexion"""
+        response = self.client.post('/api/scan', json={'qr_code': make_session_token(self.session)})
+        self.assertIn('redirect', response.get_json())
+        self.assertEqual(LogScan.query.count(), 0)
+
+        self.client.get('/auto-login/student')
+        response = self.client.get('/confirm-scan')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(LogScan.query.filter_by(user_id_etudiant='etudiant1@ecole.be').count(), 1)
+
+    def test_inactive_session_rejected(self):
+        """Tester le rejet d'un scan en direct sur une session fermée"""
+        self.session.actif = False
+        db.session.commit()
+        self.client.get('/auto-login/student')
+
+        response = self.client.post('/api/scan', json={'qr_code': 'SESSION_EAFC-TIC_001'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(LogScan.query.count(), 0)
+
+    def test_new_session_static_payload_not_scannable(self):
+        """Tester qu'une nouvelle session ne s'enregistre que par jeton signé, jamais montré aux étudiants"""
+        equipment = db.session.get(Equipment, 'EQ001')
+        new_session, created = open_equipment_session(equipment, 'admin@ecole.be', datetime.utcnow())
+        db.session.commit()
+        self.assertTrue(created)
+        self.client.get('/auto-login/student')
+
+        response = self.client.post('/api/scan', json={'qr_code': new_session.qr_code_dynamique_data})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(LogScan.query.count(), 0)
+
+        response = self.client.post('/api/scan', json={'qr_code': make_session_token(new_session)})
+        self.assertEqual(response.status_code, 200)
+
+        # L'étudiant qui a scanné voit la session, sans aucune donnée de QR code
+        page = self.client.get(f'/sessions/{new_session.id}').get_data(as_text=True)
+        self.assertNotIn(new_session.qr_code_dynamique_data, page)
+        self.assertNotIn('SESSION_', page)
+        self.assertNotIn('Simuler un scan', page)
+
+        self.client.get('/auto-login/admin')
+        page = self.client.get(f'/sessions/{new_session.id}').get_data(as_text=True)
+        self.assertIn("simulateScan('SESSION_T.", page)
+
+if __name__ == '__main__':
+    unittest.main()
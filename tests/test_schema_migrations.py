@@ -0,0 +1,116 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from sqlalchemy import create_engine, inspect, text
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.schema_migrations import MIGRATIONS, upgrade, applied_versions
+
+class SchemaMigrationsTestCase(unittest.TestCase):
+    """Tests pour les migrations de schéma versionnées"""
+
+    def setUp(self):
+        """Créer une base avec l'ancien schéma (avant les colonnes ajoutées et les index)"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'app.db')}")
+
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE users (id VARCHAR(50) PRIMARY KEY, nom_complet VARCHAR(100) NOT NULL, role VARCHAR(20) NOT NULL)"))
+            connection.execute(text("CREATE TABLE sessions (id VARCHAR(36) PRIMARY KEY, timestamp_debut DATETIME NOT NULL, "
+                                    "user_id_enseignant VARCHAR(50) NOT NULL, equipment_id VARCHAR(20) NOT NULL, "
+                                    "qr_code_dynamique_data VARCHAR(250) NOT NULL)"))
+            connection.execute(text("CREATE TABLE logs_scans_etudiants (id VARCHAR(36) PRIMARY KEY, timestamp_scan DATETIME NOT NULL, "
+                                    "session_id VARCHAR(36) NOT NULL, user_id_etudiant VARCHAR(50) NOT NULL)"))
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_upgrade_adds_columns_and_indexes(self):
+        """Tester que toutes les migrations sont appliquées puis enregistrées"""
+        applied = upgrade(self.engine, report_dir=self.tmp_dir.name, out=lambda message: None)
+        self.assertEqual(applied, [version for version, _, _ in MIGRATIONS])
+
+        inspector = inspect(self.engine)
+        session_columns = {column['name'] for column in inspector.get_columns('sessions')}
+        self.assertTrue({'nom_session', 'actif', 'timestamp_fin', 'timestamp_expiration', 'planifiee'} <= session_columns)
+
+        log_indexes = {index['name'] for index in inspector.get_indexes('logs_scans_etudiants')}
+        self.assertIn('ix_logs_scans_etudiant_historique_id', log_indexes)
+        self.assertNotIn('ix_logs_scans_etudiant_historique', log_indexes)
+        self.assertNotIn('ix_logs_scans_etudiant_timestamp', log_indexes)
+        self.assertIn('ix_logs_scans_session_timestamp', log_indexes)
+
+        # Une seconde exécution ne fait rien
+        self.assertEqual(upgrade(self.engine, out=lambda message: None), [])
+        self.assertEqual(applied_versions(self.engine), set(applied))
+
+    def test_explain_report_shows_index_usage(self):
+        """Tester que le rapport EXPLAIN montre l'utilisation des nouveaux index"""
+        upgrade(self.engine, report_dir=self.tmp_dir.name, out=lambda message: None)
+
+        with open(os.path.join(self.tmp_dir.name, 'schema_migration_004.json')) as f:
+            report = json.load(f)
+
+        before = ' '.join(report['explain_avant']['historique_etudiant'])
+        after = ' '.join(report['explain_apres']['historique_etudiant'])
+        self.assertNotIn('ix_logs_scans_etudiant_timestamp', before)
+        self.assertIn('ix_logs_scans_etudiant_timestamp', after)
+
+    def test_duplicate_active_sessions_are_closed(self):
+        """Tester que seules les sessions actives les plus récentes restent actives avant l'index unique"""
+        with self.engine.begin() as connection:
+            for session_id, equipment_id, debut in [('s1', 'EQ001', '2024-01-01 08:00:00'),
+                                                    ('s2', 'EQ001', '2024-01-01 09:00:00'),
+                                                    ('s3', 'EQ002', '2024-01-01 08:00:00')]:
+                connection.execute(text("INSERT INTO sessions (id, timestamp_debut, user_id_enseignant, equipment_id, "
+                                        "qr_code_dynamique_data) VALUES (:id, :debut, 'prof1@ecole.be', :equipment_id, :id)"),
+                                   {'id': session_id, 'debut': debut, 'equipment_id': equipment_id})
+
+        upgrade(self.engine, report_dir=self.tmp_dir.name, out=lambda message: None)
+
+        with self.engine.connect() as connection:
+            active = connection.execute(text("SELECT id FROM sessions WHERE actif ORDER BY id")).scalars().all()
+        self.assertEqual(active, ['s2', 's3'])
+        with open(os.path.join(self.tmp_dir.name, 'schema_migration_010.json')) as f:
+            self.assertEqual(json.load(f)['sessions_dupliquees_fermees'], 1)
+
+        unique_indexes = {index['name'] for index in inspect(self.engine).get_indexes('sessions') if index['unique']}
+        self.assertIn('ux_sessions_actif_equipment_enseignant', unique_indexes)
+
+    def test_student_history_index_covers_keyset_query(self):
+        """Tester que l'historique paginé est servi par l'index seul, tables d'archive comprises"""
+        from app.models import AttendancePartition
+
+        AttendancePartition.__table__.create(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE logs_scans_archive_2023_2024_q1 (id VARCHAR(36) PRIMARY KEY, "
+                                    "timestamp_scan DATETIME NOT NULL, session_id VARCHAR(36) NOT NULL, "
+                                    "user_id_etudiant VARCHAR(50) NOT NULL)"))
+            connection.execute(text("CREATE INDEX ix_logs_scans_archive_2023_2024_q1_etudiant "
+                                    "ON logs_scans_archive_2023_2024_q1 (user_id_etudiant, timestamp_scan, session_id)"))
+            connection.execute(text("INSERT INTO attendance_partitions (term, table_name, timestamp_debut, timestamp_fin, "
+                                    "statut, nb_scans) VALUES ('2023-2024-Q1', 'logs_scans_archive_2023_2024_q1', "
+                                    "'2023-09-01', '2024-02-01', 'archive', 0)"))
+
+        upgrade(self.engine, report_dir=self.tmp_dir.name, out=lambda message: None)
+
+        archive_indexes = {index['name'] for index in inspect(self.engine).get_indexes('logs_scans_archive_2023_2024_q1')}
+        self.assertEqual(archive_indexes, {'ix_logs_scans_archive_2023_2024_q1_etudiant_id'})
+
+        with self.engine.connect() as connection:
+            plan = ' '.join(row[-1] for row in connection.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id, timestamp_scan, session_id FROM logs_scans_etudiants "
+                "WHERE user_id_etudiant = :user_id AND (timestamp_scan < :ts OR (timestamp_scan = :ts AND id < :id)) "
+                "ORDER BY timestamp_scan DESC, id DESC LIMIT 21"
+            ), {'user_id': 'etudiant1@ecole.be', 'ts': '2024-01-01 08:00:00', 'id': 'z'}))
+        self.assertIn('COVERING INDEX ix_logs_scans_etudiant_historique_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import json
+import sys
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment
+from app.services.auth_service import AuthService
+from app.services.search import search_equipments, create_search_index, query_tokens, _postgresql_match
+from app.services.user_backend import SqlUserBackend
+
+class SearchTestCase(unittest.TestCase):
+    """Tests pour la recherche plein texte des équipements et des utilisateurs"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        for i in range(30):
+            salle = 'Laboratoire Électronique' if i % 3 == 0 else f'Salle {100 + i}'
+            db.session.add(Equipment(id=f'EQ{i:03d}', nom_salle=salle, type_equipement='Oscilloscope' if i % 2 else 'Microscope',
+                                     qr_code_statique_data=f'EAFC-TIC_EQ{i:03d}'))
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def ids(self, query, **kwargs):
+        return [equipment.id for equipment in search_equipments(query, **kwargs)['items']]
+
+    def test_prefix_search_without_accents(self):
+        """Tester la recherche par préfixe, sans tenir compte des accents ni de la casse"""
+        self.assertEqual(len(self.ids('electro', per_page=100)), 10)
+        self.assertEqual(self.ids('labo elec osc', per_page=100), ['EQ003', 'EQ009', 'EQ015', 'EQ021', 'EQ027'])
+        self.assertEqual(self.ids('eq01', per_page=100), [f'EQ01{i}' for i in range(10)])
+        self.assertEqual(self.ids('"introuvable'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Tester que l'index suit les modifications et suppressions"""
+        equipment = db.session.get(Equipment, 'EQ001')
+        equipment.nom_salle = 'Atelier Robotique'
+        db.session.commit()
+        self.assertEqual(self.ids('robot'), ['EQ001'])
+        self.assertNotIn('EQ001', self.ids('salle', per_page=100))
+
+        db.session.delete(equipment)
+        db.session.commit()
+        self.assertEqual(self.ids('robot'), [])
+
+    def test_pagination(self):
+        """Tester la pagination des résultats"""
+        results = search_equipments('', page=3, per_page=12)
+        self.assertEqual((results['total'], results['page'], results['pages']), (30, 3, 3))
+        self.assertEqual([equipment.id for equipment in results['items']], [f'EQ{i:03d}' for i in range(24, 30)])
+
+        # Page hors limites : dernière page
+        self.assertEqual(search_equipments('micro', page=9, per_page=10)['page'], 2)
+
+    def test_user_search_backends(self):
+        """Tester la recherche d'utilisateurs (FTS en base et index en mémoire du fichier JSON)"""
+        users = [
+            {'id': 'admin@ecole.be', 'nom_complet': 'Administrateur', 'role': 'Admin', 'password': '1234'},
+            {'id': 'prof1@ecole.be', 'nom_complet': 'Marie Curie', 'role': 'Enseignant', 'password': '1234'},
+            {'id': 'etudiant1@ecole.be', 'nom_complet': 'Marius Martin', 'role': 'Etudiant', 'password': '1234'},
+            {'id': 'etudiant2@ecole.be', 'nom_complet': 'Sophie Dubois', 'role': 'Etudiant', 'password': '1234'}
+        ]
+        sql_backend = SqlUserBackend()
+        sql_backend.import_users(users)
+
+        directory = tempfile.mkdtemp()
+        try:
+            json_backend = AuthService()
+            json_backend.test_users_file = os.path.join(directory, 'users.json')
+            with open(json_backend.test_users_file, 'w') as f:
+                json.dump(users, f)
+            json_backend.get_users(force_refresh=True)
+
+            for backend in (sql_backend, json_backend):
+                results = backend.search_users('mar')
+                self.assertCountEqual([u['id'] for u in results['items']], ['prof1@ecole.be', 'etudiant1@ecole.be'])
+                self.assertEqual(backend.search_users('mar', role='Etudiant')['total'], 1)
+                self.assertEqual([u['id'] for u in backend.search_users('etudiant2@ec')['items']], ['etudiant2@ecole.be'])
+                self.assertEqual(backend.search_users('', per_page=3)['pages'], 2)
+
+                backend.update_user('etudiant2@ecole.be', nom_complet='Sophie Marchal')
+                self.assertEqual(backend.search_users('mar', role='Etudiant')['total'], 2)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_list_page_and_api(self):
+        """Tester la page de liste et l'API de recherche des équipements"""
+        client = self.app.test_client()
+        client.get('/auto-login/teacher')
+
+        response = client.get('/equipments?q=robot')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('0 équipement(s)', response.get_data(as_text=True))
+
+        data = client.get('/api/equipments/search?q=labo&page=1').get_json()
+        self.assertEqual(data['total'], 10)
+        self.assertEqual(data['equipments'][0]['nom_salle'], 'Laboratoire Électronique')
+
+    def test_postgresql_search_ignores_accents(self):
+        """Tester que la recherche PostgreSQL compare des textes sans accents, avec les expressions des index"""
+        condition, params, rank = _postgresql_match('users', query_tokens("Hélène d'Éleo"))
+        self.assertEqual(params, {'recherche': 'helene:* & d:* & eleo:*', 'contient': '%helene d eleo%'})
+
+        document = "recherche_sans_accents(coalesce({0}id, '') || ' ' || coalesce({0}nom_complet, ''))"
+        self.assertIn(f"to_tsvector('simple', {document.format('t.')}) @@", condition)
+        self.assertIn(f"lower({document.format('t.')}) LIKE :contient", condition)
+        self.assertIn(document.format('t.'), rank)
+
+        connection = mock.Mock(dialect=SimpleNamespace(name='postgresql'))
+        create_search_index(connection, 'users')
+        statements = [call.args[0].text for call in connection.execute.call_args_list]
+        self.assertIn('CREATE EXTENSION IF NOT EXISTS unaccent', statements)
+        self.assertTrue(any('FUNCTION recherche_sans_accents(text)' in sql and 'IMMUTABLE' in sql for sql in statements))
+        # Même expression que la requête : les index GIN restent utilisables
+        self.assertIn(f"USING gin (to_tsvector('simple', {document.format('')}))", statements[-2])
+        self.assertIn(f"USING gin (lower({document.format('')}) gin_trgm_ops)", statements[-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+from unittest import mock
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import serverless
+from app.services.qr_images import qr_code_png
+
+class ServerlessTestCase(unittest.TestCase):
+    """Tests pour le handler de la fonction Netlify"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.environ = mock.patch.dict(os.environ, {'DATABASE_URI': 'sqlite://'})
+        self.environ.start()
+        serverless._app = None
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        serverless._app = None
+        self.environ.stop()
+
+    def event(self, path, method='GET', headers=None):
+        return {'path': path, 'httpMethod': method, 'headers': headers or {'host': 'example.org'},
+                'body': '', 'isBase64Encoded': False}
+
+    def test_app_reused_between_invocations(self):
+        """Tester que l'application n'est construite qu'à la première invocation"""
+        first = serverless.get_app()
+        self.assertIs(serverless.get_app(), first)
+        self.assertFalse(first.config['SESSION_SCHEDULER_ENABLED'])
+        self.assertIsNotNone(serverless.stats['app_build_seconds'])
+
+    def test_event_round_trip(self):
+        """Tester la conversion d'un événement en requête WSGI et de la réponse"""
+        response = serverless.lambda_handler(self.event('/help'))
+        self.assertEqual(response['statusCode'], 200)
+        self.assertFalse(response['isBase64Encoded'])
+        self.assertIn('<html', response['body'])
+
+        # Le préfixe de la fonction est retiré ; la session non authentifiée est redirigée
+        response = serverless.lambda_handler(self.event('/.netlify/functions/api/scan/batch', method='POST'))
+        self.assertEqual(response['statusCode'], 302)
+        self.assertIn('/login', response['headers']['Location'])
+
+        response = serverless.lambda_handler(self.event('/static/css/style.css'))
+        self.assertEqual(response['statusCode'], 200)
+        self.assertFalse(response['isBase64Encoded'])
+
+    def test_client_address(self):
+        """Tester l'adresse du client transmise par Netlify"""
+        environ = serverless.event_to_environ(self.event('/', headers={'x-nf-client-connection-ip': '203.0.113.7'}))
+        self.assertEqual(environ['REMOTE_ADDR'], '203.0.113.7')
+        environ = serverless.event_to_environ(self.event('/', headers={'X-Forwarded-For': '198.51.100.1, 10.0.0.1'}))
+        self.assertEqual(environ['REMOTE_ADDR'], '198.51.100.1')
+
+    def test_qr_code_png_cached(self):
+        """Tester la mise en cache des images de QR codes"""
+        qr_code_png.cache_clear()
+        first = qr_code_png('EQUIP-1')
+        self.assertIs(qr_code_png('EQUIP-1'), first)
+        self.assertTrue(first.startswith(b'\x89PNG'))
+        self.assertEqual(qr_code_png.cache_info().hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
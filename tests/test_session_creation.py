@@ -0,0 +1,117 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session
+from app.services.metrics import metrics
+from app.services.session_scheduler import compute_expiration
+
+QR_CODE = 'EAFC-TIC_EQ001_Microscope_Labo 101'
+
+class SessionCreationTestCase(unittest.TestCase):
+    """Tests pour la création idempotente des sessions par scan d'équipement"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        metrics.reset()
+        # Base fichier : les requêtes concurrentes ont chacune leur connexion
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(self.directory, 'app.db')
+        })
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope',
+                                     qr_code_statique_data=QR_CODE))
+            db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def teacher_client(self):
+        client = self.app.test_client()
+        client.get('/auto-login/teacher')
+        return client
+
+    def active_sessions(self):
+        with self.app.app_context():
+            return Session.query.filter_by(equipment_id='EQ001', actif=True).all()
+
+    def test_concurrent_scans_create_one_session(self):
+        """Tester que 100 scans simultanés du même équipement créent une seule session"""
+        clients = [self.teacher_client() for _ in range(100)]
+        barrier = threading.Barrier(len(clients))
+        responses = [None] * len(clients)
+
+        def scan(i):
+            barrier.wait()
+            responses[i] = clients[i].post('/api/scan-equipment', json={'qr_code': QR_CODE}).get_json()
+
+        def slow_expiration(*args):
+            # Élargit la fenêtre entre la recherche d'une session active et l'insertion
+            time.sleep(0.01)
+            return compute_expiration(*args)
+
+        threads = [threading.Thread(target=scan, args=(i,)) for i in range(len(clients))]
+        with mock.patch('app.services.scan_engine.compute_expiration', side_effect=slow_expiration):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertTrue(all(response['success'] for response in responses))
+        self.assertEqual(len({response['session_id'] for response in responses}), 1)
+        self.assertEqual(sum(response['message'].startswith('Nouvelle session') for response in responses), 1)
+        self.assertEqual(len(self.active_sessions()), 1)
+        self.assertEqual(metrics.get('session_open_total', outcome='creee'), 1)
+        self.assertEqual(metrics.get('session_open_total', outcome='existante'), 99)
+
+    def test_idempotency_key_replays_same_session(self):
+        """Tester qu'une clé d'idempotence retourne la même session, même fermée"""
+        client = self.teacher_client()
+        first = client.post('/api/scan-equipment', json={'qr_code': QR_CODE},
+                            headers={'Idempotency-Key': 'scan-1'}).get_json()
+
+        with self.app.app_context():
+            db.session.get(Session, first['session_id']).actif = False
+            db.session.commit()
+
+        replay = client.post('/api/scan-equipment', json={'qr_code': QR_CODE},
+                             headers={'Idempotency-Key': 'scan-1'}).get_json()
+        self.assertEqual(replay['session_id'], first['session_id'])
+        self.assertEqual(self.active_sessions(), [])
+
+        # Nouvelle clé : nouvelle session
+        second = client.post('/api/scan-equipment', json={'qr_code': QR_CODE, 'idempotency_key': 'scan-2'}).get_json()
+        self.assertNotEqual(second['session_id'], first['session_id'])
+        self.assertEqual(metrics.get('session_open_total', outcome='rejouee'), 1)
+
+        response = client.post('/api/scan-equipment', json={'qr_code': QR_CODE}, headers={'Idempotency-Key': 'x' * 65})
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_form_reuses_active_session(self):
+        """Tester qu'un double envoi du formulaire de création redirige vers la session active"""
+        client = self.teacher_client()
+        first = client.post('/sessions/create', data={'equipment_id': 'EQ001'})
+        second = client.post('/sessions/create', data={'equipment_id': 'EQ001'})
+
+        self.assertEqual(first.headers['Location'], second.headers['Location'])
+        self.assertEqual(len(self.active_sessions()), 1)
+
+if __name__ == '__main__':
+    unittest.main()
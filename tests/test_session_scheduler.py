@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Session
+from app.services.session_scheduler import close_expired_sessions, compute_expiration, get_session_scheduler
+
+class SessionSchedulerTestCase(unittest.TestCase):
+    """Tests pour la fermeture automatique des sessions"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'SESSION_DURATION_MINUTES': 60
+        })
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.closed = []
+        get_session_scheduler().add_close_listener(self.closed.extend)
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        get_session_scheduler().stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_session(self, session_id, timestamp_debut, timestamp_expiration=None):
+        # Un équipement par session : une seule session active par enseignant et équipement
+        db.session.add(Session(
+            id=session_id,
+            user_id_enseignant='prof1@ecole.be',
+            equipment_id=f'EQ_{session_id}',
+            timestamp_debut=timestamp_debut,
+            timestamp_expiration=timestamp_expiration,
+            qr_code_dynamique_data=f'SESSION_{session_id}'
+        ))
+        db.session.commit()
+
+    def test_compute_expiration(self):
+        """Tester le calcul de l'expiration avec une durée propre à la session"""
+        debut = datetime(2025, 1, 1, 8, 0)
+        self.assertEqual(compute_expiration(debut, 90), debut + timedelta(minutes=90))
+        self.assertEqual(compute_expiration(debut, None), debut + timedelta(minutes=60))
+        self.assertEqual(compute_expiration(debut, 'abc'), debut + timedelta(minutes=60))
+
+    def test_close_expired_sessions(self):
+        """Tester que seules les sessions expirées sont fermées, en tenant compte des durées"""
+        now = datetime.utcnow()
+        self.add_session('expired', now - timedelta(minutes=30), now - timedelta(minutes=1))
+        self.add_session('running', now - timedelta(minutes=90), now + timedelta(minutes=30))
+        self.add_session('legacy', now - timedelta(hours=2))
+        self.add_session('legacy-recent', now - timedelta(minutes=10))
+
+        closed_ids = close_expired_sessions(now)
+
+        self.assertEqual(set(closed_ids), {'expired', 'legacy'})
+        self.assertEqual(set(self.closed), {'expired', 'legacy'})
+        expired = db.session.get(Session, 'expired')
+        self.assertFalse(expired.actif)
+        self.assertEqual(expired.timestamp_fin, expired.timestamp_expiration)
+        self.assertTrue(db.session.get(Session, 'running').actif)
+        self.assertTrue(db.session.get(Session, 'legacy-recent').actif)
+
+    def test_scheduler_closes_session_at_expiration(self):
+        """Tester que le thread de l'ordonnanceur ferme la session à son échéance"""
+        now = datetime.utcnow()
+        self.add_session('soon', now, now + timedelta(seconds=0.5))
+
+        scheduler = get_session_scheduler()
+        self.app.testing = False
+        scheduler._ensure_started()
+        scheduler.schedule('soon', now + timedelta(seconds=0.5))
+
+        deadline = time.monotonic() + 5
+        while 'soon' not in self.closed and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.assertIn('soon', self.closed)
+        db.session.expire_all()
+        self.assertFalse(db.session.get(Session, 'soon').actif)
+
+        scheduler.stop()
+        self.assertFalse(any(thread.name == 'session-scheduler' for thread in threading.enumerate()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.static_build import MANIFEST_NAME, freeze_site, url_to_filepath
+
+CONFIG = {'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'}
+
+def auto_login_pages():
+    yield 'auth.auto_login', {'role': 'enseignant'}
+
+class StaticBuildTestCase(unittest.TestCase):
+    """Tests pour la génération incrémentale du site statique"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.destination = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        shutil.rmtree(self.destination)
+
+    def build(self, generators=(), processes=1):
+        return freeze_site(self.destination, CONFIG, generators=generators, processes=processes, out=lambda message: None)
+
+    def test_url_to_filepath(self):
+        """Tester la correspondance entre URL et fichiers générés"""
+        self.assertEqual(url_to_filepath('/'), 'index.html')
+        self.assertEqual(url_to_filepath('/equipments'), 'equipments.html')
+        self.assertEqual(url_to_filepath('/static/css/style.css', 'text/css'), 'static/css/style.css')
+        self.assertEqual(url_to_filepath('/api/users', 'application/json'), 'api/users')
+
+    def test_incremental_build(self):
+        """Tester que seules les pages modifiées sont réécrites et que les pages disparues sont supprimées"""
+        manifest = self.build([auto_login_pages])
+        self.assertIn('/auto-login/enseignant', manifest['routes'])
+        self.assertIn('static/css/style.css', manifest['written'])
+        self.assertEqual(len(manifest['written']), len(manifest['routes']))
+        self.assertGreaterEqual(manifest['routes']['/about']['render_ms'], 0)
+
+        # Empreinte différente dans le manifeste précédent : seule /about est réécrite
+        path = os.path.join(self.destination, MANIFEST_NAME)
+        with open(path) as f:
+            previous = json.load(f)
+        previous['routes']['/about']['sha256'] = 'ancienne'
+        with open(path, 'w') as f:
+            json.dump(previous, f)
+
+        manifest = self.build()
+        self.assertEqual(manifest['written'], ['about.html'])
+        self.assertEqual(manifest['removed'], ['auto-login/enseignant.html'])
+        self.assertFalse(os.path.exists(os.path.join(self.destination, 'auto-login', 'enseignant.html')))
+        self.assertEqual(manifest['routes']['/'], dict(previous['routes']['/'], render_ms=manifest['routes']['/']['render_ms'],
+                                                       status='unchanged'))
+
+    def test_parallel_build_skips_side_effect_routes(self):
+        """Tester le build avec plusieurs processus, sans rendre /test-users (réécriture des mots de passe)"""
+        users_file = os.path.join('data', 'test_users.json')
+        with open(users_file, 'rb') as f:
+            users = f.read()
+        modified = os.stat(users_file).st_mtime_ns
+
+        manifest = self.build([auto_login_pages], processes=2)
+
+        self.assertEqual(manifest['processes'], 2)
+        self.assertIn('/auto-login/enseignant', manifest['routes'])
+        self.assertIn('/login', manifest['routes'])
+        self.assertNotIn('/test-users', manifest['routes'])
+        with open(users_file, 'rb') as f:
+            self.assertEqual(f.read(), users)
+        self.assertEqual(os.stat(users_file).st_mtime_ns, modified)
+
+if __name__ == '__main__':
+    unittest.main()
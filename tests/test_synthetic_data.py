@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+from datetime import date
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, Session, LogScan
+from app.services.synthetic_data import generate_dataset, school_weeks
+
+SMALL = dict(n_rooms=3, equipment_per_room=2, n_teachers=3, n_students=40, class_size=10, slots_per_teacher=3, years=1)
+
+class SyntheticDataTestCase(unittest.TestCase):
+    """Tests pour le générateur de jeux de données synthétiques"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SESSION_SCHEDULER_ENABLED': False})
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def generate(self, seed):
+        db.drop_all()
+        db.create_all()
+        generate_dataset('small', seed=seed, processes=1, end_date=date(2025, 6, 1), out=lambda message: None, **SMALL)
+        return [tuple(row) for row in db.session.query(LogScan.id, LogScan.timestamp_scan, LogScan.user_id_etudiant)
+                .order_by(LogScan.id).all()]
+
+    def test_same_seed_same_dataset(self):
+        """Tester que le jeu de données est reproductible à graine identique"""
+        first = self.generate(seed=1)
+        self.assertGreater(len(first), 0)
+        self.assertEqual(first, self.generate(seed=1))
+        self.assertNotEqual(first, self.generate(seed=2))
+
+    def test_dataset_is_consistent(self):
+        """Tester la cohérence des données générées (utilisateurs, horaires, scans)"""
+        self.generate(seed=1)
+
+        self.assertEqual(User.query.filter_by(role='Etudiant').count(), 40)
+        self.assertEqual(Session.query.filter_by(actif=True).count(), 0)
+
+        # Les scans ont lieu pendant la session, jamais pendant les vacances d'été
+        outside = (db.session.query(LogScan).join(Session)
+                   .filter((LogScan.timestamp_scan < Session.timestamp_debut) |
+                           (LogScan.timestamp_scan > Session.timestamp_fin)).count())
+        self.assertEqual(outside, 0)
+        self.assertTrue(all(monday.month not in (7, 8) for monday in school_weeks(date(2025, 6, 1), 1)))
+
+if __name__ == '__main__':
+    unittest.main()
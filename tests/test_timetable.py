@@ -0,0 +1,249 @@
+import unittest
+import os
+import io
+import sys
+import shutil
+import tempfile
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session
+from app.services.jobs import claim_next, run_job
+from app.services.metrics import metrics
+from app.services.qr_images import qr_code_png, purge_qr_cache
+from app.services.qr_tokens import make_session_token
+from app.services.scan_engine import open_equipment_session
+from app.services.session_scheduler import activate_scheduled_sessions, get_session_scheduler
+from app.services.timetable import parse_csv, parse_ical, import_timetable
+
+BRUSSELS = ZoneInfo('Europe/Brussels')
+NOW = datetime(2030, 3, 20, 12, 0)
+
+ICAL = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:cours-1
+DTSTART;TZID=Europe/Brussels:20300325T083000
+DTEND;TZID=Europe/Brussels:20300325T103000
+RRULE:FREQ=WEEKLY;COUNT=3
+EXDATE;TZID=Europe/Brussels:20300401T083000
+SUMMARY:Électronique\\, laboratoire
+  du lundi
+LOCATION:EQ001
+ORGANIZER;CN=Prof:mailto:prof1@ecole.be
+END:VEVENT
+BEGIN:VEVENT
+UID:cours-2
+DTSTART:20300326T120000Z
+DURATION:PT1H30M
+SUMMARY:Sans salle
+END:VEVENT
+END:VCALENDAR
+"""
+
+class TimetableTestCase(unittest.TestCase):
+    """Tests pour l'import de l'emploi du temps et les sessions planifiées"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        metrics.reset()
+        qr_code_png.cache_clear()
+        self.cache_dir = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'SESSION_SCHEDULER_ENABLED': False,
+            'QR_IMAGE_CACHE_DIR': self.cache_dir,
+            'QR_PRERENDER_MINUTES': 2
+        })
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add_all([
+            Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope', qr_code_statique_data='EAFC-TIC_EQ001'),
+            Equipment(id='EQ002', nom_salle='Labo 102', type_equipement='Balance', qr_code_statique_data='EAFC-TIC_EQ002'),
+            Equipment(id='EQ003', nom_salle='Labo 102', type_equipement='Centrifugeuse', qr_code_statique_data='EAFC-TIC_EQ003')
+        ])
+        db.session.commit()
+
+        self.closed = []
+        get_session_scheduler().add_close_listener(self.closed.extend)
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        qr_code_png.cache_clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_parse_csv(self):
+        """Tester la lecture d'un CSV (séparateur, formats de date, fuseau horaire, lignes invalides)"""
+        text = ("Salle;Début;Fin;Enseignant;Cours\n"
+                "EQ001;25/03/2030 08:30;25/03/2030 10:30;prof1@ecole.be;Chimie\n"
+                "EQ001;demain;25/03/2030 12:00;;\n"
+                "\n"
+                "Labo 101;2030-04-08 08:30;2030-04-08 10:30;;\n")
+        slots, errors = parse_csv(text, BRUSSELS)
+
+        self.assertEqual(errors, [(3, "Date invalide (AAAA-MM-JJ HH:MM attendu).")])
+        self.assertEqual([(slot.equipment, slot.start, slot.teacher, slot.name) for slot in slots], [
+            ('EQ001', datetime(2030, 3, 25, 7, 30), 'prof1@ecole.be', 'Chimie'),
+            # Heure d'été : UTC+2
+            ('Labo 101', datetime(2030, 4, 8, 6, 30), None, None)
+        ])
+
+        with self.assertRaises(ValueError):
+            parse_csv("salle,fin\nEQ001,2030-04-08 10:30\n", BRUSSELS)
+
+    def test_parse_ical(self):
+        """Tester la lecture d'un fichier iCalendar (récurrence, exceptions, lignes repliées)"""
+        slots, errors = parse_ical(ICAL, BRUSSELS)
+
+        # Le 1er avril est exclu ; le cours reste à 8 h 30 locales après le changement d'heure
+        self.assertEqual([(slot.start, slot.end) for slot in slots], [
+            (datetime(2030, 3, 25, 7, 30), datetime(2030, 3, 25, 9, 30)),
+            (datetime(2030, 4, 8, 6, 30), datetime(2030, 4, 8, 8, 30))
+        ])
+        self.assertEqual(slots[0].name, 'Électronique, laboratoire du lundi')
+        self.assertEqual((slots[0].equipment, slots[0].teacher), ('EQ001', 'prof1@ecole.be'))
+        self.assertEqual(errors, [(14, "Propriété 'LOCATION' manquante.")])
+
+    def test_import_is_idempotent(self):
+        """Tester l'insertion groupée des sessions planifiées et la réimportation sans doublons"""
+        text = ("equipement;debut;fin;enseignant\n"
+                "EQ001;2030-03-25 08:30;2030-03-25 10:30;prof1@ecole.be\n"
+                "Labo 101;2030-03-26 08:30;2030-03-26 10:30;prof1@ecole.be\n"
+                "EQ001;2030-03-25 09:00;2030-03-25 11:00;prof1@ecole.be\n"
+                "EQ002;2030-03-18 08:30;2030-03-18 10:30;prof2@ecole.be\n"
+                "Labo 102;2030-03-25 08:30;2030-03-25 10:30;prof2@ecole.be\n"
+                "EQ002;2030-03-25 08:30;2030-03-25 10:30;etudiant1@ecole.be\n"
+                "EQ009;2030-03-25 08:30;2030-03-25 10:30;prof2@ecole.be\n")
+        report = import_timetable(text, 'edt.csv', now=NOW)
+
+        self.assertEqual((report['creees'], report['existantes'], report['passees']), (2, 0, 1))
+        self.assertEqual([line for line, _ in report['erreurs']], [4, 6, 7, 8])
+        self.assertEqual(report['taches'], 1)
+
+        sessions = Session.query.order_by(Session.timestamp_debut).all()
+        self.assertTrue(all(session.planifiee and not session.actif for session in sessions))
+        self.assertEqual(sessions[0].cle_idempotence, 'edt:EQ001:20300325T0730')
+        self.assertEqual(sessions[1].timestamp_expiration, datetime(2030, 3, 26, 9, 30))
+
+        report = import_timetable(text, 'edt.csv', now=NOW)
+        self.assertEqual((report['creees'], report['existantes'], report['taches']), (0, 2, 0))
+        self.assertEqual(Session.query.count(), 2)
+
+    def test_activation_closes_ad_hoc_session(self):
+        """Tester l'activation au début du créneau et la fermeture de la session ouverte à la main"""
+        equipment = db.session.get(Equipment, 'EQ001')
+        now = datetime.utcnow()
+
+        def local(minutes):
+            return (now + timedelta(minutes=minutes)).replace(tzinfo=timezone.utc).astimezone(BRUSSELS).strftime('%Y-%m-%d %H:%M')
+
+        # Session ouverte à la main bien avant le créneau (hors de l'avance de QR_PRERENDER_MINUTES)
+        import_timetable(f"equipement;debut;fin\nEQ001;{local(5)};{local(65)}\nEQ002;{local(5)};{local(6)}\n",
+                         teacher_id='prof1@ecole.be', now=now)
+        ad_hoc, created = open_equipment_session(equipment, 'prof1@ecole.be', now)
+        db.session.commit()
+        self.assertTrue(created)
+
+        # Avant le début du créneau : rien ne change
+        self.assertEqual(activate_scheduled_sessions(now), [])
+
+        # Début du créneau : la session planifiée devient la session active de l'équipement ;
+        # le créneau de EQ002, déjà terminé (serveur arrêté), n'est jamais activé
+        activated = activate_scheduled_sessions(now + timedelta(minutes=6))
+        self.assertEqual(len(activated), 1)
+        self.assertEqual(self.closed, [ad_hoc.id])
+        db.session.expire_all()
+        active = Session.query.filter_by(equipment_id='EQ001', actif=True).one()
+        self.assertEqual(active.id, activated[0])
+        self.assertFalse(active.planifiee)
+
+        session, created = open_equipment_session(equipment, 'prof1@ecole.be', now + timedelta(minutes=7))
+        self.assertEqual((session.id, created), (active.id, False))
+
+        missed = Session.query.filter_by(equipment_id='EQ002').one()
+        self.assertFalse(missed.planifiee or missed.actif)
+        self.assertEqual(missed.timestamp_fin, missed.timestamp_expiration)
+        self.assertEqual(metrics.get('scheduled_sessions_total', outcome='activee'), 1)
+        self.assertEqual(metrics.get('scheduled_sessions_total', outcome='manquee'), 1)
+
+    def test_early_scan_starts_planned_session(self):
+        """Tester qu'un scan de l'enseignant peu avant le créneau active la session planifiée"""
+        equipment = db.session.get(Equipment, 'EQ001')
+        now = datetime.utcnow()
+        start = (now + timedelta(minutes=2)).replace(tzinfo=timezone.utc).astimezone(BRUSSELS)
+        import_timetable(f"equipement;debut;fin\nEQ001;{start:%Y-%m-%d %H:%M};{start + timedelta(hours=1):%Y-%m-%d %H:%M}\n",
+                         teacher_id='prof1@ecole.be', now=now)
+        planned = Session.query.one()
+
+        session, created = open_equipment_session(equipment, 'prof1@ecole.be', now)
+        db.session.commit()
+
+        self.assertEqual((session.id, created), (planned.id, True))
+        self.assertTrue(session.actif)
+        self.assertFalse(session.planifiee)
+        # Les étudiants arrivés en avance sont comptés dans la session du cours
+        self.assertEqual(session.timestamp_debut, now)
+        self.assertEqual(Session.query.count(), 1)
+        self.assertEqual(metrics.get('session_open_total', outcome='planifiee'), 1)
+
+        # Le début du créneau ne ferme ni ne remplace la session déjà ouverte
+        self.assertEqual(activate_scheduled_sessions(now + timedelta(minutes=3)), [])
+        self.assertEqual(self.closed, [])
+        session, created = open_equipment_session(equipment, 'prof1@ecole.be', now + timedelta(minutes=4))
+        self.assertEqual((session.id, created), (planned.id, False))
+
+    def test_prerendered_qr_codes_served_from_cache(self):
+        """Tester le pré-rendu des QR codes par une tâche de fond et leur lecture au début du cours"""
+        report = import_timetable("equipement;debut;fin\nEQ001;2030-03-25 08:30;2030-03-25 10:30\n",
+                                  teacher_id='prof1@ecole.be', now=NOW)
+        self.assertEqual(report['taches'], 1)
+
+        self.assertEqual(run_job(claim_next('worker')), 'termine')
+        # 2 minutes de codes tournants de 30 secondes
+        self.assertEqual(len(os.listdir(self.cache_dir)), 4)
+
+        session = Session.query.one()
+        start = timegm(session.timestamp_debut.timetuple())
+        for offset in (0, 45, 119):
+            qr_code_png(make_session_token(session, now=start + offset))
+        qr_code_png(make_session_token(session, now=start + 120))
+        self.assertEqual(metrics.get('qr_images_total', source='pre_rendu'), 3)
+        self.assertEqual(metrics.get('qr_images_total', source='rendu'), 1)
+
+        # Les images restent 24 heures après leur fin de validité
+        self.assertEqual(purge_qr_cache(self.cache_dir, now=start + 3600), 0)
+        self.assertEqual(purge_qr_cache(self.cache_dir, now=start + 2 * 86400), 4)
+
+    def test_import_route(self):
+        """Tester l'import par un enseignant (son propre emploi du temps) et le refus aux étudiants"""
+        client = self.app.test_client()
+        client.get('/auto-login/student')
+        response = client.post('/sessions/emploi-du-temps')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Session.query.count(), 0)
+
+        client = self.app.test_client()
+        client.get('/auto-login/teacher')
+        self.assertEqual(client.get('/sessions/emploi-du-temps').status_code, 200)
+        response = client.post('/sessions/emploi-du-temps', data={
+            'fichier': (io.BytesIO(ICAL.encode('utf-8')), 'edt.ics')
+        }, content_type='multipart/form-data', follow_redirects=True)
+
+        page = response.get_data(as_text=True)
+        self.assertIn('session(s) planifiée(s)', page)
+        self.assertIn('Ligne 14', page)
+        self.assertEqual({session.user_id_enseignant for session in Session.query}, {'prof1@ecole.be'})
+
+if __name__ == '__main__':
+    unittest.main()
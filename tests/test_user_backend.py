@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User
+from app.services.user_backend import SqlUserBackend
+
+class SqlUserBackendTestCase(unittest.TestCase):
+    """Tests pour le backend d'utilisateurs stocké en base de données"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.backend = SqlUserBackend()
+        self.backend.import_users([
+            {'id': 'Admin@Ecole.be', 'nom_complet': 'Administrateur', 'role': 'Admin', 'password': '1234'},
+            {'id': 'prof1@ecole.be', 'nom_complet': 'Jean Dupont', 'role': 'Enseignant', 'password': '1234'},
+            {'id': 'etudiant1@ecole.be', 'nom_complet': 'Pierre Martin', 'role': 'Etudiant', 'password': '1234'}
+        ])
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_import_users_normalizes_ids(self):
+        """Tester que les IDs importés sont stockés en minuscules et retrouvés sans tenir compte de la casse"""
+        self.assertIsNotNone(db.session.get(User, 'admin@ecole.be'))
+        self.assertEqual(self.backend.get_user_by_id('ADMIN@ecole.be')['role'], 'Admin')
+
+    def test_authenticate_user(self):
+        """Tester l'authentification via le hash stocké en base"""
+        self.assertIsNotNone(self.backend.authenticate_user('prof1@ecole.be', '1234'))
+        self.assertIsNone(self.backend.authenticate_user('prof1@ecole.be', 'wrong_password'))
+        self.assertIsNone(self.backend.authenticate_user('nonexistent@ecole.be', '1234'))
+
+    def test_get_users_by_role_and_ids(self):
+        """Tester les requêtes filtrées par rôle et par lot d'IDs"""
+        teachers = self.backend.get_users_by_role('Enseignant')
+        self.assertEqual([u['id'] for u in teachers], ['prof1@ecole.be'])
+
+        users = self.backend.get_users_by_ids(['prof1@ecole.be', 'etudiant1@ecole.be', 'unknown@ecole.be'])
+        self.assertEqual(set(users), {'prof1@ecole.be', 'etudiant1@ecole.be'})
+
+    def test_create_update_delete_user(self):
+        """Tester le cycle de vie complet d'un utilisateur"""
+        success, _ = self.backend.create_user('etudiant2@ecole.be', 'Sophie Dubois', 'Etudiant', 'secret')
+        self.assertTrue(success)
+        success, _ = self.backend.create_user('etudiant2@ecole.be', 'Sophie Dubois', 'Etudiant', 'secret')
+        self.assertFalse(success)
+
+        success, _ = self.backend.update_user('etudiant2@ecole.be', role='Enseignant')
+        self.assertTrue(success)
+        self.assertEqual(self.backend.get_user_by_id('etudiant2@ecole.be')['role'], 'Enseignant')
+
+        success, _ = self.backend.delete_user('etudiant2@ecole.be')
+        self.assertTrue(success)
+        self.assertIsNone(self.backend.get_user_by_id('etudiant2@ecole.be'))
+
+    def test_writes_bump_store_version(self):
+        """Tester que chaque écriture change la version du stockage"""
+        version = self.backend.version()
+        self.backend.update_user('prof1@ecole.be', role='Admin')
+        self.assertEqual(self.backend.version(), version + 1)
+        self.backend.delete_user('etudiant1@ecole.be')
+        self.assertEqual(self.backend.version(), version + 2)
+
+    def test_cannot_delete_last_admin(self):
+        """Tester qu'il est impossible de supprimer le dernier administrateur"""
+        success, _ = self.backend.delete_user('admin@ecole.be')
+        self.assertFalse(success)
+
+if __name__ == '__main__':
+    unittest.main()
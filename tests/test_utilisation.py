@@ -0,0 +1,100 @@
+import unittest
+import os
+import sys
+from datetime import datetime
+
+# Ajouter le répertoire parent au chemin pour pouvoir importer l'application
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Equipment, Session, LogScan
+from app.services.utilisation import utilisation_report
+
+START = datetime(2025, 3, 3)
+END = datetime(2025, 3, 17)
+NOW = datetime(2025, 3, 11, 12, 0)
+
+class UtilisationTestCase(unittest.TestCase):
+    """Tests pour le moteur d'analyse de l'utilisation des salles et équipements"""
+
+    def setUp(self):
+        """Configuration avant chaque test"""
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add(Equipment(id='EQ001', nom_salle='Labo 101', type_equipement='Microscope', qr_code_statique_data='EAFC-TIC_EQ001'))
+        db.session.add(Equipment(id='EQ002', nom_salle='Labo 101', type_equipement='Centrifugeuse', qr_code_statique_data='EAFC-TIC_EQ002'))
+        db.session.add(Equipment(id='EQ003', nom_salle='Salle 202', type_equipement='Projecteur', qr_code_statique_data='EAFC-TIC_EQ003'))
+        sessions = [
+            ('A', 'EQ001', datetime(2025, 3, 3, 9, 30), datetime(2025, 3, 3, 11, 0)),
+            ('B', 'EQ002', datetime(2025, 3, 3, 10, 0), datetime(2025, 3, 3, 12, 0)),
+            ('C', 'EQ001', datetime(2025, 3, 10, 9, 0), datetime(2025, 3, 10, 10, 0)),
+            # Hors période
+            ('D', 'EQ003', datetime(2025, 2, 20, 9, 0), datetime(2025, 2, 20, 10, 0)),
+            # Session encore ouverte (sans fin ni expiration) puis session enchaînée
+            ('E', 'EQ003', datetime(2025, 3, 11, 10, 0), None),
+            ('F', 'EQ003', datetime(2025, 3, 11, 12, 0), datetime(2025, 3, 11, 13, 0)),
+        ]
+        for session_id, equipment_id, debut, fin in sessions:
+            db.session.add(Session(id=session_id, user_id_enseignant='prof1@ecole.be', equipment_id=equipment_id,
+                                   timestamp_debut=debut, timestamp_fin=fin, qr_code_dynamique_data=f'SESSION_{session_id}',
+                                   actif=False))
+        for log_id, session_id, student in [('l1', 'A', 'etudiant1@ecole.be'), ('l2', 'A', 'etudiant2@ecole.be'), ('l3', 'B', 'etudiant1@ecole.be')]:
+            db.session.add(LogScan(id=log_id, session_id=session_id, user_id_etudiant=student, timestamp_scan=datetime(2025, 3, 3, 10, 5)))
+        db.session.commit()
+
+    def tearDown(self):
+        """Nettoyage après chaque test"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_report(self):
+        """Tester la carte de chaleur, les taux d'occupation, les pics et les tendances"""
+        report = utilisation_report(START, END, now=NOW)
+        self.assertEqual(report['nb_sessions'], 5)
+        self.assertEqual(report['heures_ouverture'], 100)
+        self.assertEqual(report['semaines'], ['2025-03-03', '2025-03-10'])
+        self.assertEqual(report['pic_simultane'], {'sessions': 2, 'moment': '2025-03-03T10:00:00'})
+
+        salles = {salle['nom_salle']: salle for salle in report['salles']}
+        labo = salles['Labo 101']
+        # Lundi : 9 h (0,5 h puis 1 h), 10 h (deux sessions), 11 h (une session), moyenne sur deux semaines
+        self.assertEqual(labo['heatmap'][9:12], [0.75, 1.0, 0.5])
+        self.assertEqual(labo['pic_simultane'], 2)
+        self.assertAlmostEqual(labo['taux_occupation'], 0.035)
+        # Sessions enchaînées : pas de chevauchement
+        self.assertEqual(salles['Salle 202']['pic_simultane'], 1)
+
+        equipements = {equipement['id']: equipement for equipement in report['equipements']}
+        eq1 = equipements['EQ001']
+        self.assertEqual((eq1['sessions'], eq1['scans'], eq1['heures_occupees']), (2, 2, 2.5))
+        self.assertEqual(eq1['heures_par_semaine'], [1.5, 1.0])
+        self.assertEqual(eq1['scans_par_semaine'], [2, 0])
+        self.assertEqual(eq1['tendance_heures_par_semaine'], -0.5)
+        self.assertAlmostEqual(eq1['taux_occupation'], 0.025)
+        self.assertEqual(equipements['EQ003']['heures_occupees'], 3.0)
+
+    def test_api_admin_only(self):
+        """Tester l'API JSON (administrateurs uniquement, période validée)"""
+        self.client.get('/auto-login/student')
+        self.assertEqual(self.client.get('/api/analytics/utilisation').status_code, 403)
+
+        self.client.get('/logout')
+        self.client.get('/auto-login/admin')
+        response = self.client.get('/api/analytics/utilisation?debut=2025-03-03&fin=2025-03-09')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['nb_sessions'], 2)
+        self.assertEqual(self.client.get('/api/analytics/utilisation?debut=03/03/2025').status_code, 400)
+        self.assertEqual(self.client.get('/analytics/utilisation?debut=2025-03-03&fin=2025-03-16').status_code, 200)
+
+        # Période trop longue : refusée avant toute allocation
+        self.assertEqual(self.client.get('/api/analytics/utilisation?debut=1900-01-01').status_code, 400)
+        response = self.client.get('/analytics/utilisation?debut=1900-01-01&fin=2025-03-16', follow_redirects=True)
+        self.assertIn('Période invalide', response.get_data(as_text=True))
+
+if __name__ == '__main__':
+    unittest.main()